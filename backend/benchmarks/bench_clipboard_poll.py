@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+剪贴板轮询基准测试
+分别在空闲和剪贴板频繁变化两种场景下运行 ClipboardMonitor，
+对比固定间隔和自适应间隔的每分钟唤醒次数、CPU 时间和变化检测延迟
+
+用法: python benchmarks/bench_clipboard_poll.py [--duration 15] [--backend memory]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from typing import Dict, List
+
+# 基准测试不输出控制台日志
+os.environ.setdefault("KPSR_LOG_CONSOLE", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.clipboard_backend import create_clipboard_backend
+from utils.clipboard_monitor import (
+    ClipboardMonitor, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, POLL_BACKOFF, POLL_HOT_PERIOD
+)
+from utils.poll_scheduler import AdaptivePollScheduler
+
+
+def run_scenario(backend_name: str, adaptive: bool, churn_interval: float, duration: float,
+                 screenshot_dir: str) -> Dict[str, float]:
+    """运行一个场景，返回折算为每分钟的统计"""
+    backend = create_clipboard_backend(backend_name)
+    monitor = ClipboardMonitor(backend=backend)
+    monitor._screenshot_dirs = (screenshot_dir,)
+    if adaptive:
+        monitor._scheduler = AdaptivePollScheduler(
+            POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, backoff=POLL_BACKOFF, hot_period=POLL_HOT_PERIOD
+        )
+    else:
+        monitor._scheduler = AdaptivePollScheduler(POLL_MIN_INTERVAL, POLL_MIN_INTERVAL)
+
+    written_at: List[float] = []
+    latencies: List[float] = []
+
+    def on_change(_button_id: str, _change: object) -> None:
+        if written_at:
+            latencies.append(time.monotonic() - written_at[-1])
+
+    monitor.start_monitoring("bench", on_change)
+    time.sleep(0.5)  # 等待轮询线程记录初始状态
+
+    stop = threading.Event()
+
+    def churn() -> None:
+        count = 0
+        while not stop.wait(churn_interval):
+            count += 1
+            written_at.append(time.monotonic())
+            backend.write(f"benchmark {count}")
+
+    churn_thread = None
+    if churn_interval > 0:
+        churn_thread = threading.Thread(target=churn, daemon=True)
+        churn_thread.start()
+
+    polls_before = monitor._polls
+    cpu_before = time.process_time()
+    time.sleep(duration)
+    cpu = time.process_time() - cpu_before
+    polls = monitor._polls - polls_before
+
+    stop.set()
+    if churn_thread is not None:
+        churn_thread.join()
+    monitor.stop_monitoring("bench")
+    backend.close()
+    time.sleep(0.2)
+
+    scale = 60.0 / duration
+    return {
+        "wakeups_per_min": polls * scale,
+        "cpu_s_per_min": cpu * scale,
+        "avg_latency_ms": (sum(latencies) / len(latencies) * 1000) if latencies else 0.0,
+        "detected": len(latencies),
+        "written": len(written_at)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="剪贴板轮询基准测试")
+    parser.add_argument("--duration", type=float, default=15.0, help="每个场景运行的秒数")
+    parser.add_argument("--backend", default="memory", help="剪贴板后端 (memory/mac/linux)")
+    parser.add_argument("--churn-interval", type=float, default=1.0, help="变化场景中两次写入剪贴板的间隔（秒）")
+    parser.add_argument("--screenshot-dir", default=None, help="截图目录（默认使用空的临时目录）")
+    args = parser.parse_args()
+
+    screenshot_dir = args.screenshot_dir or tempfile.mkdtemp(prefix="kpsr-bench-")
+    print(f"后端: {args.backend}, 每个场景 {args.duration:.0f} 秒, "
+          f"轮询间隔 {POLL_MIN_INTERVAL}s ~ {POLL_MAX_INTERVAL}s")
+    print(f"{'场景':<10}{'调度':<8}{'唤醒/分钟':>12}{'CPU秒/分钟':>14}{'检测延迟(ms)':>16}{'检测/写入':>12}")
+    for scenario, churn_interval in (("idle", 0.0), ("churn", args.churn_interval)):
+        for adaptive in (False, True):
+            result = run_scenario(args.backend, adaptive, churn_interval, args.duration, screenshot_dir)
+            print(
+                f"{scenario:<10}{'adaptive' if adaptive else 'fixed':<8}"
+                f"{result['wakeups_per_min']:>12.0f}{result['cpu_s_per_min']:>14.3f}"
+                f"{result['avg_latency_ms']:>16.0f}{result['detected']:>7d}/{result['written']:<4d}"
+            )
+
+
+if __name__ == "__main__":
+    main()
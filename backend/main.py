@@ -57,6 +57,44 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# 请求关联 ID：沿用或生成 X-Request-ID，保存到 contextvar，日志自动附带，并在响应头中返回
+from utils.request_context import REQUEST_ID_HEADER, request_id_var, normalize_request_id
+
+_REQUEST_ID_HEADER_KEY = REQUEST_ID_HEADER.lower().encode("latin-1")
+
+
+class RequestIDMiddleware:
+    """纯 ASGI 中间件（不包装响应体，SSE 等流式响应不受影响）"""
+    
+    def __init__(self, app) -> None:
+        self.app = app
+    
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        incoming = None
+        for name, value in scope.get("headers", []):
+            if name == _REQUEST_ID_HEADER_KEY:
+                incoming = value.decode("latin-1")
+                break
+        request_id = normalize_request_id(incoming)
+        header = (_REQUEST_ID_HEADER_KEY, request_id.encode("latin-1"))
+        
+        async def send_with_request_id(message) -> None:
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [header]
+            await send(message)
+        
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
+
+
 # 配置CORS
 # 注意：由于是本地网络应用（热点网络），允许所有来源是合理的
 # 但可以通过环境变量控制（如果需要更严格的限制）
@@ -67,6 +105,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[REQUEST_ID_HEADER],
 )
 
 # 从 config.py 导入路径配置
@@ -212,6 +251,9 @@ async def private_network_only(request: Request, call_next) -> Response:
     response = await call_next(request)
     return response
 
+# 请求关联 ID 中间件最后注册，成为最外层：访问控制拒绝（403）等所有响应都带 X-Request-ID
+app.add_middleware(RequestIDMiddleware)
+
 # 健康检查端点
 @app.get("/health")
 async def health_check() -> dict:
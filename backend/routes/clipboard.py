@@ -2,12 +2,26 @@
 # -*- coding: utf-8 -*-
 """
 剪贴板操作路由
-提供复制文本到剪贴板的功能
+提供复制文本到剪贴板、读取剪贴板和剪贴板历史的功能
 """
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-import pyperclip
+from typing import Optional
+import sys
+import os
+
+# 添加utils目录到路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.clipboard_backend import get_clipboard_backend
+from utils.clipboard_monitor import clipboard_monitor
+from utils.clipboard_snapshot import (
+    ClipboardSnapshot, KIND_IMAGE, KIND_TEXT, capture_snapshot, clipboard_snapshot_cache
+)
+from utils.clipboard_history import clipboard_history
+from utils.clipboard_writer import WRITE_SKIPPED, clipboard_writer
 
 # 创建路由器实例
 router = APIRouter()
@@ -43,12 +57,12 @@ async def copy_to_clipboard(request: Request, copy_data: CopyRequest):
                 detail=f"Text too long, maximum {MAX_TEXT_LENGTH // 1024 // 1024}MB allowed"
             )
         
-        # 复制到剪贴板
-        pyperclip.copy(text)
+        # 复制到剪贴板（在写入线程中执行，连续写入只保留最新一次，与当前内容相同时跳过）
+        result = await clipboard_writer.write(text)
         
         return CopyResponse(
             status="success",
-            message="Copied to clipboard"
+            message="Already in clipboard" if result == WRITE_SKIPPED else "Copied to clipboard"
         )
         
     except HTTPException:
@@ -61,21 +75,131 @@ async def copy_to_clipboard(request: Request, copy_data: CopyRequest):
 
 
 
+async def _current_snapshot() -> ClipboardSnapshot:
+    """
+    获取当前剪贴板快照
+    监听器运行时直接使用它维护的共享快照；没有活动的监听时才读取剪贴板（在线程池中执行）
+    """
+    if clipboard_monitor.is_active():
+        snapshot = clipboard_snapshot_cache.get()
+        if snapshot is not None:
+            return snapshot
+    snapshot = await run_in_threadpool(capture_snapshot, get_clipboard_backend())
+    if snapshot is None:
+        raise HTTPException(status_code=500, detail="Failed to read clipboard")
+    clipboard_snapshot_cache.update(snapshot)
+    return snapshot
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """检查 If-None-Match 是否包含当前 ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for value in header.split(","):
+        value = value.strip()
+        if value.startswith("W/"):
+            value = value[2:]
+        if value == etag or value == "*":
+            return True
+    return False
+
+
 # 获取剪贴板内容（可选功能）
 @router.get("/get")
 async def get_clipboard_content(request: Request):
-    """获取当前剪贴板内容"""
+    """
+    获取当前剪贴板内容
+    响应带 ETag，内容未变化时对带 If-None-Match 的请求返回 304；
+    剪贴板中是图片时 content 为空，图片从 /api/clipboard/image 获取
+    """
     try:
-        # 获取剪贴板内容
-        content = pyperclip.paste()
+        snapshot = await _current_snapshot()
+        headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request, snapshot.etag):
+            return Response(status_code=304, headers=headers)
         
-        return {
+        result = {
             "status": "success",
-            "content": content
+            "content": snapshot.text,
+            **snapshot.to_dict()
         }
+        if snapshot.kind == KIND_IMAGE:
+            result["image_url"] = "/api/clipboard/image"
+        return JSONResponse(content=result, headers=headers)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=str(e)
         )
+
+
+@router.get("/image")
+async def get_clipboard_image(request: Request):
+    """获取剪贴板中的图片（PNG），支持 ETag/304"""
+    snapshot = await _current_snapshot()
+    if snapshot.kind != KIND_IMAGE:
+        raise HTTPException(status_code=404, detail="Clipboard does not contain an image")
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.data, media_type=snapshot.mime, headers=headers)
+
+
+# ==================== 剪贴板历史 ====================
+
+@router.get("/history")
+async def list_clipboard_history(
+    limit: int = Query(50, ge=1, le=1000, description="返回的条目数"),
+    kind: Optional[str] = Query(None, description="类型过滤 (text/image)")
+):
+    """按最近使用时间倒序列出剪贴板历史（只含元数据和文本预览）"""
+    return {
+        "status": "success",
+        "items": clipboard_history.list(limit=limit, kind=kind),
+        "stats": clipboard_history.stats()
+    }
+
+
+@router.get("/history/{content_hash}")
+async def get_clipboard_history_item(content_hash: str, request: Request):
+    """按哈希获取历史内容（文本或 PNG 原始内容），内容按哈希寻址，ETag 即哈希"""
+    entry = clipboard_history.get(content_hash)
+    data = clipboard_history.read(content_hash)
+    if entry is None or data is None:
+        raise HTTPException(status_code=404, detail="History item not found")
+    etag = f'"{entry.hash}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=entry.mime, headers=headers)
+
+
+@router.post("/history/{content_hash}/restore")
+async def restore_clipboard_history_item(content_hash: str):
+    """把历史内容重新写入剪贴板"""
+    entry = clipboard_history.get(content_hash)
+    data = clipboard_history.read(content_hash, touch=True)
+    if entry is None or data is None:
+        raise HTTPException(status_code=404, detail="History item not found")
+    
+    backend = get_clipboard_backend()
+    try:
+        if entry.kind == KIND_TEXT:
+            await clipboard_writer.write(data.decode("utf-8", errors="replace"))
+        else:
+            await run_in_threadpool(backend.write_image, data)
+            clipboard_snapshot_cache.update(ClipboardSnapshot(entry.kind, data, entry.mime))
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return {
+        "status": "success",
+        "message": "Restored to clipboard",
+        "item": entry.to_dict()
+    }
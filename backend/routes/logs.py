@@ -5,26 +5,102 @@
 提供日志记录、查询和管理功能
 """
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, AsyncGenerator, Iterator, Iterable, Dict, Any, Tuple
+from collections import OrderedDict
+from datetime import datetime
+import asyncio
+import json
+import math
+import time
+import zlib
 import sys
 import os
 
 # 添加utils目录到路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.logger import app_logger, log_frontend, get_logs, clear_logs, get_log_stats
+from utils.logger import (
+    app_logger, log_frontend, log_batch, get_logs, query_logs, clear_logs, get_log_stats, get_log_histogram,
+    read_logs_after, iter_logs, search_logs, dump_logs, read_text_logs
+)
 
 router = APIRouter()
 
+# 实时日志推送配置
+TAIL_POLL_INTERVAL = 0.5  # 检查新日志的间隔（秒）
+TAIL_HEARTBEAT_INTERVAL = 15  # 心跳间隔（秒）
+TAIL_BATCH_SIZE = 500  # 每次最多推送的日志条数
+
+# 导出配置
+EXPORT_CHUNK_SIZE = 64 * 1024  # 每次输出的数据块大小（字节）
+
+# 前端日志批量接收配置
+INGEST_MAX_BYTES = 4 * 1024 * 1024  # 解压后的请求体上限（字节）
+INGEST_MAX_ENTRIES = 2000  # 单次请求最多接收的日志条数
+INGEST_MAX_MESSAGE = 8192  # 单条消息最大长度，超出部分截断
+INGEST_RATE = float(os.environ.get("KPSR_LOG_INGEST_RATE", "200"))  # 每个客户端每秒补充的配额（条）
+INGEST_BURST = float(os.environ.get("KPSR_LOG_INGEST_BURST", "2000"))  # 每个客户端的配额上限（条）
+INGEST_MAX_CLIENTS = 1024  # 最多跟踪的客户端数
+
+
+class ClientQuota:
+    """
+    按客户端的令牌桶配额
+    每个客户端以 rate 条/秒补充配额，最多积累 burst 条；长时间不活动的客户端按 LRU 淘汰
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = INGEST_MAX_CLIENTS) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # client -> (剩余配额, 更新时间)
+
+    def acquire(self, client: str, cost: float) -> float:
+        """
+        扣除 cost 条配额，成功返回 0，配额不足时不扣除并返回需要等待的秒数
+        单次请求的消耗按 burst 封顶，保证任何请求等待足够久后都能通过
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        cost = min(cost, self.burst)
+
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / self.rate if self.rate > 0 else 60.0
+
+        self._buckets[client] = (tokens, now)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+ingest_quota = ClientQuota(INGEST_RATE, INGEST_BURST)
+
 # 请求模型
 class FrontendLogRequest(BaseModel):
     level: str
     message: str
     extra: Optional[dict] = None
 
-class BatchLogRequest(BaseModel):
-    logs: List[FrontendLogRequest]
+class LogLevelRequest(BaseModel):
+    level: Optional[str] = None  # 为空时移除该来源的单独设置
+    source: Optional[str] = None  # 为空时设置默认级别
+
+class SampleRateRequest(BaseModel):
+    source: str
+    rate: float
+    level: str = "DEBUG"
+
+class FlightRecorderRequest(BaseModel):
+    enabled: Optional[bool] = None
+    seconds: Optional[float] = None  # 导出错误前多少秒的日志
+    level: Optional[str] = None  # 达到该级别的日志照常写入磁盘
 
 # 响应模型
 class LogEntry(BaseModel):
@@ -38,6 +114,7 @@ class LogsResponse(BaseModel):
     status: str
     logs: List[dict]
     count: int
+    next_cursor: Optional[str] = None
 
 class LogStatsResponse(BaseModel):
     status: str
@@ -45,9 +122,103 @@ class LogStatsResponse(BaseModel):
 
 # API端点
 
+def _client_id(http_request: Request) -> str:
+    """客户端标识（按 IP 计算配额）"""
+    return http_request.client.host if http_request.client else "unknown"
+
+def _check_quota(http_request: Request, cost: int) -> None:
+    """扣除客户端配额，不足时返回 429 并通过 Retry-After 告知等待时间"""
+    wait = ingest_quota.acquire(_client_id(http_request), cost)
+    if wait > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="日志发送过于频繁，请稍后重试",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))}
+        )
+
+def _decode_body(body: bytes, content_encoding: str) -> bytes:
+    """按 Content-Encoding 解压请求体（gzip/deflate），限制解压后的大小"""
+    encoding = content_encoding.strip().lower()
+    if encoding in ("", "identity"):
+        data = body
+    elif encoding in ("gzip", "x-gzip", "deflate"):
+        # wbits=47 自动识别 gzip 和 zlib 格式
+        decompressor = zlib.decompressobj(47)
+        try:
+            data = decompressor.decompress(body, INGEST_MAX_BYTES + 1)
+        except zlib.error as e:
+            raise HTTPException(status_code=400, detail=f"解压请求体失败: {str(e)}")
+    else:
+        raise HTTPException(status_code=415, detail=f"不支持的 Content-Encoding: {content_encoding}")
+    if len(data) > INGEST_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="请求体过大")
+    return data
+
+def _parse_records(data: bytes, content_type: str) -> Tuple[List[Any], int]:
+    """
+    解析日志请求体，支持 NDJSON（每行一条）、JSON 数组和 {"logs": [...]}
+    返回 (日志对象列表, 无法解析的行数)
+    """
+    text = data.decode("utf-8", errors="replace")
+    if "ndjson" not in content_type:
+        try:
+            payload = json.loads(text)
+        except json.JSONDecodeError:
+            payload = None  # 不是单个 JSON 文档，按 NDJSON 解析
+        else:
+            if isinstance(payload, dict) and isinstance(payload.get("logs"), list):
+                return payload["logs"], 0
+            if isinstance(payload, list):
+                return payload, 0
+            return [payload], 0
+
+    items = []
+    rejected = 0
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append(json.loads(line))
+        except json.JSONDecodeError:
+            rejected += 1
+    return items, rejected
+
+def _coalesce(items: Iterable[Any]) -> Tuple[List[Tuple[str, str, Optional[Dict[str, Any]]]], int]:
+    """
+    合并同一批中连续出现的级别和内容都相同的日志，只保留第一条并在 extra.repeat_count 中记录出现次数
+    （与前端 log_capture.js 一样只合并相邻的重复，保持日志原有顺序；客户端已合并过的日志可以自带 repeat_count）
+    返回 ([(级别, 消息, 附加信息), ...], 无效条目数)
+    """
+    runs: List[List[Any]] = []  # [级别, 消息, 附加信息, 次数]
+    rejected = 0
+    for item in items:
+        if not isinstance(item, dict) or "message" not in item:
+            rejected += 1
+            continue
+        level = str(item.get("level") or "INFO").upper()
+        message = str(item["message"])[:INGEST_MAX_MESSAGE]
+        extra = item.get("extra")
+        try:
+            count = max(1, int(item.get("repeat_count") or 1))
+        except (TypeError, ValueError):
+            count = 1
+        if runs and runs[-1][0] == level and runs[-1][1] == message:
+            runs[-1][3] += count
+        else:
+            runs.append([level, message, extra if isinstance(extra, dict) else None, count])
+
+    records = []
+    for level, message, extra, count in runs:
+        if count > 1:
+            extra = dict(extra or {}, repeat_count=count)
+        records.append((level, message, extra))
+    return records, rejected
+
 @router.post("/frontend")
-async def log_from_frontend(request: FrontendLogRequest):
+async def log_from_frontend(request: FrontendLogRequest, http_request: Request):
     """接收前端日志"""
+    _check_quota(http_request, 1)
     try:
         log_frontend(request.level, request.message, request.extra)
         return {"status": "success", "message": "日志已记录"}
@@ -55,37 +226,85 @@ async def log_from_frontend(request: FrontendLogRequest):
         raise HTTPException(status_code=500, detail=f"记录日志失败: {str(e)}")
 
 @router.post("/frontend/batch")
-async def log_batch_from_frontend(request: BatchLogRequest):
-    """批量接收前端日志"""
+@router.post("/frontend/ingest")
+async def log_batch_from_frontend(http_request: Request):
+    """
+    批量接收前端日志
+    - 请求体可以是 NDJSON、JSON 数组或 {"logs": [...]}，支持 Content-Encoding: gzip/deflate
+    - 同一批中连续重复的日志合并为一条（extra.repeat_count 记录次数）
+    - 按客户端 IP 限制日志条数，超出配额返回 429 和 Retry-After
+    - 整批日志一次进入写入队列，由写入线程一次写入各存储
+    """
+    body = await http_request.body()
+    data = _decode_body(body, http_request.headers.get("content-encoding", ""))
+    items, rejected = _parse_records(data, http_request.headers.get("content-type", "").lower())
+    if len(items) > INGEST_MAX_ENTRIES:
+        raise HTTPException(status_code=413, detail=f"单次最多发送 {INGEST_MAX_ENTRIES} 条日志")
+
+    records, invalid = _coalesce(items)
+    rejected += invalid
+    if records:
+        _check_quota(http_request, len(records))
+
     try:
-        for log in request.logs:
-            log_frontend(log.level, log.message, log.extra)
-        return {"status": "success", "message": f"已记录 {len(request.logs)} 条日志"}
+        accepted = log_batch(records, source="frontend")
+        return {
+            "status": "success",
+            "message": f"已记录 {accepted} 条日志",
+            "received": len(items),
+            "accepted": accepted,
+            "deduplicated": len(items) - invalid - len(records),
+            "rejected": rejected
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"记录日志失败: {str(e)}")
 
 @router.get("/list", response_model=LogsResponse)
-async def get_log_list(
+def get_log_list(
     limit: int = Query(100, ge=1, le=10000, description="返回的日志条数"),
     level: Optional[str] = Query(None, description="日志级别过滤 (DEBUG/INFO/WARNING/ERROR)"),
     source: Optional[str] = Query(None, description="来源过滤 (frontend/backend)"),
     start_time: Optional[str] = Query(None, description="开始时间 (ISO格式)"),
-    end_time: Optional[str] = Query(None, description="结束时间 (ISO格式)")
+    end_time: Optional[str] = Query(None, description="结束时间 (ISO格式)"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor）"),
+    q: Optional[str] = Query(None, description="按消息内容搜索（启用 SQLite 后端时为全文搜索）"),
+    request_id: Optional[str] = Query(None, description="按请求 ID（X-Request-ID）过滤")
 ):
-    """获取日志列表"""
+    """
+    获取日志列表（从新到旧分页）
+    带游标翻页到内存之外时会读取归档分段，定义为同步接口以在线程池中执行
+    """
     try:
-        logs = get_logs(
-            limit=limit,
-            level=level,
-            source=source,
-            start_time=start_time,
-            end_time=end_time
-        )
+        if q:
+            result = search_logs(
+                q,
+                limit=limit,
+                level=level,
+                source=source,
+                start_time=start_time,
+                end_time=end_time,
+                cursor=cursor,
+                request_id=request_id
+            )
+        else:
+            result = query_logs(
+                limit=limit,
+                level=level,
+                source=source,
+                start_time=start_time,
+                end_time=end_time,
+                cursor=cursor,
+                request_id=request_id
+            )
+        logs = result["logs"]
         return LogsResponse(
             status="success",
             logs=logs,
-            count=len(logs)
+            count=len(logs),
+            next_cursor=result["next_cursor"]
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取日志失败: {str(e)}")
 
@@ -101,9 +320,94 @@ async def get_statistics():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取统计失败: {str(e)}")
 
+@router.get("/histogram")
+async def get_histogram(
+    minutes: int = Query(60, ge=1, le=1440, description="统计最近多少分钟"),
+    level: Optional[str] = Query(None, description="日志级别过滤 (DEBUG/INFO/WARNING/ERROR)")
+):
+    """获取每分钟日志条数（如最近一小时每分钟的错误数）"""
+    try:
+        buckets = get_log_histogram(minutes=minutes, level=level)
+        return {
+            "status": "success",
+            "level": level.upper() if level else None,
+            "buckets": buckets,
+            "total": sum(bucket["count"] for bucket in buckets)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取统计失败: {str(e)}")
+
+@router.get("/levels")
+async def get_log_levels():
+    """获取按来源的日志级别和采样配置"""
+    levels = app_logger.get_levels()
+    return {
+        "status": "success",
+        "levels": levels,
+        "sampling": app_logger.get_sample_rates()
+    }
+
+@router.put("/levels")
+async def set_log_level(request: LogLevelRequest):
+    """运行时调整日志级别（source 为空时调整默认级别）"""
+    try:
+        app_logger.set_level(request.level, request.source)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "status": "success",
+        "levels": app_logger.get_levels()
+    }
+
+@router.put("/levels/sampling")
+async def set_log_sampling(request: SampleRateRequest):
+    """运行时调整 DEBUG/INFO 日志的采样率"""
+    try:
+        app_logger.set_sample_rate(request.source, request.rate, request.level)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "status": "success",
+        "sampling": app_logger.get_sample_rates()
+    }
+
+@router.get("/flight-recorder")
+async def get_flight_recorder():
+    """获取飞行记录模式状态"""
+    return {
+        "status": "success",
+        "flight_recorder": app_logger.get_flight_recorder()
+    }
+
+@router.put("/flight-recorder")
+async def set_flight_recorder(request: FlightRecorderRequest):
+    """开启/关闭飞行记录模式（低级别日志只保存在内存，出错时导出之前的日志）"""
+    try:
+        app_logger.set_flight_recorder(request.enabled, request.seconds, request.level)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "status": "success",
+        "flight_recorder": app_logger.get_flight_recorder()
+    }
+
+@router.post("/dump")
+def dump_recent_logs(
+    seconds: Optional[float] = Query(None, gt=0, le=86400, description="导出最近多少秒的日志（默认使用飞行记录窗口）")
+):
+    """
+    把内存中最近的日志导出到 logs/dumps 目录
+    导出前要等待写入线程刷新（最多数秒），定义为同步接口以在线程池中执行
+    """
+    try:
+        result = dump_logs(seconds)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"导出日志失败: {str(e)}")
+    return {"status": "success", **result}
+
 @router.delete("/clear")
-async def clear_all_logs():
-    """清空所有日志"""
+def clear_all_logs():
+    """清空所有日志（需要等待写入线程刷新，定义为同步接口以在线程池中执行）"""
     try:
         success = clear_logs()
         if success:
@@ -116,7 +420,7 @@ async def clear_all_logs():
         raise HTTPException(status_code=500, detail=f"清空日志失败: {str(e)}")
 
 @router.get("/recent")
-async def get_recent_logs(count: int = Query(50, ge=1, le=500)):
+def get_recent_logs(count: int = Query(50, ge=1, le=500)):
     """获取最近的日志（简化接口）"""
     try:
         logs = get_logs(limit=count)
@@ -129,7 +433,7 @@ async def get_recent_logs(count: int = Query(50, ge=1, le=500)):
         raise HTTPException(status_code=500, detail=f"获取日志失败: {str(e)}")
 
 @router.get("/errors")
-async def get_error_logs(count: int = Query(50, ge=1, le=500)):
+def get_error_logs(count: int = Query(50, ge=1, le=500)):
     """获取错误日志"""
     try:
         logs = get_logs(limit=count, level="ERROR")
@@ -142,7 +446,7 @@ async def get_error_logs(count: int = Query(50, ge=1, le=500)):
         raise HTTPException(status_code=500, detail=f"获取日志失败: {str(e)}")
 
 @router.get("/frontend-logs")
-async def get_frontend_only_logs(count: int = Query(100, ge=1, le=1000)):
+def get_frontend_only_logs(count: int = Query(100, ge=1, le=1000)):
     """只获取前端日志"""
     try:
         logs = get_logs(limit=count, source="frontend")
@@ -154,8 +458,32 @@ async def get_frontend_only_logs(count: int = Query(100, ge=1, le=1000)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取日志失败: {str(e)}")
 
+@router.get("/file", response_model=LogsResponse)
+def get_text_file_logs(
+    limit: int = Query(100, ge=1, le=10000, description="返回的日志条数"),
+    level: Optional[str] = Query(None, description="日志级别过滤 (DEBUG/INFO/WARNING/ERROR)"),
+    source: Optional[str] = Query(None, description="来源过滤"),
+    start_time: Optional[str] = Query(None, description="开始时间 (ISO格式，精确到秒)"),
+    end_time: Optional[str] = Query(None, description="结束时间 (ISO格式，精确到秒)")
+):
+    """
+    从文本日志文件（app.log 及轮转文件）倒序读取日志
+    内存和归档中都查不到的更早日志从这里读取；需要扫描文件，定义为同步接口以在线程池中执行
+    """
+    try:
+        logs = read_text_logs(
+            limit=limit,
+            level=level,
+            source=source,
+            start_time=start_time,
+            end_time=end_time
+        )
+        return LogsResponse(status="success", logs=logs, count=len(logs))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"读取日志文件失败: {str(e)}")
+
 @router.get("/backend-logs")
-async def get_backend_only_logs(count: int = Query(100, ge=1, le=1000)):
+def get_backend_only_logs(count: int = Query(100, ge=1, le=1000)):
     """只获取后端日志"""
     try:
         logs = get_logs(limit=count, source="backend")
@@ -166,3 +494,132 @@ async def get_backend_only_logs(count: int = Query(100, ge=1, le=1000)):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取日志失败: {str(e)}")
+
+
+@router.get("/tail")
+async def tail_logs(
+    request: Request,
+    cursor: Optional[str] = Query(None, description="从该游标之后开始推送（断线重连时也可使用 Last-Event-ID）"),
+    backlog: int = Query(0, ge=0, le=1000, description="没有游标时，先推送最近多少条日志"),
+    level: Optional[str] = Query(None, description="日志级别过滤 (DEBUG/INFO/WARNING/ERROR)"),
+    source: Optional[str] = Query(None, description="来源过滤 (frontend/backend)"),
+    request_id: Optional[str] = Query(None, description="按请求 ID（X-Request-ID）过滤")
+) -> StreamingResponse:
+    """SSE端点：实时推送新日志（只推送游标之后的增量）"""
+    try:
+        # 服务重启后浏览器会带着旧进程的 Last-Event-ID 重连，这时从当前最新位置开始推送
+        start_cursor, reset = app_logger.resolve_tail_cursor(request.headers.get("last-event-id") or cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def event_generator() -> AsyncGenerator[str, None]:
+        last_cursor = start_cursor
+        yield f"data: {json.dumps({'type': 'connected', 'cursor': last_cursor, 'reset': reset})}\n\n"
+        
+        # 没有游标时先推送最近的日志（不带 id，重连时从最新游标继续）
+        if backlog and not (request.headers.get("last-event-id") or cursor):
+            recent = await run_in_threadpool(
+                get_logs, limit=backlog, level=level, source=source, request_id=request_id
+            )
+            for entry in recent:
+                yield f"data: {json.dumps({'type': 'log', 'log': entry}, ensure_ascii=False)}\n\n"
+        
+        idle = 0.0
+        try:
+            while True:
+                page = read_logs_after(
+                    last_cursor,
+                    limit=TAIL_BATCH_SIZE,
+                    level=level,
+                    source=source,
+                    request_id=request_id
+                )
+                if page:
+                    idle = 0.0
+                    for entry_cursor, entry in page:
+                        payload = json.dumps({'type': 'log', 'log': entry}, ensure_ascii=False)
+                        yield f"id: {entry_cursor}\ndata: {payload}\n\n"
+                    last_cursor = page[-1][0]
+                    if len(page) == TAIL_BATCH_SIZE:
+                        # 还有积压，立即继续
+                        continue
+                
+                if await request.is_disconnected():
+                    break
+                
+                await asyncio.sleep(TAIL_POLL_INTERVAL)
+                idle += TAIL_POLL_INTERVAL
+                if idle >= TAIL_HEARTBEAT_INTERVAL:
+                    idle = 0.0
+                    yield f"data: {json.dumps({'type': 'heartbeat'})}\n\n"
+        except asyncio.CancelledError:
+            pass
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+def _ndjson_chunks(entries: Iterable[dict]) -> Iterator[bytes]:
+    """把日志逐条编码为 NDJSON，按数据块大小合并输出"""
+    buffer: List[bytes] = []
+    size = 0
+    for entry in entries:
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8')
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+def _gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """流式 gzip 压缩"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 输出 gzip 格式
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+@router.get("/export")
+async def export_logs(
+    level: Optional[str] = Query(None, description="日志级别过滤 (DEBUG/INFO/WARNING/ERROR)"),
+    source: Optional[str] = Query(None, description="来源过滤 (frontend/backend)"),
+    start_time: Optional[str] = Query(None, description="开始时间 (ISO格式)"),
+    end_time: Optional[str] = Query(None, description="结束时间 (ISO格式)"),
+    compress: bool = Query(False, alias="gzip", description="是否 gzip 压缩"),
+    request_id: Optional[str] = Query(None, description="按请求 ID（X-Request-ID）过滤")
+) -> StreamingResponse:
+    """
+    流式导出日志为 NDJSON（可选 gzip），不会一次性构建完整列表
+    包含归档中的历史日志；同步生成器由 StreamingResponse 在线程池中迭代，读取归档不阻塞事件循环
+    """
+    chunks = _ndjson_chunks(iter_logs(
+        level=level,
+        source=source,
+        start_time=start_time,
+        end_time=end_time,
+        request_id=request_id,
+        include_archive=True
+    ))
+    filename = f"logs-{datetime.now().strftime('%Y%m%d-%H%M%S')}.ndjson"
+    
+    if compress:
+        return StreamingResponse(
+            _gzip_chunks(chunks),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.gz"'}
+        )
+    return StreamingResponse(
+        chunks,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
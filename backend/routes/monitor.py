@@ -5,31 +5,97 @@
 提供剪贴板变化监听功能
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from typing import Optional, AsyncGenerator, Dict
+from pydantic import BaseModel, Field, validator
+from typing import Optional, AsyncGenerator, Dict, List
 import asyncio
 import json
-import traceback
+import re
 import sys
 import os
 
 # 添加utils目录到路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.clipboard_monitor import clipboard_monitor
-from utils.logger import info, error
+from utils.monitor_hub import Subscription, monitor_hub
+from utils.clipboard_change import ChangeFilter, ClipboardChange
+from utils.clipboard_push import ClipboardPusher
+from utils.clipboard_snapshot import KIND_IMAGE
+from utils.logger import debug, info, error
 
 router = APIRouter()
 
-# 存储每个按钮的事件队列
-button_events: Dict[str, asyncio.Queue] = {}
-# 存储主事件循环的引用
-main_event_loop: Optional[asyncio.AbstractEventLoop] = None
+# 每个监听最多可指定的截图目录和文件名模式数量
+MAX_SCREENSHOT_DIRS = 8
+MAX_SCREENSHOT_PATTERNS = 8
+
+# 浏览器断线后的重连间隔（毫秒），通过 SSE 的 retry: 字段下发
+SSE_RETRY_MS = 3000
+
+# 多路复用连接 ID：字母、数字和 ._-，最长 64 个字符
+STREAM_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"
+}
+
+class MonitorFilter(BaseModel):
+    kinds: Optional[List[str]] = Field(default=None, description="只接收这些类型的变化 (text/image/screenshot)，为空表示全部")
+    text_pattern: Optional[str] = Field(default=None, description="文本变化需要匹配的正则（只匹配文本开头部分，不支持嵌套重复、反向引用和多个不限次数的重复）")
+    
+    def to_change_filter(self) -> ChangeFilter:
+        return ChangeFilter(kinds=self.kinds, text_pattern=self.text_pattern)
 
 class MonitorRequest(BaseModel):
     button_id: str
     action: str  # "start" or "stop"
+    filter: Optional[MonitorFilter] = Field(default=None, description="事件过滤条件，为空时接收所有变化")
+    stream_id: Optional[str] = Field(default=None, description="多路复用连接 ID，开始/停止监听时同时订阅/取消订阅该连接")
+    push_content: bool = Field(default=False, description="剪贴板文本变化时随事件推送内容（有长度上限，可能是差异或压缩后的内容）")
+    screenshot_dirs: Optional[List[str]] = Field(default=None, description="监视的截图目录，为空时使用默认目录，空列表表示不监视截图")
+    screenshot_patterns: Optional[List[str]] = Field(default=None, description="截图文件名模式（如 Screenshot*.png），为空时使用默认模式")
+    
+    @validator('screenshot_dirs')
+    def validate_screenshot_dirs(cls, v):
+        if v is None:
+            return v
+        if len(v) > MAX_SCREENSHOT_DIRS:
+            raise ValueError(f'最多指定 {MAX_SCREENSHOT_DIRS} 个截图目录')
+        dirs = []
+        for directory in v:
+            path = os.path.expanduser(directory.strip())
+            if not path or not os.path.isdir(path):
+                raise ValueError(f'截图目录不存在: {directory}')
+            dirs.append(path)
+        return dirs
+    
+    @validator('screenshot_patterns')
+    def validate_screenshot_patterns(cls, v):
+        if v is None:
+            return v
+        if not v or len(v) > MAX_SCREENSHOT_PATTERNS:
+            raise ValueError(f'截图文件名模式数量必须在 1 到 {MAX_SCREENSHOT_PATTERNS} 之间')
+        patterns = [pattern.strip() for pattern in v]
+        for pattern in patterns:
+            if not pattern or '/' in pattern or os.sep in pattern:
+                raise ValueError(f'截图文件名模式不能为空或包含路径分隔符: {pattern}')
+        return patterns
+    
+    @validator('stream_id')
+    def validate_stream_id(cls, v):
+        if v is not None and not STREAM_ID_PATTERN.match(v):
+            raise ValueError('连接 ID 只能包含字母、数字和 ._-，最长 64 个字符')
+        return v
+    
+    @validator('filter')
+    def validate_filter(cls, v):
+        if v is not None:
+            # 类型和正则无效时抛出 ValueError
+            v.to_change_filter()
+        return v
 
 class MonitorResponse(BaseModel):
     status: str
@@ -37,52 +103,59 @@ class MonitorResponse(BaseModel):
     button_id: str
     is_monitoring: bool
 
-def on_clipboard_change(button_id: str) -> None:
-    """剪贴板变化回调（从轮询线程调用）"""
-    info(f"🔔 剪贴板变化回调触发: {button_id}", source="monitor_api")
-    
-    # 将事件放入队列
-    if button_id not in button_events:
-        error(f"按钮 {button_id} 的事件队列不存在", source="monitor_api")
+# 每个按钮最近一次的开始监听请求：没有 SSE 连接时暂停监听，连接恢复后按此配置重新开始
+monitor_configs: Dict[str, MonitorRequest] = {}
+
+def on_clipboard_change(button_id: str, change: ClipboardChange) -> None:
+    """
+    剪贴板变化回调（在轮询线程中调用，只把事件交给事件循环，不等待）
+    变化已由轮询线程分类，过滤条件在事件循环中按分类结果判断；
+    文本的推送内容在发送给各个连接时生成（见 _sse_messages）
+    """
+    event_data = {"type": "clipboard_change", "button_id": button_id, **change.to_dict()}
+    config = monitor_configs.get(button_id)
+    if config is not None and config.push_content and change.kind == KIND_IMAGE:
+        event_data["image_url"] = "/api/clipboard/image"
+    if not monitor_hub.publish(button_id, event_data, change):
+        error(f"事件循环不可用，丢弃按钮 {button_id} 的事件", source="monitor_api")
+
+def _start_monitoring(config: MonitorRequest) -> None:
+    """按请求配置开始监听（只登记监听，剪贴板和截图基准由轮询线程记录，不阻塞事件循环）"""
+    clipboard_monitor.start_monitoring(
+        config.button_id,
+        on_clipboard_change,
+        screenshot_dirs=config.screenshot_dirs,
+        screenshot_patterns=config.screenshot_patterns
+    )
+
+def _on_subscriber_active(button_id: str) -> None:
+    """按钮有了第一个 SSE 连接：之前因空闲暂停的监听恢复运行"""
+    config = monitor_configs.get(button_id)
+    if config is None or clipboard_monitor.is_monitoring(button_id):
         return
-    
     try:
-        event_data = {"type": "clipboard_change", "button_id": button_id}
-        queue = button_events[button_id]
-        
-        # 使用线程安全的方式添加事件
-        if main_event_loop and main_event_loop.is_running():
-            info("使用 run_coroutine_threadsafe 发送事件", source="monitor_api")
-            future = asyncio.run_coroutine_threadsafe(
-                queue.put(event_data),
-                main_event_loop
-            )
-            # 等待完成（最多1秒）
-            try:
-                future.result(timeout=1)
-                info("✅ 事件已放入队列", source="monitor_api")
-            except Exception as e:
-                error(f"等待事件放入队列超时: {e}", source="monitor_api")
-        else:
-            info("事件循环未运行，使用 put_nowait", source="monitor_api")
-            queue.put_nowait(event_data)
-            info("✅ 事件已放入队列 (put_nowait)", source="monitor_api")
-            
+        info(f"SSE 连接恢复，重新开始监听: {button_id}", source="monitor_api")
+        _start_monitoring(config)
+    except Exception as e:
+        error(f"恢复监听失败: {button_id}, {e}", source="monitor_api")
+
+def _on_subscriber_idle(button_id: str) -> None:
+    """按钮超过宽限期没有 SSE 连接：暂停监听（没有任何监听时轮询线程自动停止）"""
+    if not clipboard_monitor.is_monitoring(button_id):
+        return
+    try:
+        info(f"按钮 {button_id} 没有 SSE 连接，暂停监听", source="monitor_api")
+        clipboard_monitor.stop_monitoring(button_id)
     except Exception as e:
-        error(f"发送事件失败: {e}", source="monitor_api")
-        error(f"详细错误: {traceback.format_exc()}", source="monitor_api")
+        error(f"暂停监听失败: {button_id}, {e}", source="monitor_api")
+
+monitor_hub.set_lifecycle(_on_subscriber_active, _on_subscriber_idle)
 
 @router.post("/control", response_model=MonitorResponse)
 async def control_monitor(request: MonitorRequest) -> MonitorResponse:
     """控制剪贴板监听"""
-    global main_event_loop
-    
-    # 保存当前事件循环的引用
-    try:
-        main_event_loop = asyncio.get_running_loop()
-        info("已保存主事件循环引用", source="monitor_api")
-    except RuntimeError:
-        pass
+    # 记录分发事件的事件循环
+    monitor_hub.bind_loop(asyncio.get_running_loop())
     
     button_id = request.button_id
     action = request.action
@@ -90,12 +163,15 @@ async def control_monitor(request: MonitorRequest) -> MonitorResponse:
     info(f"监听控制请求: button_id={button_id}, action={action}", source="monitor_api")
     
     if action == "start":
-        # 创建事件队列
-        if button_id not in button_events:
-            button_events[button_id] = asyncio.Queue()
+        # 设置过滤条件（未指定时清除之前的条件）
+        monitor_hub.set_filter(button_id, request.filter.to_change_filter() if request.filter else None)
         
-        # 开始监听
-        clipboard_monitor.start_monitoring(button_id, on_clipboard_change)
+        # 开始监听，宽限期内没有 SSE 连接时自动暂停
+        monitor_configs[button_id] = request
+        _start_monitoring(request)
+        if request.stream_id:
+            monitor_hub.stream_add(request.stream_id, button_id)
+        monitor_hub.expect(button_id)
         
         return MonitorResponse(
             status="success",
@@ -106,11 +182,12 @@ async def control_monitor(request: MonitorRequest) -> MonitorResponse:
     
     elif action == "stop":
         # 停止监听
+        monitor_configs.pop(button_id, None)
+        if request.stream_id:
+            monitor_hub.stream_remove(request.stream_id, button_id)
         clipboard_monitor.stop_monitoring(button_id)
-        
-        # 清理事件队列
-        if button_id in button_events:
-            del button_events[button_id]
+        monitor_hub.set_filter(button_id, None)
+        monitor_hub.release(button_id)
         
         return MonitorResponse(
             status="success",
@@ -126,59 +203,137 @@ async def control_monitor(request: MonitorRequest) -> MonitorResponse:
 async def get_monitor_status(button_id: str) -> dict:
     """获取监听状态"""
     is_monitoring = clipboard_monitor.is_monitoring(button_id)
+    change_filter = monitor_hub.get_filter(button_id)
     return {
         "status": "success",
         "button_id": button_id,
-        "is_monitoring": is_monitoring
+        "is_monitoring": is_monitoring,
+        "suspended": button_id in monitor_configs and not is_monitoring,
+        "subscribers": monitor_hub.subscriber_count(button_id),
+        "filter": change_filter.to_dict() if change_filter else None
     }
 
 
 @router.get("/active")
 async def get_active_monitors() -> dict:
-    """获取所有活动的监听"""
+    """获取所有活动的监听、每个按钮的 SSE 订阅数和轮询线程状态"""
     monitors = clipboard_monitor.get_active_monitors()
+    subscribers = monitor_hub.subscriber_counts()
     return {
         "status": "success",
         "monitors": monitors,
-        "count": len(monitors)
+        "count": len(monitors),
+        "subscribers": subscribers,
+        "subscriber_count": sum(subscribers.values()),
+        "suspended": [button_id for button_id in monitor_configs if button_id not in monitors],
+        "grace_pending": monitor_hub.grace_pending(),
+        "poller": clipboard_monitor.get_poller_state(),
+        "hub": monitor_hub.stats()
     }
 
 
+def _parse_event_id(value: Optional[str]) -> Optional[int]:
+    """解析客户端传回的事件 ID，无效时返回 None"""
+    if not value:
+        return None
+    try:
+        return int(value.strip())
+    except ValueError:
+        return None
+
+
+async def _sse_messages(subscription: Subscription, connected: dict, label: str) -> AsyncGenerator[str, None]:
+    """
+    把订阅中的事件格式化为 SSE 消息
+    事件带 id: 字段；心跳由所有连接共用的定时任务触发，不带 id
+    开启了内容推送的按钮，文本变化在这里按本连接上一次实际发送的文本生成推送内容，
+    被过滤或合并掉的变化不会改变差异基准
+    """
+    pusher = ClipboardPusher()
+    # 发送重连间隔和连接确认
+    yield f"retry: {SSE_RETRY_MS}\n"
+    yield f"data: {json.dumps(connected)}\n\n"
+    
+    try:
+        while True:
+            item = await subscription.get()
+            if item is None:
+                # 同一连接 ID 建立了新连接，旧连接结束
+                info(f"SSE连接被新连接替换: {label}", source="monitor_api")
+                break
+            event_id, event, change = item
+            if event_id is None:
+                yield f"data: {json.dumps(event)}\n\n"
+                continue
+            if change is not None:
+                config = monitor_configs.get(event.get("button_id"))
+                if config is not None and config.push_content:
+                    content = pusher.payload(change)
+                    if content is not None:
+                        event = dict(event, content=content)
+            debug(f"发送SSE事件: {event_id} {event.get('type')} {event.get('button_id')}", source="monitor_api")
+            yield f"id: {event_id}\ndata: {json.dumps(event)}\n\n"
+    except asyncio.CancelledError:
+        info(
+            f"SSE连接关闭: {label}, 合并事件: {subscription.coalesced}, 丢弃事件: {subscription.dropped}",
+            source="monitor_api"
+        )
+    finally:
+        monitor_hub.unsubscribe(subscription)
+
+
 @router.get("/events/{button_id}")
-async def get_events(button_id: str) -> StreamingResponse:
-    """SSE端点：获取指定按钮的事件流"""
+async def get_events(
+    button_id: str,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    last_event_id_query: Optional[str] = Query(None, alias="last_event_id", description="手动重连时传入最后收到的事件 ID")
+) -> StreamingResponse:
+    """
+    SSE端点：获取指定按钮的事件流
+    事件带 id: 字段，浏览器自动重连时通过 Last-Event-ID 请求头补发断线期间的事件
+    """
+    
+    monitor_hub.bind_loop(asyncio.get_running_loop())
+    resume_from = _parse_event_id(last_event_id or last_event_id_query)
     
     async def event_generator() -> AsyncGenerator[str, None]:
-        info(f"SSE连接建立: {button_id}", source="monitor_api")
-        
-        # 确保队列存在
-        if button_id not in button_events:
-            button_events[button_id] = asyncio.Queue()
-        
-        queue = button_events[button_id]
-        
-        # 发送连接确认
-        yield f"data: {json.dumps({'type': 'connected', 'button_id': button_id})}\n\n"
-        
-        try:
-            while True:
-                try:
-                    # 等待事件，超时30秒发送心跳
-                    event = await asyncio.wait_for(queue.get(), timeout=30)
-                    info(f"发送SSE事件: {event}", source="monitor_api")
-                    yield f"data: {json.dumps(event)}\n\n"
-                except asyncio.TimeoutError:
-                    # 发送心跳
-                    yield f"data: {json.dumps({'type': 'heartbeat'})}\n\n"
-        except asyncio.CancelledError:
-            info(f"SSE连接关闭: {button_id}", source="monitor_api")
-    
-    return StreamingResponse(
-        event_generator(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no"
-        }
-    )
+        # 每个连接单独订阅，同一按钮的多个连接都能收到事件
+        subscription = monitor_hub.subscribe(button_id, last_event_id=resume_from)
+        info(
+            f"SSE连接建立: {button_id}, 订阅数: {monitor_hub.subscriber_count(button_id)}, "
+            f"Last-Event-ID: {resume_from}",
+            source="monitor_api"
+        )
+        connected = {'type': 'connected', 'button_id': button_id}
+        async for message in _sse_messages(subscription, connected, button_id):
+            yield message
+    
+    return StreamingResponse(event_generator(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.get("/stream")
+async def get_stream(
+    stream_id: str = Query(..., description="客户端生成的连接 ID，开始监听时通过 /control 的 stream_id 订阅按钮"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    last_event_id_query: Optional[str] = Query(None, alias="last_event_id", description="手动重连时传入最后收到的事件 ID")
+) -> StreamingResponse:
+    """
+    多路复用SSE端点：一个客户端只用一个连接接收所有监听按钮的事件
+    按钮通过 /control（带 stream_id）添加和移除，每个事件都带 button_id；
+    重连后自动恢复之前订阅的按钮，并通过 Last-Event-ID 补发断线期间的事件
+    """
+    if not STREAM_ID_PATTERN.match(stream_id):
+        raise HTTPException(status_code=400, detail="连接 ID 只能包含字母、数字和 ._-，最长 64 个字符")
+    
+    monitor_hub.bind_loop(asyncio.get_running_loop())
+    resume_from = _parse_event_id(last_event_id or last_event_id_query)
+    
+    async def event_generator() -> AsyncGenerator[str, None]:
+        subscription = monitor_hub.open_stream(stream_id, last_event_id=resume_from)
+        buttons = sorted(subscription.button_ids)
+        info(f"多路复用SSE连接建立: {stream_id}, 按钮: {buttons}, Last-Event-ID: {resume_from}", source="monitor_api")
+        connected = {'type': 'connected', 'stream_id': stream_id, 'buttons': buttons}
+        async for message in _sse_messages(subscription, connected, f"stream {stream_id}"):
+            yield message
+    
+    return StreamingResponse(event_generator(), media_type="text/event-stream", headers=SSE_HEADERS)
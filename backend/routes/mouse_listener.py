@@ -80,8 +80,9 @@ def load_mappings():
         # 按序列长度降序排序（长序列优先匹配）
         sequence_mappings.sort(key=lambda x: len(x['sequence']), reverse=True)
         
-        app_logger.info(f"加载了 {len(button_mappings)} 个单键映射: {button_mappings}", source="mouse_listener")
-        app_logger.info(f"加载了 {len(sequence_mappings)} 个序列映射: {[m['sequence'] for m in sequence_mappings]}", source="mouse_listener")
+        app_logger.infof("加载了 %d 个单键映射: %s", len(button_mappings), button_mappings, source="mouse_listener")
+        if app_logger.is_enabled_for("INFO", "mouse_listener"):
+            app_logger.info(f"加载了 {len(sequence_mappings)} 个序列映射: {[m['sequence'] for m in sequence_mappings]}", source="mouse_listener")
     except Exception as e:
         app_logger.error(f"加载映射失败: {e}", source="mouse_listener")
         button_mappings = {}
@@ -261,7 +262,7 @@ def execute_shortcut(shortcut: str):
             app_logger.error(f"快捷键解析失败: {shortcut}", source="mouse_listener")
             return
         
-        app_logger.info(f"执行快捷键: {shortcut}", source="mouse_listener")
+        app_logger.infof("执行快捷键: %s", shortcut, source="mouse_listener")
         
         for mod in modifiers:
             keyboard_controller.press(mod)
@@ -272,7 +273,7 @@ def execute_shortcut(shortcut: str):
         for mod in reversed(modifiers):
             keyboard_controller.release(mod)
             
-        app_logger.info(f"快捷键执行完成: {shortcut}", source="mouse_listener")
+        app_logger.infof("快捷键执行完成: %s", shortcut, source="mouse_listener")
         
     except Exception as e:
         app_logger.error(f"执行快捷键失败: {e}", source="mouse_listener")
@@ -312,7 +313,7 @@ def execute_pending_single_key():
     
     if pending_single_key:
         key_type, action, _ = pending_single_key
-        app_logger.info(f"执行单键操作: {key_type} -> {action}", source="mouse_listener")
+        app_logger.infof("执行单键操作: %s -> %s", key_type, action, source="mouse_listener")
         execute_shortcut_fast(action)
         pending_single_key = None
     
@@ -360,7 +361,8 @@ def handle_mouse_button(button_number: int) -> bool:
         if matched_action:
             # 完全匹配序列，取消待处理的单键，执行序列动作
             cancel_pending_single_key()
-            app_logger.info(f"序列匹配: {[h[0] for h in key_history]} -> {matched_action}", source="mouse_listener")
+            if app_logger.is_enabled_for("INFO", "mouse_listener"):
+                app_logger.info(f"序列匹配: {[h[0] for h in key_history]} -> {matched_action}", source="mouse_listener")
             execute_shortcut_fast(matched_action)
             key_history = []  # 清空历史
             return True
@@ -375,7 +377,7 @@ def handle_mouse_button(button_number: int) -> bool:
                 pending_single_key = (button_type, action, current_time)
                 pending_timer = threading.Timer(SINGLE_KEY_DELAY, execute_pending_single_key)
                 pending_timer.start()
-                app_logger.info(f"按键 {button_type} 可能是序列前缀，延迟 {SINGLE_KEY_DELAY}s 执行单键操作", source="mouse_listener")
+                app_logger.infof("按键 %s 可能是序列前缀，延迟 %ss 执行单键操作", button_type, SINGLE_KEY_DELAY, source="mouse_listener")
             
             return True  # 阻止默认行为，等待序列完成
     
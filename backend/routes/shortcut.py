@@ -14,7 +14,7 @@ import os
 
 # 添加utils目录到路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.logger import info, error
+from utils.logger import error, debugf, infof
 from utils.platform_utils import get_platform, CURRENT_PLATFORM, MODIFIER_KEY_MAP
 
 # 创建路由器实例
@@ -192,7 +192,7 @@ def execute_shortcut(shortcut_str):
         if not keys:
             raise ValueError("快捷键解析结果为空")
         
-        info(f"解析得到的按键: {keys}", "shortcut")
+        debugf("解析得到的按键: %s", keys, source="shortcut")
         
         # 执行快捷键
         try:
@@ -235,12 +235,12 @@ async def execute_shortcut_endpoint(request: ShortcutRequest):
         # 转换为小写格式
         shortcut_str = request.shortcut.strip().lower()
         
-        info(f"执行快捷键: {shortcut_str} (类型: {request.action_type})", "shortcut")
+        infof("执行快捷键: %s (类型: %s)", shortcut_str, request.action_type, source="shortcut")
         
         # 执行快捷键
         execute_shortcut(shortcut_str)
         
-        info(f"快捷键执行成功: {shortcut_str}", "shortcut")
+        infof("快捷键执行成功: %s", shortcut_str, source="shortcut")
         
         return ShortcutResponse(
             status="success",
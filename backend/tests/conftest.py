@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试配置：把 backend 目录加入路径，与应用中 from utils.x import ... 的写法一致
+导入 utils.logger 等模块时会创建全局日志器和数据目录，这里在任何测试模块导入之前
+把 config 中的日志和数据目录指向临时目录，测试不会读写仓库中的 logs/ 和 data/
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+_TEST_ROOT = tempfile.mkdtemp(prefix="kpsr-tests-")
+config.LOGS_DIR = os.path.join(_TEST_ROOT, "logs")
+config.DATA_DIR = os.path.join(_TEST_ROOT, "data")
+os.makedirs(config.LOGS_DIR, exist_ok=True)
+os.makedirs(config.DATA_DIR, exist_ok=True)
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""剪贴板变化过滤测试"""
+
+import pytest
+
+from utils.clipboard_change import ChangeFilter, FILTER_TEXT_LIMIT, KIND_IMAGE, ClipboardChange
+from utils.clipboard_snapshot import ClipboardSnapshot
+
+
+def _text_change(text):
+    return ClipboardChange.from_snapshot(ClipboardSnapshot.from_text(text))
+
+
+@pytest.mark.parametrize("pattern", [r"^https?://\S+", r"\d{3}-\d{4}", r"error|warn", r"foo.*bar"])
+def test_common_patterns_are_accepted(pattern):
+    ChangeFilter(text_pattern=pattern)
+
+
+@pytest.mark.parametrize("pattern", [r"(a+)+$", r"(a|aa)*b", r"(a?){20}", r".*.*x", r"(\w)\1"])
+def test_patterns_that_may_backtrack_are_rejected(pattern):
+    with pytest.raises(ValueError):
+        ChangeFilter(text_pattern=pattern)
+
+
+def test_pattern_only_matches_text_prefix():
+    change_filter = ChangeFilter(text_pattern="needle")
+    assert change_filter.matches(_text_change("needle" + "x" * FILTER_TEXT_LIMIT))
+    assert not change_filter.matches(_text_change("x" * FILTER_TEXT_LIMIT + "needle"))
+
+
+def test_pattern_without_kinds_only_receives_text():
+    change_filter = ChangeFilter(text_pattern="x")
+    assert not change_filter.matches(ClipboardChange(KIND_IMAGE, 10, "h"))
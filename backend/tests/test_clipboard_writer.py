@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""剪贴板写入线程测试"""
+
+import asyncio
+import threading
+
+from utils.clipboard_backend import MemoryClipboardBackend
+from utils.clipboard_writer import WRITE_COALESCED, WRITE_WRITTEN, ClipboardWriter
+
+
+class BlockingBackend(MemoryClipboardBackend):
+    """第一次写入时阻塞，直到测试放行"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.writes = []
+
+    def write(self, text: str) -> None:
+        self.started.set()
+        self.release.wait(5)
+        self.writes.append(text)
+        super().write(text)
+
+
+def test_cancelled_waiter_in_coalesced_batch_does_not_stop_writer():
+    backend = BlockingBackend()
+    writer = ClipboardWriter(backend)
+
+    async def scenario():
+        first = asyncio.ensure_future(writer.write("first"))
+        assert await asyncio.get_running_loop().run_in_executor(None, backend.started.wait, 5)
+
+        # 写入线程忙时提交的两次请求合并为一批，其中一个客户端断开
+        cancelled = asyncio.ensure_future(writer.write("second"))
+        latest = asyncio.ensure_future(writer.write("third"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        backend.release.set()
+
+        assert await asyncio.wait_for(first, 5) == WRITE_WRITTEN
+        assert await asyncio.wait_for(latest, 5) == WRITE_WRITTEN
+        assert cancelled.cancelled()
+
+        # 写入线程仍然存活，之后的写入正常完成
+        assert await asyncio.wait_for(writer.write("fourth"), 5) == WRITE_WRITTEN
+
+    asyncio.run(scenario())
+    assert backend.writes == ["first", "third", "fourth"]
+    assert writer._thread.is_alive()
+
+
+def test_rapid_writes_are_coalesced_to_latest():
+    backend = BlockingBackend()
+    writer = ClipboardWriter(backend)
+
+    async def scenario():
+        first = asyncio.ensure_future(writer.write("first"))
+        assert await asyncio.get_running_loop().run_in_executor(None, backend.started.wait, 5)
+        pending = [asyncio.ensure_future(writer.write(f"text {i}")) for i in range(5)]
+        await asyncio.sleep(0)
+        backend.release.set()
+        await asyncio.wait_for(first, 5)
+        return await asyncio.wait_for(asyncio.gather(*pending), 5)
+
+    results = asyncio.run(scenario())
+    assert results == [WRITE_COALESCED] * 4 + [WRITE_WRITTEN]
+    assert backend.writes == ["first", "text 4"]
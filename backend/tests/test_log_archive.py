@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""日志归档分页测试"""
+
+import json
+
+from utils.log_archive import LogArchive
+
+
+def _archive(tmp_path, segment_bytes=1024 * 1024):
+    return LogArchive(tmp_path, prefix="t", max_segment_bytes=segment_bytes,
+                      max_total_bytes=1 << 30, max_age_days=365)
+
+
+def _fill(archive, timestamps):
+    entries = [{"timestamp": ts, "level": "INFO", "source": "backend", "message": f"m{i}"}
+               for i, ts in enumerate(timestamps)]
+    archive.append([(e["timestamp"], json.dumps(e)) for e in entries])
+    return [e["message"] for e in entries]
+
+
+def _page_all(archive, limit, before_time=None, before_skip=0, **kwargs):
+    pages = []
+    position = (before_time, before_skip, None)
+    while True:
+        logs, position = archive.query(
+            limit,
+            before_time=position[0] or None,
+            before_skip=position[1],
+            before_segment=position[2],
+            **kwargs
+        )
+        pages.append([e["message"] for e in logs])
+        if position is None:
+            return pages
+
+
+def test_pages_do_not_skip_entries_sharing_a_timestamp(tmp_path):
+    archive = _archive(tmp_path)
+    timestamps = ["2026-01-01T10:00:00"] * 3 + ["2026-01-01T10:00:01"] * 7 + ["2026-01-01T10:00:02"] * 2
+    messages = _fill(archive, timestamps)
+    pages = _page_all(archive, 3)
+    returned = [m for page in reversed(pages) for m in page]
+    assert returned == messages
+
+
+def test_ties_across_segments_and_segment_budget(tmp_path):
+    # 分段很小，同一秒的日志分布在多个分段中
+    archive = _archive(tmp_path, segment_bytes=200)
+    messages = _fill(archive, ["2026-01-01T10:00:00"] * 20)
+    archive.close()
+    pages = _page_all(archive, 4, max_segments=2)
+    returned = [m for page in reversed(pages) for m in page]
+    assert returned == messages
+
+
+def test_skip_entries_already_returned_from_memory(tmp_path):
+    archive = _archive(tmp_path)
+    messages = _fill(archive, ["2026-01-01T10:00:00"] * 5 + ["2026-01-01T10:00:01"] * 2)
+    # 内存中保存了最后 3 条：10:00:00 上的最后 1 条和 10:00:01 的 2 条
+    pages = _page_all(archive, 2, before_time="2026-01-01T10:00:00", before_skip=1)
+    returned = [m for page in reversed(pages) for m in page]
+    assert returned == messages[:4]
+    exported = [e["message"] for e in archive.iter_entries(before_time="2026-01-01T10:00:00", before_skip=1)]
+    assert exported == messages[:4]
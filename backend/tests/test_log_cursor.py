@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""日志游标测试"""
+
+import pytest
+
+from utils import log_store
+from utils.log_store import StaleCursorError, decode_cursor, encode_cursor
+from utils.logger import app_logger
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(42)) == 42
+
+
+def test_cursor_from_previous_process_is_stale():
+    old = log_store._encode("log", "0.2641")
+    with pytest.raises(StaleCursorError):
+        decode_cursor(old)
+    # 没有纪元的旧格式游标同样视为失效
+    with pytest.raises(StaleCursorError):
+        decode_cursor(log_store._encode("log", "2641"))
+
+
+def test_tail_restarts_from_latest_for_stale_or_future_cursor():
+    latest = app_logger.latest_cursor()
+    assert app_logger.resolve_tail_cursor(log_store._encode("log", "0.2641")) == (latest, True)
+    future = encode_cursor(app_logger.store.last_seq + 1000)
+    assert app_logger.resolve_tail_cursor(future) == (latest, True)
+    assert app_logger.resolve_tail_cursor(latest) == (latest, False)
+    with pytest.raises(ValueError):
+        app_logger.resolve_tail_cursor("not a cursor")
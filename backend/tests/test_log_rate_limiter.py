@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""日志限流测试"""
+
+import time
+
+from utils.logger import LogRateLimiter
+
+SITE = ("routes/example.py", 42)
+
+
+def _feed(limiter, messages, level="INFO", request_id=None):
+    """依次检查消息，返回被记录的消息和补记的合并记录"""
+    emitted, summaries = [], []
+    for message in messages:
+        emit, pending = limiter.check(SITE, level, message, "backend", request_id)
+        summaries.extend(pending)
+        if emit:
+            emitted.append(message)
+    return emitted, summaries
+
+
+def test_distinct_messages_are_not_suppressed_by_default():
+    limiter = LogRateLimiter(window=60)
+    messages = [f"msg {i}" for i in range(30)]
+    emitted, summaries = _feed(limiter, messages)
+    assert emitted == messages
+    assert summaries == []
+    assert limiter.sweep() == []
+
+
+def test_identical_messages_are_coalesced():
+    limiter = LogRateLimiter(window=60)
+    emitted, summaries = _feed(limiter, ["same"] * 5 + ["other"])
+    assert emitted == ["same", "other"]
+    # 消息改变时补记上一条消息的重复次数
+    assert len(summaries) == 1
+    level, message, source, extra = summaries[0]
+    assert message == "same [窗口内重复 4 次]"
+    assert extra["repeat_count"] == 4
+
+
+def test_identical_messages_from_different_requests_are_kept():
+    limiter = LogRateLimiter(window=60)
+    assert limiter.check(SITE, "INFO", "same", "backend", "req-1")[0]
+    assert limiter.check(SITE, "INFO", "same", "backend", "req-2")[0]
+
+
+def test_burst_cap_is_opt_in_and_does_not_blame_one_message():
+    limiter = LogRateLimiter(window=0.01, burst=10)
+    emitted, _ = _feed(limiter, [f"msg {i}" for i in range(30)])
+    assert emitted == [f"msg {i}" for i in range(10)]
+
+    time.sleep(0.02)
+    summaries = limiter.sweep()
+    assert len(summaries) == 1
+    level, message, source, extra = summaries[0]
+    assert message == "该位置在窗口内另有 20 条日志被抑制"
+    assert "msg" not in message
+    assert extra["suppressed_count"] == 20
+
+
+def test_burst_cap_does_not_apply_to_errors():
+    limiter = LogRateLimiter(window=60, burst=2)
+    emitted, _ = _feed(limiter, [f"err {i}" for i in range(5)], level="ERROR")
+    assert len(emitted) == 5
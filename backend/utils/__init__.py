@@ -14,8 +14,21 @@ utils 工具包
 
 __all__ = [
     'logger',
+    'log_store',
+    'log_archive',
+    'log_sqlite',
     'platform_utils',
+    'poll_scheduler',
+    'clipboard_backend',
+    'clipboard_snapshot',
+    'clipboard_change',
+    'clipboard_push',
+    'clipboard_writer',
+    'clipboard_history',
+    'screenshot_watcher',
     'clipboard_monitor',
+    'monitor_hub',
     'shortcut_storage',
     'log_reader',
+    'request_context',
 ]
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+剪贴板后端模块
+把剪贴板访问拆成三个操作：
+- change_token(): 廉价的变化标记（如 NSPasteboard.changeCount），不读取内容
+- read(): 读取剪贴板文本（UTF-8 字节）
+- write(): 写入剪贴板文本
+另外 read_image() 在剪贴板中没有文本时读取图片（PNG）
+监听器只在变化标记改变时才读取和计算哈希
+"""
+
+import os
+import sys
+import shutil
+import subprocess
+import threading
+from typing import Hashable, List, Optional
+
+# 外部命令超时（秒）
+COMMAND_TIMEOUT = 1.0
+
+
+class ClipboardBackend:
+    """剪贴板后端接口"""
+
+    name = "base"
+
+    def change_token(self) -> Optional[Hashable]:
+        """
+        返回剪贴板的变化标记，内容变化后标记一定不同
+        无法廉价获取时返回 None，调用方需要读取内容比较
+        """
+        return None
+
+    def read(self) -> Optional[bytes]:
+        """读取剪贴板文本（UTF-8 字节），失败时返回 None"""
+        raise NotImplementedError
+
+    def write(self, text: str) -> None:
+        """写入剪贴板文本，失败时抛出异常"""
+        raise NotImplementedError
+
+    def read_image(self) -> Optional[bytes]:
+        """读取剪贴板中的图片（PNG 字节），没有图片或不支持时返回 None"""
+        return None
+
+    def write_image(self, data: bytes) -> None:
+        """写入图片（PNG 字节），失败或不支持时抛出异常"""
+        raise NotImplementedError(f"{self.name} 剪贴板后端不支持写入图片")
+
+    def read_text(self) -> str:
+        """读取剪贴板文本（字符串）"""
+        content = self.read()
+        return content.decode("utf-8", errors="replace") if content else ""
+
+    def close(self) -> None:
+        """释放后端占用的资源"""
+
+
+def _run(args: List[str], input_bytes: Optional[bytes] = None, capture: bool = True) -> bytes:
+    """运行剪贴板命令，失败时抛出异常"""
+    result = subprocess.run(
+        args,
+        input=input_bytes,
+        stdout=subprocess.PIPE if capture else subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        timeout=COMMAND_TIMEOUT,
+        check=True
+    )
+    return result.stdout or b""
+
+
+class MacClipboardBackend(ClipboardBackend):
+    """
+    macOS 剪贴板
+    优先通过 AppKit 直接访问 NSPasteboard（changeCount 不需要读取内容，也不需要创建进程）；
+    未安装 pyobjc-framework-Cocoa 时退回 pbpaste/pbcopy，此时没有变化标记
+    """
+
+    name = "mac"
+
+    def __init__(self) -> None:
+        self._pasteboard = None
+        self._string_type = None
+        self._appkit = None
+        try:
+            import AppKit
+            from AppKit import NSPasteboard, NSPasteboardTypeString
+            self._pasteboard = NSPasteboard.generalPasteboard()
+            self._string_type = NSPasteboardTypeString
+            self._appkit = AppKit
+        except ImportError:
+            pass
+        # pbcopy/pbpaste 按区域设置编码，固定为 UTF-8
+        self._env = dict(os.environ, LANG="en_US.UTF-8")
+
+    def change_token(self) -> Optional[Hashable]:
+        if self._pasteboard is None:
+            return None
+        return int(self._pasteboard.changeCount())
+
+    def read(self) -> Optional[bytes]:
+        if self._pasteboard is not None:
+            text = self._pasteboard.stringForType_(self._string_type)
+            return str(text).encode("utf-8") if text is not None else b""
+        result = subprocess.run(
+            ["pbpaste"],
+            capture_output=True,
+            timeout=COMMAND_TIMEOUT,
+            env=self._env
+        )
+        return result.stdout
+
+    def write(self, text: str) -> None:
+        if self._pasteboard is not None:
+            self._pasteboard.clearContents()
+            if not self._pasteboard.setString_forType_(text, self._string_type):
+                raise RuntimeError("写入剪贴板失败")
+            return
+        subprocess.run(
+            ["pbcopy"],
+            input=text.encode("utf-8"),
+            timeout=COMMAND_TIMEOUT,
+            env=self._env,
+            check=True
+        )
+
+    def read_image(self) -> Optional[bytes]:
+        if self._pasteboard is None:
+            return None
+        appkit = self._appkit
+        data = self._pasteboard.dataForType_(appkit.NSPasteboardTypePNG)
+        if data is None:
+            # 部分应用只提供 TIFF，转换为 PNG
+            tiff = self._pasteboard.dataForType_(appkit.NSPasteboardTypeTIFF)
+            if tiff is None:
+                return None
+            image_rep = appkit.NSBitmapImageRep.imageRepWithData_(tiff)
+            if image_rep is None:
+                return None
+            data = image_rep.representationUsingType_properties_(appkit.NSBitmapImageFileTypePNG, {})
+            if data is None:
+                return None
+        return bytes(data)
+
+    def write_image(self, data: bytes) -> None:
+        if self._pasteboard is None:
+            raise NotImplementedError("未安装 pyobjc-framework-Cocoa，无法写入图片")
+        appkit = self._appkit
+        self._pasteboard.clearContents()
+        ns_data = appkit.NSData.dataWithBytes_length_(data, len(data))
+        if not self._pasteboard.setData_forType_(ns_data, appkit.NSPasteboardTypePNG):
+            raise RuntimeError("写入剪贴板失败")
+
+
+class LinuxClipboardBackend(ClipboardBackend):
+    """
+    Linux 剪贴板（Wayland 使用 wl-clipboard，X11 使用 xclip）
+    变化标记由后台线程维护的序号提供：
+    - Wayland: wl-paste --watch 在剪贴板每次变化时输出一行
+    - X11: 安装了 clipnotify 时循环等待剪贴板变化；否则没有变化标记
+    """
+
+    name = "linux"
+
+    def __init__(self) -> None:
+        self.wayland = bool(os.environ.get("WAYLAND_DISPLAY")) and shutil.which("wl-paste") is not None
+        self._seq = 0
+        self._watching = False
+        self._watch_failed = False
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def _watch_command(self) -> Optional[List[str]]:
+        if self.wayland:
+            return ["wl-paste", "--watch", "echo"]
+        if shutil.which("clipnotify"):
+            return ["clipnotify"]
+        return None
+
+    def _watch_loop(self, command: List[str]) -> None:
+        """后台线程：每次剪贴板变化时序号加一，命令异常退出后停止提供变化标记"""
+        try:
+            if self.wayland:
+                # wl-paste --watch 常驻运行，每次变化输出一行
+                self._process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+                for _ in self._process.stdout:
+                    self._seq += 1
+            else:
+                # clipnotify 在剪贴板变化时退出，循环重新启动
+                while self._watching:
+                    self._process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                    if self._process.wait() != 0:
+                        break
+                    self._seq += 1
+        except Exception:
+            pass
+        if self._watching:
+            self._watch_failed = True
+
+    def change_token(self) -> Optional[Hashable]:
+        with self._lock:
+            if not self._watching and not self._watch_failed:
+                command = self._watch_command()
+                if command is None:
+                    self._watch_failed = True
+                else:
+                    self._watching = True
+                    threading.Thread(target=self._watch_loop, args=(command,), daemon=True).start()
+        if self._watch_failed:
+            return None
+        return self._seq
+
+    def read(self) -> Optional[bytes]:
+        if self.wayland:
+            args = ["wl-paste", "--no-newline", "--type", "text"]
+        else:
+            args = ["xclip", "-selection", "clipboard", "-out"]
+        try:
+            return _run(args)
+        except subprocess.CalledProcessError:
+            # 剪贴板为空时命令返回非零
+            return b""
+
+    def write(self, text: str) -> None:
+        if self.wayland:
+            args = ["wl-copy"]
+        else:
+            args = ["xclip", "-selection", "clipboard", "-in"]
+        # xclip/wl-copy 会留在后台提供剪贴板内容，不能等待其输出
+        _run(args, input_bytes=text.encode("utf-8"), capture=False)
+
+    def read_image(self) -> Optional[bytes]:
+        if self.wayland:
+            list_args = ["wl-paste", "--list-types"]
+            read_args = ["wl-paste", "--type", "image/png"]
+        else:
+            list_args = ["xclip", "-selection", "clipboard", "-target", "TARGETS", "-out"]
+            read_args = ["xclip", "-selection", "clipboard", "-target", "image/png", "-out"]
+        try:
+            if "image/png" not in _run(list_args).decode("utf-8", errors="replace").split():
+                return None
+            return _run(read_args) or None
+        except subprocess.CalledProcessError:
+            return None
+
+    def write_image(self, data: bytes) -> None:
+        if self.wayland:
+            args = ["wl-copy", "--type", "image/png"]
+        else:
+            args = ["xclip", "-selection", "clipboard", "-target", "image/png", "-in"]
+        _run(args, input_bytes=data, capture=False)
+
+    def close(self) -> None:
+        self._watching = False
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+
+
+class MemoryClipboardBackend(ClipboardBackend):
+    """内存剪贴板（用于测试和无图形界面的环境），每次写入序号加一"""
+
+    name = "memory"
+
+    def __init__(self, initial: str = "") -> None:
+        self._content = initial.encode("utf-8")
+        self._image: Optional[bytes] = None
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def change_token(self) -> Optional[Hashable]:
+        return self._seq
+
+    def read(self) -> Optional[bytes]:
+        with self._lock:
+            return self._content
+
+    def write(self, text: str) -> None:
+        with self._lock:
+            self._content = text.encode("utf-8")
+            self._image = None
+            self._seq += 1
+
+    def read_image(self) -> Optional[bytes]:
+        with self._lock:
+            return self._image
+
+    def write_image(self, data: bytes) -> None:
+        """写入图片（清空文本）"""
+        with self._lock:
+            self._content = b""
+            self._image = data
+            self._seq += 1
+
+
+_backend: Optional[ClipboardBackend] = None
+_backend_lock = threading.Lock()
+
+
+def create_clipboard_backend(name: Optional[str] = None) -> ClipboardBackend:
+    """
+    创建剪贴板后端
+    name 为空时读取环境变量 KPSR_CLIPBOARD_BACKEND（mac/linux/memory），仍为空时按当前平台选择
+    """
+    name = (name or os.environ.get("KPSR_CLIPBOARD_BACKEND", "")).lower()
+    if not name:
+        name = "mac" if sys.platform == "darwin" else "linux" if sys.platform.startswith("linux") else "memory"
+    if name == "mac":
+        return MacClipboardBackend()
+    if name == "linux":
+        return LinuxClipboardBackend()
+    if name == "memory":
+        return MemoryClipboardBackend()
+    raise ValueError(f"未知的剪贴板后端: {name}")
+
+
+def get_clipboard_backend() -> ClipboardBackend:
+    """全局剪贴板后端（首次调用时创建）"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_clipboard_backend()
+    return _backend
+
+
+def set_clipboard_backend(backend: ClipboardBackend) -> None:
+    """替换全局剪贴板后端（如测试时使用内存剪贴板）"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
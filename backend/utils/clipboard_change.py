@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+剪贴板变化分类模块
+轮询线程检测到变化后只分类一次（类型、大小、哈希、文本预览），
+之后按监听的过滤条件分发，不需要为每个监听者重新读取剪贴板
+"""
+
+import hashlib
+import os
+import re
+import time
+from typing import Dict, Iterable, Optional
+
+from utils.clipboard_snapshot import ClipboardSnapshot, KIND_IMAGE, KIND_TEXT
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_constants
+    import sre_parse
+
+# 变化类型：剪贴板文本、剪贴板图片、新截图文件
+KIND_SCREENSHOT = "screenshot"
+CHANGE_KINDS = (KIND_TEXT, KIND_IMAGE, KIND_SCREENSHOT)
+
+PREVIEW_LENGTH = 80  # 文本预览的最大字符数
+FILTER_TEXT_LIMIT = 2048  # 正则过滤只匹配文本开头的这么多字符
+MAX_FILTER_PATTERN_LENGTH = 200  # 过滤正则的最大长度
+# 过滤正则在每个起始位置估计的最多尝试次数（各个可变重复的可选次数之积，不限次数的重复按 FILTER_TEXT_LIMIT 计）
+# 最多允许一个不限次数的重复（如 .* 或 \S+）再加少量可选项，匹配耗时有上限，不会阻塞轮询线程
+MAX_FILTER_COST = 4 * FILTER_TEXT_LIMIT
+
+_REPEAT_OPS = tuple(
+    getattr(sre_constants, name)
+    for name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT")
+    if hasattr(sre_constants, name)
+)
+_ATOMIC_GROUP = getattr(sre_constants, "ATOMIC_GROUP", None)
+
+
+class ClipboardChange:
+    """一次剪贴板变化或新截图的分类结果（创建后不再修改）"""
+
+    __slots__ = ("kind", "size", "hash", "preview", "path", "detected_at", "snapshot")
+
+    def __init__(
+        self,
+        kind: str,
+        size: int,
+        content_hash: Optional[str],
+        preview: str = "",
+        path: Optional[str] = None,
+        snapshot: Optional[ClipboardSnapshot] = None
+    ) -> None:
+        self.kind = kind
+        self.size = size
+        self.hash = content_hash
+        self.preview = preview
+        self.path = path  # 截图文件路径
+        self.detected_at = time.time()
+        self.snapshot = snapshot  # 剪贴板变化对应的快照
+
+    @classmethod
+    def from_snapshot(cls, snapshot: ClipboardSnapshot) -> "ClipboardChange":
+        """由剪贴板快照分类"""
+        preview = ""
+        if snapshot.kind == KIND_TEXT:
+            preview = " ".join(snapshot.text[:PREVIEW_LENGTH * 2].split())[:PREVIEW_LENGTH]
+        return cls(snapshot.kind, snapshot.size, snapshot.hash, preview, snapshot=snapshot)
+
+    @classmethod
+    def from_screenshot(cls, path: str) -> "ClipboardChange":
+        """由新截图文件分类（读取一次文件计算哈希）"""
+        md5 = hashlib.md5()
+        size = 0
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    md5.update(chunk)
+                    size += len(chunk)
+            content_hash: Optional[str] = md5.hexdigest()
+        except OSError:
+            content_hash = None
+        return cls(KIND_SCREENSHOT, size, content_hash, os.path.basename(path), path=path)
+
+    @property
+    def text(self) -> str:
+        """文本内容（非文本变化为空字符串）"""
+        if self.kind != KIND_TEXT or self.snapshot is None:
+            return ""
+        return self.snapshot.text
+
+    def to_dict(self) -> Dict[str, object]:
+        """事件中携带的分类信息"""
+        return {
+            "kind": self.kind,
+            "size": self.size,
+            "hash": self.hash,
+            "preview": self.preview,
+            "path": self.path,
+            "detected_at": self.detected_at
+        }
+
+
+def _pattern_cost(items, in_repeat: bool = False) -> int:
+    """
+    估计过滤正则在每个起始位置最多的尝试次数，超过 MAX_FILTER_COST 或包含可能回溯爆炸的写法时抛出 ValueError
+    不支持：嵌套的重复（如 (a+)+、(a?){20}）、重复的分支（如 (a|ab)*）、反向引用
+    """
+    cost = 1
+    for op, av in items:
+        if op in _REPEAT_OPS:
+            low, high, sub = av
+            variable = low != high
+            if in_repeat and variable:
+                raise ValueError("过滤正则不支持嵌套的重复")
+            cost *= _pattern_cost(sub, in_repeat or high > 1)
+            if variable:
+                unbounded = high == sre_constants.MAXREPEAT or high - low >= FILTER_TEXT_LIMIT
+                cost *= FILTER_TEXT_LIMIT if unbounded else high - low + 1
+        elif op == sre_constants.BRANCH:
+            if in_repeat:
+                raise ValueError("过滤正则不支持重复的分支")
+            cost *= sum(_pattern_cost(branch, in_repeat) for branch in av[1])
+        elif op == sre_constants.SUBPATTERN:
+            cost *= _pattern_cost(av[-1], in_repeat)
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            cost *= _pattern_cost(av[1], in_repeat)
+        elif _ATOMIC_GROUP is not None and op == _ATOMIC_GROUP:
+            cost *= _pattern_cost(av, in_repeat)
+        elif op in (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS):
+            raise ValueError("过滤正则不支持反向引用和条件分组")
+        if cost > MAX_FILTER_COST:
+            raise ValueError("过滤正则过于复杂（最多包含一个不限次数的重复，如 .* 或 \\S+）")
+    return cost
+
+
+class ChangeFilter:
+    """
+    监听的过滤条件
+    - kinds: 只接收这些类型的变化（text/image/screenshot），为空表示全部
+    - text_pattern: 文本变化需要匹配的正则；未指定 kinds 时只接收匹配的文本，
+      kinds 中包含其他类型时正则只作用于文本
+    正则在轮询线程上执行，创建时拒绝可能回溯爆炸的正则，匹配时只匹配文本开头的 FILTER_TEXT_LIMIT 个字符
+    """
+
+    def __init__(self, kinds: Optional[Iterable[str]] = None, text_pattern: Optional[str] = None) -> None:
+        self.kinds = frozenset(kinds) if kinds else None
+        if self.kinds is not None:
+            unknown = self.kinds.difference(CHANGE_KINDS)
+            if unknown:
+                raise ValueError(f"未知的变化类型: {', '.join(sorted(unknown))}")
+        self.text_pattern = text_pattern or None
+        self._regex = None
+        if self.text_pattern:
+            if len(self.text_pattern) > MAX_FILTER_PATTERN_LENGTH:
+                raise ValueError(f"过滤正则不能超过 {MAX_FILTER_PATTERN_LENGTH} 个字符")
+            try:
+                self._regex = re.compile(self.text_pattern)
+            except re.error as e:
+                raise ValueError(f"过滤正则无效: {e}")
+            _pattern_cost(sre_parse.parse(self.text_pattern))
+            if self.kinds is None:
+                self.kinds = frozenset((KIND_TEXT,))
+
+    @property
+    def is_empty(self) -> bool:
+        """是否不过滤任何变化"""
+        return self.kinds is None and self._regex is None
+
+    def matches(self, change: ClipboardChange) -> bool:
+        """变化是否满足过滤条件"""
+        if self.kinds is not None and change.kind not in self.kinds:
+            return False
+        if self._regex is not None and change.kind == KIND_TEXT:
+            return self._regex.search(change.text[:FILTER_TEXT_LIMIT]) is not None
+        return True
+
+    def to_dict(self) -> Dict[str, object]:
+        """过滤条件描述"""
+        return {
+            "kinds": sorted(self.kinds) if self.kinds is not None else None,
+            "text_pattern": self.text_pattern
+        }
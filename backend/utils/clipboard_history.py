@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+剪贴板历史模块
+由剪贴板监听器在每次变化时写入，内容按哈希寻址存储（重复复制只保存一份）：
+- 小内容直接保存在内存中
+- 大内容（如截图）写入 DATA_DIR/clipboard_history 下的文件并用 mmap 映射，不占用进程堆内存
+条目数和总字节数超出预算时按最近最少使用（LRU）淘汰
+"""
+
+import os
+import sys
+import mmap
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import DATA_DIR
+from utils.clipboard_snapshot import ClipboardSnapshot, KIND_EMPTY, KIND_TEXT
+
+# 历史配置
+HISTORY_MAX_ENTRIES = int(os.environ.get("KPSR_CLIPBOARD_HISTORY_ENTRIES", "100"))  # 最多保留的条目数
+HISTORY_MAX_BYTES = int(os.environ.get("KPSR_CLIPBOARD_HISTORY_BYTES", str(64 * 1024 * 1024)))  # 内容总字节数上限
+HISTORY_SPILL_THRESHOLD = 256 * 1024  # 超过此大小的内容写入文件并用 mmap 映射
+HISTORY_DIR = Path(DATA_DIR) / "clipboard_history"
+PREVIEW_LENGTH = 100  # 文本预览的最大字符数
+
+
+class HistoryEntry:
+    """一条剪贴板历史"""
+
+    __slots__ = ("hash", "kind", "mime", "size", "first_seen", "last_seen", "count", "preview",
+                 "_data", "_path", "_file", "_mmap")
+
+    def __init__(self, snapshot: ClipboardSnapshot) -> None:
+        self.hash = snapshot.hash
+        self.kind = snapshot.kind
+        self.mime = snapshot.mime
+        self.size = snapshot.size
+        self.first_seen = snapshot.captured_at
+        self.last_seen = snapshot.captured_at
+        self.count = 1
+        self.preview = snapshot.text[:PREVIEW_LENGTH] if snapshot.kind == KIND_TEXT else ""
+        self._data: Optional[bytes] = None
+        self._path: Optional[Path] = None
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+
+    @property
+    def spilled(self) -> bool:
+        """内容是否保存在文件中"""
+        return self._mmap is not None
+
+    def store(self, data: bytes, directory: Path) -> None:
+        """保存内容：小内容放在内存中，大内容写入文件后映射"""
+        if len(data) < HISTORY_SPILL_THRESHOLD:
+            self._data = data
+            return
+        path = directory / f"{self.hash}.bin"
+        with open(path, "wb") as f:
+            f.write(data)
+        self._path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read(self) -> bytes:
+        """读取内容"""
+        if self._mmap is not None:
+            return self._mmap[:]
+        return self._data or b""
+
+    def release(self) -> None:
+        """释放内容（关闭映射并删除文件）"""
+        self._data = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._path is not None:
+            try:
+                self._path.unlink()
+            except OSError:
+                pass
+            self._path = None
+
+    def to_dict(self) -> Dict[str, object]:
+        """条目元数据（不含内容）"""
+        return {
+            "hash": self.hash,
+            "kind": self.kind,
+            "mime": self.mime,
+            "size": self.size,
+            "preview": self.preview,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "count": self.count
+        }
+
+
+class ClipboardHistory:
+    """按哈希寻址、LRU 淘汰的剪贴板历史（线程安全）"""
+
+    def __init__(
+        self,
+        directory: Path = HISTORY_DIR,
+        max_entries: int = HISTORY_MAX_ENTRIES,
+        max_bytes: int = HISTORY_MAX_BYTES
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, HistoryEntry]" = OrderedDict()  # 最近使用的在末尾
+        self._total_bytes = 0
+        self._dir_ready = False
+        self._lock = threading.Lock()
+
+    def _ensure_dir(self) -> None:
+        """首次写入文件时创建目录，并删除上次运行留下的文件（历史索引只保存在内存中）"""
+        if self._dir_ready:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path in self.directory.glob("*.bin"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        self._dir_ready = True
+
+    def add(self, snapshot: ClipboardSnapshot) -> Optional[HistoryEntry]:
+        """记录一次剪贴板内容，已有相同内容时只更新使用时间和次数"""
+        if snapshot.kind == KIND_EMPTY:
+            return None
+        with self._lock:
+            entry = self._entries.get(snapshot.hash)
+            if entry is not None:
+                entry.last_seen = snapshot.captured_at
+                entry.count += 1
+                self._entries.move_to_end(snapshot.hash)
+                return entry
+            if snapshot.size > self.max_bytes:
+                return None
+
+            entry = HistoryEntry(snapshot)
+            if snapshot.size >= HISTORY_SPILL_THRESHOLD:
+                self._ensure_dir()
+            try:
+                entry.store(snapshot.data, self.directory)
+            except OSError as e:
+                from utils.logger import error
+                error(f"保存剪贴板历史失败: {e}", source="clipboard_history")
+                entry.release()
+                return None
+            self._entries[snapshot.hash] = entry
+            self._total_bytes += entry.size
+            self._evict()
+            return entry
+
+    def _evict(self) -> None:
+        """淘汰最久未使用的条目直到满足预算（调用方需持有锁），最新条目不会被淘汰"""
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.size
+            entry.release()
+
+    def list(self, limit: int = 50, kind: Optional[str] = None) -> List[Dict[str, object]]:
+        """按最近使用时间倒序列出条目"""
+        with self._lock:
+            result = []
+            for entry in reversed(self._entries.values()):
+                if kind and entry.kind != kind:
+                    continue
+                result.append(entry.to_dict())
+                if len(result) >= limit:
+                    break
+            return result
+
+    def get(self, content_hash: str) -> Optional[HistoryEntry]:
+        """按哈希获取条目"""
+        with self._lock:
+            return self._entries.get(content_hash)
+
+    def read(self, content_hash: str, touch: bool = False) -> Optional[bytes]:
+        """按哈希读取内容，touch 为 True 时视为一次使用"""
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            if entry is None:
+                return None
+            if touch:
+                entry.last_seen = time.time()
+                self._entries.move_to_end(content_hash)
+            return entry.read()
+
+    def clear(self) -> None:
+        """清空历史"""
+        with self._lock:
+            for entry in self._entries.values():
+                entry.release()
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, object]:
+        """历史统计"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "spilled": sum(1 for entry in self._entries.values() if entry.spilled),
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes
+            }
+
+
+# 全局单例
+clipboard_history = ClipboardHistory()
@@ -5,97 +5,170 @@
 用于检测剪贴板变化或截图完成，支持按需启动/停止
 """
 
-import hashlib
 import threading
 import time
-from typing import Callable, Optional, Dict, List
-import subprocess
+from typing import Callable, Optional, Dict, List, Hashable, Iterable, Tuple
 import platform
 import os
-import glob
 from pathlib import Path
 
+from utils.clipboard_backend import ClipboardBackend, get_clipboard_backend
+from utils.clipboard_snapshot import ClipboardSnapshot, capture_snapshot, clipboard_snapshot_cache
+from utils.clipboard_history import clipboard_history
+from utils.clipboard_change import ClipboardChange
+from utils.poll_scheduler import AdaptivePollScheduler
+from utils.screenshot_watcher import ScreenshotWatcher
+
+# 轮询间隔配置：有活动时按最短间隔轮询，空闲时逐渐放慢到最长间隔
+POLL_MIN_INTERVAL = float(os.environ.get("KPSR_POLL_MIN_INTERVAL", "0.2"))  # 最短轮询间隔（秒）
+POLL_MAX_INTERVAL = float(os.environ.get("KPSR_POLL_MAX_INTERVAL", "1.0"))  # 空闲时的最长轮询间隔（秒）
+POLL_BACKOFF = 1.5  # 空闲时每次轮询间隔的增长倍数
+POLL_HOT_PERIOD = 2.0  # 活动后保持最短间隔的时长（秒）
+
+# 截图监视配置：默认监视 Mac 桌面，可用环境变量覆盖，也可以在开始监听时按按钮指定
+# KPSR_SCREENSHOT_DIRS 用 os.pathsep 分隔多个目录，KPSR_SCREENSHOT_PATTERNS 用逗号分隔多个文件名模式
+SCREENSHOT_DIRS = tuple(
+    d for d in os.environ.get("KPSR_SCREENSHOT_DIRS", "").split(os.pathsep) if d
+) or (str(Path.home() / "Desktop"),)
+SCREENSHOT_PATTERNS = tuple(
+    p.strip() for p in os.environ.get("KPSR_SCREENSHOT_PATTERNS", "").split(",") if p.strip()
+) or ("Screenshot*.png", "屏幕截图*.png")  # Mac 截图文件名格式
+
+# 截图监视器的键: (目录, 文件名模式)
+WatchKey = Tuple[str, Tuple[str, ...]]
+
 
 class ClipboardMonitor:
     """剪贴板监听器"""
     
-    def __init__(self) -> None:
+    def __init__(self, backend: Optional[ClipboardBackend] = None) -> None:
+        self._backend: Optional[ClipboardBackend] = backend  # 为空时使用全局剪贴板后端
+        self._last_token: Optional[Hashable] = None  # 上次读取内容时的剪贴板变化标记
         self._running: bool = False
         self._thread: Optional[threading.Thread] = None
-        self._callbacks: Dict[str, Callable[[str], None]] = {}
+        self._callbacks: Dict[str, Callable[[str, ClipboardChange], None]] = {}
         self._last_hash: Optional[str] = None
-        self._last_screenshot_time: float = 0  # 上次检测到的最新截图时间
-        self._poll_interval: float = 0.2  # 轮询间隔（秒），更快检测
+        self._last_snapshot: Optional[ClipboardSnapshot] = None  # 最近一次检测到变化时的快照
+        self._watchers: Dict[WatchKey, ScreenshotWatcher] = {}  # 相同目录和模式的监听共享同一个监视器
+        self._button_watches: Dict[str, Tuple[WatchKey, ...]] = {}  # 按钮 -> 监视的目录和模式
+        self._scheduler = AdaptivePollScheduler(
+            POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, backoff=POLL_BACKOFF, hot_period=POLL_HOT_PERIOD
+        )
+        self._wake = threading.Event()  # 开始/停止监听时唤醒轮询线程
+        self._polls: int = 0  # 累计轮询次数
         self._lock: threading.Lock = threading.Lock()
         self._platform: str = 'mac'  # Mac专用
-        self._screenshot_dir: str = str(Path.home() / "Desktop")  # Mac 默认截图位置
+        self._screenshot_dirs: Tuple[str, ...] = SCREENSHOT_DIRS  # 未指定时监视的截图目录
+        self._screenshot_patterns: Tuple[str, ...] = SCREENSHOT_PATTERNS  # 未指定时的截图文件名模式
+    
+    @property
+    def backend(self) -> ClipboardBackend:
+        """剪贴板后端"""
+        if self._backend is None:
+            self._backend = get_clipboard_backend()
+        return self._backend
+    
+    def _get_change_token(self) -> Optional[Hashable]:
+        """获取剪贴板变化标记（不读取内容），失败或不支持时返回 None"""
+        try:
+            return self.backend.change_token()
+        except Exception:
+            return None
     
-    def _get_clipboard_content(self) -> Optional[bytes]:
-        """获取剪贴板内容（支持文本和图片）"""
+    def _capture_snapshot(self, token: Optional[Hashable]) -> Optional[ClipboardSnapshot]:
+        """读取剪贴板内容生成快照"""
         try:
-            # Mac: 使用 pbpaste
-            result = subprocess.run(
-                ['pbpaste'],
-                capture_output=True,
-                timeout=1
-            )
-            return result.stdout
+            return capture_snapshot(self.backend, token)
         except Exception as e:
             from utils.logger import error
             error(f"获取剪贴板内容失败: {e}", source="clipboard_monitor")
             return None
     
-    def _get_clipboard_hash(self) -> Optional[str]:
-        """获取剪贴板内容的哈希值"""
-        content = self._get_clipboard_content()
-        if content is None:
-            return None
-        return hashlib.md5(content).hexdigest()
+    def _reset_clipboard_state(self) -> None:
+        """记录当前剪贴板状态作为比较基准，并更新共享快照和历史"""
+        self._last_token = self._get_change_token()
+        snapshot = self._capture_snapshot(self._last_token)
+        self._last_hash = snapshot.hash if snapshot is not None else None
+        if snapshot is not None:
+            clipboard_snapshot_cache.update(snapshot)
+            clipboard_history.add(snapshot)
     
-    def _get_latest_screenshot_time(self) -> float:
-        """获取最新截图文件的修改时间"""
-        try:
-            # Mac 截图文件名格式: "Screenshot*.png" 或 "屏幕截图*.png"
-            patterns = [
-                os.path.join(self._screenshot_dir, "Screenshot*.png"),
-                os.path.join(self._screenshot_dir, "屏幕截图*.png"),
-            ]
-            
-            latest_time = 0.0
-            for pattern in patterns:
-                files = glob.glob(pattern)
-                for f in files:
-                    try:
-                        mtime = os.path.getmtime(f)
-                        if mtime > latest_time:
-                            latest_time = mtime
-                    except Exception:
-                        pass
-            
-            return latest_time
-        except Exception:
-            return 0.0
+    def _check_clipboard_changed(self) -> bool:
+        """
+        检查剪贴板内容是否变化
+        变化标记未改变时直接返回，不读取内容；标记改变（或后端不支持标记）时才读取并比较哈希，
+        内容变化时更新共享快照和历史
+        """
+        token = self._get_change_token()
+        if token is not None and token == self._last_token:
+            return False
+        snapshot = self._capture_snapshot(token)
+        if snapshot is None:
+            # 读取失败，下次重新读取
+            return False
+        self._last_token = token
+        if snapshot.hash == self._last_hash:
+            return False
+        self._last_hash = snapshot.hash
+        self._last_snapshot = snapshot
+        clipboard_snapshot_cache.update(snapshot)
+        clipboard_history.add(snapshot)
+        return True
     
-    def _check_new_screenshot(self) -> bool:
-        """检查是否有新的截图文件"""
-        current_time = self._get_latest_screenshot_time()
-        if current_time > self._last_screenshot_time:
-            return True
-        return False
+    def _watch_keys(
+        self,
+        screenshot_dirs: Optional[Iterable[str]],
+        screenshot_patterns: Optional[Iterable[str]]
+    ) -> Tuple[WatchKey, ...]:
+        """把监听的截图配置转换为监视器键，未指定时使用默认配置"""
+        dirs = list(screenshot_dirs) if screenshot_dirs is not None else list(self._screenshot_dirs)
+        patterns = tuple(screenshot_patterns) if screenshot_patterns is not None else self._screenshot_patterns
+        if not patterns:
+            return ()
+        keys = []
+        for directory in dirs:
+            key = (os.path.abspath(os.path.expanduser(directory)), patterns)
+            if key not in keys:
+                keys.append(key)
+        return tuple(keys)
+    
+    def _check_new_screenshots(self) -> Dict[WatchKey, ClipboardChange]:
+        """检查所有截图监视器，返回出现新截图的监视器键及分类结果（同一文件只分类一次）"""
+        from utils.logger import info
+        
+        with self._lock:
+            watchers = list(self._watchers.items())
+        
+        changed: Dict[WatchKey, ClipboardChange] = {}
+        by_path: Dict[str, ClipboardChange] = {}
+        for key, watcher in watchers:
+            if not watcher.ready:
+                # 新添加的监视器在轮询线程中记录基准，不在调用方（事件循环）中扫描目录
+                watcher.reset()
+                continue
+            old_time = watcher.baseline
+            if watcher.check_new():
+                path = watcher.latest_path or watcher.directory
+                if path not in by_path:
+                    info(f"📸 检测到新截图文件: {path}, 旧时间: {old_time}, 新时间: {watcher.baseline}", source="clipboard_monitor")
+                    by_path[path] = ClipboardChange.from_screenshot(path)
+                changed[key] = by_path[path]
+        return changed
     
     def _poll_loop(self) -> None:
         """轮询循环：同时检测剪贴板变化和新截图文件"""
-        from utils.logger import info, error
+        from utils.logger import debug, info, error
         
         info("========== 监听开始 ==========", source="clipboard_monitor")
         
-        # 记录初始状态
-        self._last_hash = self._get_clipboard_hash()
-        self._last_screenshot_time = self._get_latest_screenshot_time()
+        # 记录初始状态（截图监视器在首次检查时记录基准）
+        self._reset_clipboard_state()
         
+        info(f"剪贴板后端: {self.backend.name}, 初始变化标记: {self._last_token}", source="clipboard_monitor")
         info(f"初始剪贴板哈希: {self._last_hash}", source="clipboard_monitor")
-        info(f"初始截图时间: {self._last_screenshot_time}", source="clipboard_monitor")
-        info(f"截图目录: {self._screenshot_dir}", source="clipboard_monitor")
+        with self._lock:
+            watch_dirs = sorted({key[0] for key in self._watchers})
+        info(f"截图目录: {', '.join(watch_dirs) or '无'}", source="clipboard_monitor")
         
         poll_count = 0
         while self._running:
@@ -108,69 +181,100 @@ class ClipboardMonitor:
                         break
                 
                 poll_count += 1
-                detected_change = False
-                change_type = ""
+                self._polls += 1
                 
-                # 1. 检测剪贴板变化
-                current_hash = self._get_clipboard_hash()
-                if current_hash and current_hash != self._last_hash:
-                    info(f"🎉 检测到剪贴板变化!", source="clipboard_monitor")
-                    self._last_hash = current_hash
-                    detected_change = True
-                    change_type = "clipboard"
+                # 1. 检测剪贴板变化，变化时分类一次
+                clipboard_change: Optional[ClipboardChange] = None
+                if self._check_clipboard_changed() and self._last_snapshot is not None:
+                    clipboard_change = ClipboardChange.from_snapshot(self._last_snapshot)
+                    info(
+                        f"🎉 检测到剪贴板变化: {clipboard_change.kind}, {clipboard_change.size} 字节, "
+                        f"哈希 {clipboard_change.hash}",
+                        source="clipboard_monitor"
+                    )
                 
-                # 2. 检测新截图文件
-                current_screenshot_time = self._get_latest_screenshot_time()
-                if current_screenshot_time > self._last_screenshot_time:
-                    info(f"📸 检测到新截图文件!", source="clipboard_monitor")
-                    info(f"  旧时间: {self._last_screenshot_time}", source="clipboard_monitor")
-                    info(f"  新时间: {current_screenshot_time}", source="clipboard_monitor")
-                    self._last_screenshot_time = current_screenshot_time
-                    detected_change = True
-                    change_type = "screenshot" if not change_type else change_type + "+screenshot"
+                # 2. 检测新截图文件（目录未变化时只需一次 stat）
+                changed_watches = self._check_new_screenshots()
+                detected_change = clipboard_change is not None or bool(changed_watches)
                 
-                # 每5次轮询输出一次状态（约1秒一次）
+                # 每5次轮询输出一次状态
                 if poll_count % 5 == 0:
-                    info(f"⏳ 轮询中... 第{poll_count}次", source="clipboard_monitor")
+                    debug(f"⏳ 轮询中... 第{poll_count}次", source="clipboard_monitor")
                 
-                # 如果检测到变化，通知所有监听者
+                # 如果检测到变化，通知相关的监听者：剪贴板变化通知所有监听者，新截图只通知监视该目录的监听者
                 if detected_change:
-                    info(f"✅ 检测到变化类型: {change_type}", source="clipboard_monitor")
-                    
-                    with self._lock:
-                        callbacks_copy = dict(self._callbacks)
-                    
-                    info(f"准备通知 {len(callbacks_copy)} 个监听者", source="clipboard_monitor")
-                    
-                    for button_id, callback in callbacks_copy.items():
-                        try:
-                            info(f"📢 通知按钮 {button_id}", source="clipboard_monitor")
-                            callback(button_id)
-                            info(f"✅ 按钮 {button_id} 回调执行完成", source="clipboard_monitor")
-                        except Exception as e:
-                            error(f"❌ 回调执行失败: {e}", source="clipboard_monitor")
-                
-                time.sleep(self._poll_interval)
+                    self._scheduler.activity()
+                    self._notify(clipboard_change, changed_watches)
                 
+                self._wake.wait(self._scheduler.next_interval())
+                self._wake.clear()
+            
             except Exception as e:
                 error(f"轮询出错: {e}", source="clipboard_monitor")
                 time.sleep(0.5)
         
         info("========== 监听结束 ==========", source="clipboard_monitor")
     
-    def start_monitoring(self, button_id: str, callback: Callable[[str], None]) -> None:
-        """开始监听指定按钮的剪贴板变化"""
+    def _notify(
+        self,
+        clipboard_change: Optional[ClipboardChange],
+        changed_watches: Dict[WatchKey, ClipboardChange]
+    ) -> None:
+        """把已分类的变化交给相关监听者的回调（回调不应阻塞）"""
+        from utils.logger import debug, error
+        
+        with self._lock:
+            deliveries = []
+            for button_id, callback in self._callbacks.items():
+                changes = [clipboard_change] if clipboard_change is not None else []
+                for key in self._button_watches.get(button_id, ()):
+                    change = changed_watches.get(key)
+                    if change is not None and change not in changes:
+                        changes.append(change)
+                if changes:
+                    deliveries.append((button_id, callback, changes))
+        
+        debug(f"通知 {len(deliveries)} 个监听者", source="clipboard_monitor")
+        for button_id, callback, changes in deliveries:
+            for change in changes:
+                try:
+                    callback(button_id, change)
+                except Exception as e:
+                    error(f"❌ 按钮 {button_id} 回调执行失败: {e}", source="clipboard_monitor")
+    
+    def start_monitoring(
+        self,
+        button_id: str,
+        callback: Callable[[str, ClipboardChange], None],
+        screenshot_dirs: Optional[Iterable[str]] = None,
+        screenshot_patterns: Optional[Iterable[str]] = None
+    ) -> None:
+        """
+        开始监听指定按钮的剪贴板变化和新截图
+        screenshot_dirs / screenshot_patterns 为空时使用默认配置；传入空列表表示不监视截图
+        只登记监听并唤醒轮询线程，不读取剪贴板也不扫描目录：剪贴板基准和新监视器的截图基准
+        都由轮询线程记录，可以直接在事件循环中调用
+        """
         from utils.logger import info
         
+        keys = self._watch_keys(screenshot_dirs, screenshot_patterns)
+        
         with self._lock:
+            for key in keys:
+                if key not in self._watchers:
+                    self._watchers[key] = ScreenshotWatcher(*key)
             self._callbacks[button_id] = callback
+            self._button_watches[button_id] = keys
+            self._prune_watchers()
             info(f"添加监听: {button_id}, 当前监听数: {len(self._callbacks)}", source="clipboard_monitor")
         
+        # 新的监听开始后用户很可能马上复制，恢复快速轮询
+        self._scheduler.activity()
+        self._wake.set()
+        
         # 如果轮询线程未运行，启动它
         if not self._running:
             self._running = True
-            # 重新获取当前剪贴板状态作为基准
-            self._last_hash = self._get_clipboard_hash()
             self._thread = threading.Thread(target=self._poll_loop, daemon=True)
             self._thread.start()
             info("启动轮询线程", source="clipboard_monitor")
@@ -182,17 +286,46 @@ class ClipboardMonitor:
         with self._lock:
             if button_id in self._callbacks:
                 del self._callbacks[button_id]
+                self._button_watches.pop(button_id, None)
+                self._prune_watchers()
                 info(f"移除监听: {button_id}, 剩余监听数: {len(self._callbacks)}", source="clipboard_monitor")
             
-            # 如果没有监听者了，轮询会自动停止
+            # 如果没有监听者了，唤醒轮询线程使其立即停止
             if not self._callbacks:
                 info("没有剩余监听，轮询将自动停止", source="clipboard_monitor")
+                self._wake.set()
+    
+    def _prune_watchers(self) -> None:
+        """移除没有监听者使用的截图监视器（调用方需持有锁）"""
+        in_use = {key for keys in self._button_watches.values() for key in keys}
+        for key in list(self._watchers):
+            if key not in in_use:
+                del self._watchers[key]
+    
+    def is_active(self) -> bool:
+        """轮询线程是否在运行（运行时共享快照与剪贴板保持同步）"""
+        return self._running
     
     def is_monitoring(self, button_id: str) -> bool:
         """检查是否正在监听指定按钮"""
         with self._lock:
             return button_id in self._callbacks
     
+    def get_poller_state(self) -> Dict[str, object]:
+        """获取轮询线程状态"""
+        return {
+            "running": self._running,
+            "backend": self.backend.name,
+            "interval": round(self._scheduler.interval, 3),
+            "min_interval": self._scheduler.min_interval,
+            "max_interval": self._scheduler.max_interval,
+            "polls": self._polls,
+            "screenshot_watchers": [
+                {"directory": watcher.directory, "patterns": list(watcher.patterns), "scans": watcher.scans}
+                for watcher in list(self._watchers.values())
+            ]
+        }
+    
     def get_active_monitors(self) -> List[str]:
         """获取所有活动的监听"""
         with self._lock:
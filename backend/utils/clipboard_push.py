@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+剪贴板内容推送模块
+剪贴板文本变化时把内容随事件直接推送给订阅的手机，不需要再请求 /api/clipboard/get：
+- 超过长度上限的文本只推送开头部分，并标记 truncated
+- 与上一次推送的文本比较公共前缀和后缀，只推送中间被替换的部分（splice）更小时推送差异
+- 超过压缩阈值的内容用 zlib 压缩后 base64 编码
+差异以连接上一次实际发送的文本为基准：每个 SSE 连接各有一个 ClipboardPusher，
+被过滤或在缓冲区中合并掉的变化不会改变基准
+"""
+
+import base64
+import os
+import zlib
+from typing import Dict, Optional, Tuple
+
+from utils.clipboard_change import ClipboardChange
+from utils.clipboard_snapshot import KIND_TEXT
+
+PUSH_MAX_CHARS = int(os.environ.get("KPSR_CLIPBOARD_PUSH_MAX_CHARS", "100000"))  # 推送文本的最大字符数
+PUSH_COMPRESS_THRESHOLD = 1024  # 超过此字节数的内容尝试压缩
+PUSH_COMPRESS_LEVEL = 6
+
+
+def _common_affixes(old: str, new: str) -> Tuple[int, int]:
+    """
+    公共前缀和公共后缀的长度（两者不重叠）
+    用切片比较做二分查找，比逐字符循环快得多
+    """
+    limit = min(len(old), len(new))
+    low, high = 0, limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        if old[:mid] == new[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    prefix = low
+
+    low, high = 0, limit - prefix
+    while low < high:
+        mid = (low + high + 1) // 2
+        if old[len(old) - mid:] == new[len(new) - mid:]:
+            low = mid
+        else:
+            high = mid - 1
+    return prefix, low
+
+
+def _js_length(text: str) -> int:
+    """字符串在 JavaScript 中的长度（UTF-16 代码单元数）"""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _encode(text: str) -> Dict[str, object]:
+    """编码推送的文本：超过阈值且压缩后更小时使用 zlib+base64"""
+    data = text.encode("utf-8")
+    if len(data) > PUSH_COMPRESS_THRESHOLD:
+        packed = base64.b64encode(zlib.compress(data, PUSH_COMPRESS_LEVEL)).decode("ascii")
+        if len(packed) < len(data):
+            return {"encoding": "zlib+base64", "data": packed}
+    return {"encoding": "utf-8", "data": text}
+
+
+def build_push_payload(
+    text: str,
+    content_hash: str,
+    previous_text: Optional[str] = None,
+    previous_hash: Optional[str] = None
+) -> Dict[str, object]:
+    """
+    生成推送内容
+    - op=full: data 为完整文本（可能被截断）
+    - op=splice: 客户端当前内容的哈希等于 base 时，把 [start, start+delete) 替换为 data；
+      哈希不一致时应请求 /api/clipboard/get 获取完整内容
+    length、start、delete 按 UTF-16 代码单元计算，与 JavaScript 字符串下标一致
+    """
+    truncated = len(text) > PUSH_MAX_CHARS
+    if truncated:
+        text = text[:PUSH_MAX_CHARS]
+
+    payload: Dict[str, object] = {"op": "full", "hash": content_hash, "length": _js_length(text), "truncated": truncated}
+    body = _encode(text)
+
+    if not truncated and previous_text is not None and previous_hash is not None:
+        prefix, suffix = _common_affixes(previous_text, text)
+        insert = text[prefix:len(text) - suffix]
+        splice_body = _encode(insert)
+        if len(splice_body["data"]) < len(body["data"]):
+            payload.update({
+                "op": "splice",
+                "base": previous_hash,
+                "start": _js_length(text[:prefix]),
+                "delete": _js_length(previous_text[prefix:len(previous_text) - suffix])
+            })
+            body = splice_body
+
+    payload.update(body)
+    return payload
+
+
+class ClipboardPusher:
+    """
+    一个 SSE 连接的推送状态：记录该连接上一次实际发送的文本，为即将发送的变化生成推送内容
+    只在发送事件时调用，因此基准与客户端收到的内容一致
+    """
+
+    def __init__(self) -> None:
+        self._last_text: Optional[str] = None
+        self._last_hash: Optional[str] = None
+
+    def payload(self, change: ClipboardChange) -> Optional[Dict[str, object]]:
+        """即将发送的变化对应的推送内容，非文本变化返回 None"""
+        if change.kind != KIND_TEXT or change.hash is None:
+            return None
+        text = change.text
+        payload = build_push_payload(text, change.hash, self._last_text, self._last_hash)
+        if payload["truncated"]:
+            # 截断的内容客户端不完整，下次推送完整内容
+            self._last_text, self._last_hash = None, None
+        else:
+            self._last_text, self._last_hash = text, change.hash
+        return payload
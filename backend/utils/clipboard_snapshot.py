@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+剪贴板快照模块
+剪贴板监听器在检测到变化时读取一次内容并生成快照（文本或图片、大小、哈希、捕获时间），
+/api/clipboard/get 直接从内存返回快照，不再每次请求都读取剪贴板
+"""
+
+import hashlib
+import threading
+import time
+from typing import Hashable, Optional
+
+from utils.clipboard_backend import ClipboardBackend
+
+# 快照类型
+KIND_TEXT = "text"
+KIND_IMAGE = "image"
+KIND_EMPTY = "empty"
+
+
+class ClipboardSnapshot:
+    """某一时刻的剪贴板内容（创建后不再修改）"""
+
+    __slots__ = ("kind", "data", "mime", "hash", "size", "captured_at", "token")
+
+    def __init__(
+        self,
+        kind: str,
+        data: bytes,
+        mime: str,
+        token: Optional[Hashable] = None,
+        captured_at: Optional[float] = None
+    ) -> None:
+        self.kind = kind
+        self.data = data
+        self.mime = mime
+        self.hash = hashlib.md5(data).hexdigest()
+        self.size = len(data)
+        self.captured_at = captured_at if captured_at is not None else time.time()
+        self.token = token  # 读取时的剪贴板变化标记
+
+    @classmethod
+    def from_text(cls, text: str, token: Optional[Hashable] = None) -> "ClipboardSnapshot":
+        """由文本创建快照"""
+        data = text.encode("utf-8")
+        return cls(KIND_TEXT if data else KIND_EMPTY, data, "text/plain; charset=utf-8", token)
+
+    @property
+    def text(self) -> str:
+        """文本内容（图片快照为空字符串）"""
+        if self.kind != KIND_TEXT:
+            return ""
+        return self.data.decode("utf-8", errors="replace")
+
+    @property
+    def etag(self) -> str:
+        """HTTP ETag，内容相同则相同"""
+        return f'"{self.hash}"'
+
+    def to_dict(self) -> dict:
+        """快照元数据（不含内容）"""
+        return {
+            "kind": self.kind,
+            "mime": self.mime,
+            "size": self.size,
+            "hash": self.hash,
+            "captured_at": self.captured_at
+        }
+
+
+def capture_snapshot(backend: ClipboardBackend, token: Optional[Hashable] = None) -> Optional[ClipboardSnapshot]:
+    """
+    读取剪贴板生成快照，读取失败时返回 None
+    优先读取文本，没有文本时再尝试读取图片
+    """
+    content = backend.read()
+    if content is None:
+        return None
+    if content:
+        return ClipboardSnapshot(KIND_TEXT, content, "text/plain; charset=utf-8", token)
+    try:
+        image = backend.read_image()
+    except Exception:
+        image = None
+    if image:
+        return ClipboardSnapshot(KIND_IMAGE, image, "image/png", token)
+    return ClipboardSnapshot(KIND_EMPTY, b"", "text/plain; charset=utf-8", token)
+
+
+class ClipboardSnapshotCache:
+    """最新剪贴板快照的共享缓存（线程安全）"""
+
+    def __init__(self) -> None:
+        self._snapshot: Optional[ClipboardSnapshot] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[ClipboardSnapshot]:
+        """当前缓存的快照"""
+        with self._lock:
+            return self._snapshot
+
+    def update(self, snapshot: ClipboardSnapshot) -> bool:
+        """更新缓存，返回内容是否变化"""
+        with self._lock:
+            changed = self._snapshot is None or self._snapshot.hash != snapshot.hash
+            self._snapshot = snapshot
+            return changed
+
+    def invalidate(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._snapshot = None
+
+
+# 全局单例
+clipboard_snapshot_cache = ClipboardSnapshotCache()
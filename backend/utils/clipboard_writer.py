@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+剪贴板写入模块
+剪贴板写入（pbcopy 等）在专用线程中执行，异步接口等待写入完成但不阻塞事件循环：
+- 写入线程忙时只保留最新一次请求，被替代的请求随最新一次写入一起完成（coalesced）
+- 要写入的内容与当前剪贴板相同时跳过（skipped）
+"""
+
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import List, Optional
+
+from utils.clipboard_backend import ClipboardBackend, get_clipboard_backend
+from utils.clipboard_snapshot import ClipboardSnapshot, clipboard_snapshot_cache
+
+# 写入结果
+WRITE_WRITTEN = "written"
+WRITE_COALESCED = "coalesced"
+WRITE_SKIPPED = "skipped"
+
+
+class ClipboardWriter:
+    """剪贴板写入线程"""
+
+    def __init__(self, backend: Optional[ClipboardBackend] = None) -> None:
+        self._backend = backend  # 为空时使用全局剪贴板后端
+        self._pending_text: Optional[str] = None
+        self._waiters: List[Future] = []  # 等待当前待写入内容的请求
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.coalesced = 0
+        self.skipped = 0
+
+    @property
+    def backend(self) -> ClipboardBackend:
+        """剪贴板后端"""
+        if self._backend is None:
+            self._backend = get_clipboard_backend()
+        return self._backend
+
+    def submit(self, text: str) -> Future:
+        """提交写入请求（不阻塞），返回完成时结果为 written/coalesced/skipped 的 Future"""
+        future: Future = Future()
+        with self._cond:
+            if self._pending_text is not None:
+                self.coalesced += 1  # 尚未写入的内容被替代
+            self._pending_text = text
+            self._waiters.append(future)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    async def write(self, text: str) -> str:
+        """写入剪贴板（在写入线程中执行，等待完成）"""
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _is_current(self, content_hash: str) -> bool:
+        """
+        剪贴板当前内容是否已经是要写入的内容
+        快照记录了变化标记时用变化标记确认快照仍然有效；没有变化标记时只在监听器运行
+        （快照随剪贴板同步更新）时信任快照
+        """
+        snapshot = clipboard_snapshot_cache.get()
+        if snapshot is None or snapshot.hash != content_hash:
+            return False
+        try:
+            token = self.backend.change_token()
+        except Exception:
+            token = None
+        if token is not None and snapshot.token is not None:
+            return token == snapshot.token
+        from utils.clipboard_monitor import clipboard_monitor
+        return clipboard_monitor.is_active()
+
+    def _run(self) -> None:
+        """写入线程：每次取出最新的待写入内容"""
+        while True:
+            with self._cond:
+                while self._pending_text is None:
+                    self._cond.wait()
+                text = self._pending_text
+                waiters = self._waiters
+                self._pending_text = None
+                self._waiters = []
+
+            try:
+                content_hash = hashlib.md5(text.encode("utf-8")).hexdigest()
+                if self._is_current(content_hash):
+                    self.skipped += 1
+                    result = WRITE_SKIPPED
+                else:
+                    self.backend.write(text)
+                    try:
+                        token = self.backend.change_token()
+                    except Exception:
+                        token = None
+                    clipboard_snapshot_cache.update(ClipboardSnapshot.from_text(text, token))
+                    self.written += 1
+                    result = WRITE_WRITTEN
+            except Exception as e:
+                for future in waiters:
+                    self._resolve(future, exception=e)
+                continue
+
+            # 被替代的请求内容已被最新内容覆盖，随最新一次写入一起完成
+            for future in waiters[:-1]:
+                self._resolve(future, WRITE_COALESCED)
+            self._resolve(waiters[-1], result)
+
+    @staticmethod
+    def _resolve(future: Future, result: Optional[str] = None, exception: Optional[BaseException] = None) -> None:
+        """
+        完成一个等待中的请求
+        客户端断开时请求的 await 被取消，对应的 Future 已经是取消状态，跳过即可；
+        这里的任何异常都不能让写入线程退出，否则之后的写入请求会一直等待
+        """
+        if future.done():
+            return
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        """写入统计"""
+        return {
+            "written": self.written,
+            "coalesced": self.coalesced,
+            "skipped": self.skipped
+        }
+
+
+# 全局单例
+clipboard_writer = ClipboardWriter()
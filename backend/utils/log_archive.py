@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志归档模块
+按时间分段保存 JSONL 日志，分段关闭后 gzip 压缩，并按总大小和保存时长清理
+"""
+
+import os
+import re
+import gzip
+import json
+import time
+import shutil
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+# 分段文件名: {prefix}-{YYYYMMDDTHH}-{序号}.jsonl[.gz]
+SEGMENT_PATTERN = re.compile(r"^(?P<prefix>.+)-(?P<key>\d{8}T\d{2})-(?P<index>\d{3})\.jsonl(?P<gz>\.gz)?$")
+SEGMENT_ID_PATTERN = re.compile(r"^(?P<key>\d{8}T\d{2})-(?P<index>\d{3})$")
+
+# 跨分段查询的继续位置: (时间戳上界（含）, 该时间戳上要跳过的条数, 只读取比它更早的分段)
+ArchivePosition = Tuple[str, int, Optional[str]]
+
+
+def partition_key(timestamp: str) -> str:
+    """ISO 时间戳 -> 分段键（按小时分段），例如 2026-01-27T10:23:16 -> 20260127T10"""
+    return timestamp[0:4] + timestamp[5:7] + timestamp[8:10] + "T" + timestamp[11:13]
+
+
+def _segment_id(key: str, index: int) -> str:
+    """分段标识，例如 20260127T10-003"""
+    return f"{key}-{index:03d}"
+
+
+def _parse_segment_id(segment: str) -> Tuple[str, int]:
+    """解析分段标识为 (key, index)，格式错误时抛出 ValueError"""
+    match = SEGMENT_ID_PATTERN.match(segment)
+    if match is None:
+        raise ValueError(f"无效的分段: {segment}")
+    return match.group("key"), int(match.group("index"))
+
+
+def key_to_prefix(key: str) -> str:
+    """分段键 -> 该小时的 ISO 时间戳前缀，例如 20260127T10 -> 2026-01-27T10"""
+    return f"{key[0:4]}-{key[4:6]}-{key[6:8]}T{key[9:11]}"
+
+
+class LogArchive:
+    """
+    分段日志归档
+
+    - 当前分段为未压缩的 JSONL 文件，只追加写入
+    - 日志跨入新的小时或当前分段超过 max_segment_bytes 时关闭当前分段并 gzip 压缩
+    - 每次关闭分段后按 max_total_bytes 和 max_age_days 删除最旧的分段
+    - 查询时从新到旧逐个分段读取，凑够 limit 条即停止
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        prefix: str,
+        max_segment_bytes: int,
+        max_total_bytes: int,
+        max_age_days: float
+    ) -> None:
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.max_segment_bytes = max_segment_bytes
+        self.max_total_bytes = max_total_bytes
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+
+        self._file = None
+        self._key: Optional[str] = None
+        self._size = 0
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._recover()
+
+    # ------------------------------------------------------------------
+    # 分段管理
+    # ------------------------------------------------------------------
+
+    def _segments(self) -> List[Tuple[str, int, Path]]:
+        """列出所有分段 [(key, index, path)]，按时间从旧到新排序"""
+        segments = []
+        try:
+            for entry in os.scandir(self.directory):
+                match = SEGMENT_PATTERN.match(entry.name)
+                if match and match.group("prefix") == self.prefix:
+                    segments.append((match.group("key"), int(match.group("index")), Path(entry.path)))
+        except FileNotFoundError:
+            return []
+        # 同一分段的 .jsonl 排在 .jsonl.gz 之前，倒序遍历时优先取到压缩版本
+        segments.sort(key=lambda item: (item[0], item[1], item[2].name))
+        return segments
+
+    def _segment_path(self, key: str, index: int, compressed: bool = False) -> Path:
+        suffix = ".jsonl.gz" if compressed else ".jsonl"
+        return self.directory / f"{self.prefix}-{key}-{index:03d}{suffix}"
+
+    def _compress(self, path: Path) -> None:
+        """压缩一个已关闭的分段（先写临时文件再替换，避免读到半个文件）"""
+        gz_path = path.with_name(path.name + ".gz")
+        tmp_path = path.with_name(path.name + ".gz.tmp")
+        with open(path, 'rb') as src, gzip.open(tmp_path, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp_path, gz_path)
+        path.unlink()
+
+    def _recover(self) -> None:
+        """启动时压缩上次未正常关闭的分段"""
+        for _, _, path in self._segments():
+            if path.suffix == ".jsonl":
+                try:
+                    self._compress(path)
+                except Exception as e:
+                    print(f"压缩遗留日志分段失败 {path.name}: {e}")
+
+    def _close_current(self) -> None:
+        """关闭并压缩当前分段（调用方需持有锁）"""
+        if self._file is None:
+            return
+        path = Path(self._file.name)
+        self._file.close()
+        self._file = None
+        try:
+            if self._size > 0:
+                self._compress(path)
+            else:
+                path.unlink()
+        except Exception as e:
+            print(f"压缩日志分段失败 {path.name}: {e}")
+        self._enforce_retention()
+
+    def _open_segment(self, key: str) -> None:
+        """为指定小时打开新的分段（调用方需持有锁）"""
+        index = 0
+        for seg_key, seg_index, _ in self._segments():
+            if seg_key == key:
+                index = max(index, seg_index + 1)
+        self._key = key
+        self._file = open(self._segment_path(key, index), 'a', encoding='utf-8')
+        self._size = 0
+
+    def _enforce_retention(self) -> None:
+        """按总大小和保存时长删除最旧的已关闭分段（调用方需持有锁）"""
+        closed = []
+        for key, index, path in self._segments():
+            if self._file is not None and path.name == Path(self._file.name).name:
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            closed.append((path, stat.st_size, stat.st_mtime))
+
+        total = sum(size for _, size, _ in closed)
+        if self._file is not None:
+            total += self._size
+        cutoff = time.time() - self.max_age_days * 86400
+
+        for path, size, mtime in closed:
+            if total <= self.max_total_bytes and mtime >= cutoff:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"删除过期日志分段失败 {path.name}: {e}")
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def append(self, records: List[Tuple[str, str]]) -> None:
+        """
+        追加日志 [(时间戳, JSON 行), ...]
+        时间戳进入新的小时或分段过大时自动切换分段
+        """
+        with self._lock:
+            pending: List[str] = []
+            for timestamp, line in records:
+                key = partition_key(timestamp)
+                need_roll = (
+                    self._file is None
+                    or (self._key is not None and key > self._key)
+                    or self._size >= self.max_segment_bytes
+                )
+                if need_roll:
+                    self._write(pending)
+                    pending = []
+                    self._close_current()
+                    # 时间戳轻微乱序时沿用当前小时
+                    self._open_segment(max(key, self._key or key))
+                pending.append(line)
+                self._size += len(line.encode('utf-8')) + 1
+            self._write(pending)
+
+    def _write(self, lines: List[str]) -> None:
+        """写入当前分段（调用方需持有锁）"""
+        if not lines or self._file is None:
+            return
+        try:
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+        except Exception as e:
+            print(f"写入日志分段失败: {e}")
+
+    def clear(self) -> None:
+        """删除所有分段"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._key = None
+            for _, _, path in self._segments():
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def close(self) -> None:
+        """关闭并压缩当前分段"""
+        with self._lock:
+            self._close_current()
+            self._key = None
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _read_segment(path: Path) -> Iterator[Dict[str, Any]]:
+        """逐行读取一个分段（忽略写了一半的行）"""
+        opener = gzip.open if path.name.endswith(".gz") else open
+        try:
+            with opener(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            # 读取过程中分段被压缩或清理
+            return
+        except (OSError, EOFError) as e:
+            print(f"读取日志分段失败 {path.name}: {e}")
+
+    def _segments_newest_first(self) -> List[Tuple[str, int, Path]]:
+        """当前所有分段（从新到旧）；同一分段同时存在压缩和未压缩版本时只取压缩版本"""
+        with self._lock:
+            segments = self._segments()
+        result = []
+        seen = set()
+        for key, index, path in reversed(segments):
+            if (key, index) in seen:
+                continue
+            seen.add((key, index))
+            result.append((key, index, path))
+        return result
+
+    def iter_recent(self, count: int) -> List[Dict[str, Any]]:
+        """读取最近的 count 条日志（按时间从旧到新），用于启动时恢复内存日志"""
+        collected: List[List[Dict[str, Any]]] = []
+        remaining = count
+        for _, _, path in self._segments_newest_first():
+            if remaining <= 0:
+                break
+            tail: Deque[Dict[str, Any]] = deque(self._read_segment(path), maxlen=remaining)
+            collected.append(list(tail))
+            remaining -= len(tail)
+        result: List[Dict[str, Any]] = []
+        for chunk in reversed(collected):
+            result.extend(chunk)
+        return result
+
+    @staticmethod
+    def _matcher(
+        level: Optional[str],
+        source: Optional[str],
+        start_time: Optional[str],
+        end_time: Optional[str],
+        before_time: Optional[str],
+        request_id: Optional[str]
+    ) -> Callable[[Dict[str, Any]], bool]:
+        """按查询条件生成过滤函数（before_time 为包含的上界，同一时间戳上要跳过的日志由调用方处理）"""
+        level_key = level.upper() if level else None
+        source_key = source.lower() if source else None
+
+        def matches(entry: Dict[str, Any]) -> bool:
+            timestamp = entry.get("timestamp", "")
+            if before_time and timestamp > before_time:
+                return False
+            if end_time and timestamp > end_time:
+                return False
+            if start_time and timestamp < start_time:
+                return False
+            if level_key and str(entry.get("level", "")).upper() != level_key:
+                return False
+            if source_key and str(entry.get("source", "")).lower() != source_key:
+                return False
+            if request_id and entry.get("request_id") != request_id:
+                return False
+            return True
+
+        return matches
+
+    def query(
+        self,
+        limit: int,
+        level: Optional[str] = None,
+        source: Optional[str] = None,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        before_time: Optional[str] = None,
+        before_skip: int = 0,
+        before_segment: Optional[str] = None,
+        max_segments: int = 48,
+        request_id: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[ArchivePosition]]:
+        """
+        从新到旧跨分段查询时间戳不晚于 before_time 的日志
+        - before_skip: 跳过 before_time 上最新的这么多条（上一页或内存中已返回过）
+        - before_segment: 只读取比该分段更早的分段（上一次查询已读完的分段不再读取）
+        凑够 limit 条或已读取 max_segments 个分段即停止
+        返回 (日志列表（按时间从旧到新）, 继续查询时使用的位置 (before_time, before_skip, before_segment)，
+        没有更多时为 None)
+        """
+        if limit <= 0:
+            return [], (before_time or "", before_skip, before_segment)
+        matches_entry = self._matcher(level, source, start_time, end_time, before_time, request_id)
+        bounds = [t for t in (end_time, before_time) if t]
+        upper = min(bounds) if bounds else None
+        segment_bound = _parse_segment_id(before_segment) if before_segment else None
+
+        collected: List[List[Dict[str, Any]]] = []
+        remaining = limit
+        pending_skip = before_skip if before_time else 0
+        scanned = 0
+        scanned_to: Optional[str] = before_segment  # 已读完的分段中最早的一个
+        for key, index, path in self._segments_newest_first():
+            if segment_bound and (key, index) >= segment_bound:
+                continue
+            hour = key_to_prefix(key)
+            # 整个分段都晚于上界，跳过不读
+            if upper and hour > upper[:13]:
+                continue
+            # 整个分段都早于下界，更旧的分段也不可能匹配
+            if start_time and hour < start_time[:13]:
+                break
+            if scanned >= max_segments:
+                # 本次读取的分段数已达上限，下次从已读分段之前的分段继续
+                return self._merge(collected), (before_time or "", pending_skip, scanned_to)
+            scanned += 1
+
+            matches: Deque[Dict[str, Any]] = deque(maxlen=remaining + pending_skip)
+            for entry in self._read_segment(path):
+                if matches_entry(entry):
+                    matches.append(entry)
+
+            page = list(matches)
+            if pending_skip:
+                # 去掉 before_time 上最新的 pending_skip 条（之前已返回）
+                kept: List[Dict[str, Any]] = []
+                for entry in reversed(page):
+                    if pending_skip and entry.get("timestamp") == before_time:
+                        pending_skip -= 1
+                        continue
+                    kept.append(entry)
+                page = kept[::-1]
+            page = page[-remaining:]
+            if page:
+                collected.append(page)
+                remaining -= len(page)
+            if remaining <= 0:
+                # 凑够 limit 条，下次从本页最早的一条所在时间戳继续，跳过该时间戳上已返回的条数
+                cursor_time = collected[-1][0]["timestamp"]
+                skip = sum(1 for chunk in collected for entry in chunk if entry.get("timestamp") == cursor_time)
+                if cursor_time == before_time:
+                    skip += before_skip
+                return self._merge(collected), (cursor_time, skip, before_segment)
+            scanned_to = _segment_id(key, index)
+
+        return self._merge(collected), None
+
+    def iter_entries(
+        self,
+        level: Optional[str] = None,
+        source: Optional[str] = None,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        before_time: Optional[str] = None,
+        before_skip: int = 0,
+        request_id: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        按时间从旧到新逐个分段遍历时间戳不晚于 before_time 的日志（每次只读取一个分段，用于导出）
+        before_time 上最新的 before_skip 条不输出（它们仍在内存中，由调用方输出）
+        """
+        matches_entry = self._matcher(level, source, start_time, end_time, before_time, request_id)
+        bounds = [t for t in (end_time, before_time) if t]
+        upper = min(bounds) if bounds else None
+        held: Deque[Dict[str, Any]] = deque()  # before_time 上暂缓输出的日志，最后 before_skip 条丢弃
+        for key, _, path in reversed(self._segments_newest_first()):
+            hour = key_to_prefix(key)
+            if start_time and hour < start_time[:13]:
+                continue
+            if upper and hour > upper[:13]:
+                break
+            for entry in self._read_segment(path):
+                if not matches_entry(entry):
+                    continue
+                if before_time and before_skip and entry.get("timestamp") == before_time:
+                    held.append(entry)
+                    if len(held) > before_skip:
+                        yield held.popleft()
+                    continue
+                yield entry
+
+    @staticmethod
+    def _merge(collected: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """合并从新到旧收集的各分段结果为按时间从旧到新的列表"""
+        return [entry for chunk in reversed(collected) for entry in chunk]
+
+    def stats(self) -> Dict[str, Any]:
+        """归档统计"""
+        with self._lock:
+            segments = self._segments()
+        total = 0
+        for _, _, path in segments:
+            try:
+                total += path.stat().st_size
+            except FileNotFoundError:
+                continue
+        return {
+            "directory": str(self.directory),
+            "segments": len(segments),
+            "total_bytes": total,
+            "max_total_bytes": self.max_total_bytes,
+            "max_age_days": self.max_age_days,
+            "oldest": segments[0][0] if segments else None,
+            "newest": segments[-1][0] if segments else None
+        }
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本日志读取模块
+以内存映射方式从文件末尾向前扫描 app.log 及轮转文件 app.log.1..N，
+只复制匹配的行，不把整个文件读入 Python 字符串
+"""
+
+import os
+import re
+import mmap
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# 文本日志行格式: "YYYY-MM-DD HH:MM:SS | LEVEL   | [source] message"
+LINE_PATTERN = re.compile(
+    rb"^(?P<date>\d{4}-\d{2}-\d{2}) (?P<time>\d{2}:\d{2}:\d{2}) \| (?P<level>[A-Z]+) *\| \[(?P<source>[^\]]*)\] ?(?P<message>.*)$",
+    re.S
+)
+
+MAX_ROTATED_FILES = 100  # 最多查找的轮转文件数
+
+
+def _is_record_start(line: bytes) -> bool:
+    """快速判断是否为一条日志的首行（以 "YYYY-MM-DD HH:MM:SS | " 开头）"""
+    return line[19:22] == b" | " and line[:4].isdigit() and line[4:5] == b"-"
+
+
+def rotated_files(log_file: Path) -> List[Path]:
+    """当前日志文件及其轮转文件（从新到旧）"""
+    log_file = Path(log_file)
+    files = [log_file] if log_file.exists() else []
+    for i in range(1, MAX_ROTATED_FILES + 1):
+        path = log_file.with_name(f"{log_file.name}.{i}")
+        if not path.exists():
+            break
+        files.append(path)
+    return files
+
+
+def _iter_records_reverse(path: Path) -> Iterator[bytes]:
+    """
+    从文件末尾向前逐条返回日志记录（原始字节）
+    多行消息的后续行不以时间戳开头，与前面的首行合并为一条
+    """
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return
+    with f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # 忽略最后一个换行之后可能未写完的部分
+            end = mm.rfind(b"\n")
+            continuation: List[bytes] = []
+            while end >= 0:
+                start = mm.rfind(b"\n", 0, end) + 1
+                line = mm[start:end].rstrip(b"\r")
+                end = start - 1
+                if not _is_record_start(line):
+                    continuation.append(line)
+                    continue
+                if continuation:
+                    line = b"\n".join([line] + continuation[::-1])
+                    continuation = []
+                yield line
+
+
+def parse_line(line: bytes) -> Optional[Dict[str, Any]]:
+    """解析一条文本日志为与 JSON 日志相同结构的条目，格式不符时返回 None"""
+    match = LINE_PATTERN.match(line)
+    if match is None:
+        return None
+    return {
+        "timestamp": f"{match.group('date').decode()}T{match.group('time').decode()}",
+        "level": match.group("level").decode(),
+        "source": match.group("source").decode("utf-8", errors="replace"),
+        "message": match.group("message").decode("utf-8", errors="replace"),
+        "extra": {}
+    }
+
+
+def tail(
+    log_file: Path,
+    limit: int = 100,
+    level: Optional[str] = None,
+    source: Optional[str] = None,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    从最新的文本日志向前查找最近 limit 条匹配的日志（按时间从旧到新返回）
+    文本日志只精确到秒，时间条件按 "YYYY-MM-DDTHH:MM:SS" 比较
+    来源不区分大小写，与内存日志的索引（来源统一为小写）一致
+    """
+    if limit <= 0:
+        return []
+    level_key = level.upper().encode() if level else None
+    source_key = source.lower().encode("utf-8") if source else None
+    # 先按字节做子串预筛选，只对可能匹配的行执行正则
+    level_probe = b"| " + level_key if level_key else None
+    source_probe = b"[" + source_key + b"]" if source_key else None
+    upper = end_time[:19] if end_time else None
+    lower = start_time[:19] if start_time else None
+
+    result: List[Dict[str, Any]] = []
+    for path in rotated_files(log_file):
+        records = _iter_records_reverse(path)
+        try:
+            for line in records:
+                if level_probe and level_probe not in line[:32]:
+                    continue
+                if source_probe and source_probe not in line.lower():
+                    continue
+                match = LINE_PATTERN.match(line)
+                if match is None:
+                    continue
+                if level_key and match.group("level") != level_key:
+                    continue
+                if source_key and match.group("source").lower() != source_key:
+                    continue
+                if upper or lower:
+                    timestamp = f"{match.group('date').decode()}T{match.group('time').decode()}"
+                    if upper and timestamp > upper:
+                        continue
+                    if lower and timestamp < lower:
+                        # 更早的日志都不满足条件
+                        return result[::-1]
+                result.append(parse_line(line))
+                if len(result) >= limit:
+                    return result[::-1]
+        finally:
+            # 及时释放内存映射，避免影响日志轮转时的重命名
+            records.close()
+    return result[::-1]
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite 日志后端（可选）
+以 WAL 模式保存日志，按时间戳、级别、来源建立索引，并用 FTS5 支持消息全文搜索
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 三字符以下的查询无法使用 trigram 索引，改用 LIKE
+MIN_FTS_QUERY_LENGTH = 3
+
+SELECT_COLUMNS = "SELECT logs.id, logs.timestamp, logs.level, logs.source, logs.message, logs.extra, logs.request_id"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    level TEXT NOT NULL,
+    source TEXT NOT NULL,
+    message TEXT NOT NULL,
+    extra TEXT,
+    request_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs(timestamp);
+CREATE INDEX IF NOT EXISTS idx_logs_level ON logs(level, id);
+CREATE INDEX IF NOT EXISTS idx_logs_source ON logs(source, id);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(
+    message, content='logs', content_rowid='id', tokenize='{tokenizer}'
+);
+CREATE TRIGGER IF NOT EXISTS logs_fts_insert AFTER INSERT ON logs BEGIN
+    INSERT INTO logs_fts(rowid, message) VALUES (new.id, new.message);
+END;
+CREATE TRIGGER IF NOT EXISTS logs_fts_delete AFTER DELETE ON logs BEGIN
+    INSERT INTO logs_fts(logs_fts, rowid, message) VALUES ('delete', old.id, old.message);
+END;
+"""
+
+
+class SqliteLogBackend:
+    """
+    SQLite 日志后端
+
+    - 写入由日志写入线程批量调用，每批一个事务
+    - 全文搜索使用 FTS5（优先 trigram 分词，支持中文子串搜索；不支持时退回 unicode61）
+    - 超过 max_rows 后每隔若干批删除最旧的日志
+    """
+
+    PRUNE_EVERY = 100  # 每写入多少批检查一次行数上限
+
+    def __init__(self, path: Path, max_rows: int) -> None:
+        self.path = Path(path)
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._batches = 0
+
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self.tokenizer = self._init_fts()
+
+    def _migrate(self) -> None:
+        """为旧版本的数据库补充 request_id 列和索引"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(logs)")}
+        if "request_id" not in columns:
+            self._conn.execute("ALTER TABLE logs ADD COLUMN request_id TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_request ON logs(request_id)")
+
+    def _init_fts(self) -> str:
+        """创建 FTS5 表，返回使用的分词器"""
+        for tokenizer in ("trigram", "unicode61"):
+            try:
+                self._conn.executescript(FTS_SCHEMA.format(tokenizer=tokenizer))
+                return tokenizer
+            except sqlite3.OperationalError:
+                continue
+        raise RuntimeError("当前 SQLite 不支持 FTS5")
+
+    def write_batch(self, entries: Iterable[Dict[str, Any]]) -> None:
+        """在一个事务中写入一批日志"""
+        rows = [
+            (
+                str(entry.get("timestamp", "")),
+                str(entry.get("level", "")).upper(),
+                str(entry.get("source", "")).lower(),
+                str(entry.get("message", "")),
+                json.dumps(entry.get("extra") or {}, ensure_ascii=False),
+                entry.get("request_id")
+            )
+            for entry in entries
+        ]
+        if not rows:
+            return
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO logs (timestamp, level, source, message, extra, request_id) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+            self._batches += 1
+            if self._batches % self.PRUNE_EVERY == 0:
+                self._prune()
+
+    def _prune(self) -> None:
+        """删除超过行数上限的最旧日志（调用方需持有锁）"""
+        row = self._conn.execute("SELECT MAX(id) FROM logs").fetchone()
+        if not row or row[0] is None:
+            return
+        cutoff = row[0] - self.max_rows
+        if cutoff <= 0:
+            return
+        with self._conn:
+            self._conn.execute("DELETE FROM logs WHERE id <= ?", (cutoff,))
+
+    def search(
+        self,
+        text: str,
+        limit: int = 100,
+        level: Optional[str] = None,
+        source: Optional[str] = None,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        before_id: Optional[int] = None,
+        request_id: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        全文搜索日志消息（从新到旧分页）
+        返回 (本页日志（按时间从旧到新）, 下一页使用的 before_id，没有更多时为 None)
+        """
+        text = text.strip()
+        conditions = []
+        params: List[Any] = []
+
+        use_fts = bool(text) and (self.tokenizer != "trigram" or len(text) >= MIN_FTS_QUERY_LENGTH)
+        if use_fts:
+            sql = SELECT_COLUMNS + " FROM logs_fts JOIN logs ON logs.id = logs_fts.rowid"
+            conditions.append("logs_fts MATCH ?")
+            # 作为短语查询，避免用户输入被解析为 FTS 语法
+            params.append('"' + text.replace('"', '""') + '"')
+        else:
+            sql = SELECT_COLUMNS + " FROM logs"
+            if text:
+                conditions.append("logs.message LIKE ? ESCAPE '\\'")
+                escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                params.append(f"%{escaped}%")
+
+        if level:
+            conditions.append("logs.level = ?")
+            params.append(level.upper())
+        if source:
+            conditions.append("logs.source = ?")
+            params.append(source.lower())
+        if start_time:
+            conditions.append("logs.timestamp >= ?")
+            params.append(start_time)
+        if end_time:
+            conditions.append("logs.timestamp <= ?")
+            params.append(end_time)
+        if request_id:
+            conditions.append("logs.request_id = ?")
+            params.append(request_id)
+        if before_id is not None:
+            conditions.append("logs.id < ?")
+            params.append(before_id)
+
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY logs.id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        logs = []
+        for row_id, timestamp, row_level, row_source, message, extra, row_request_id in reversed(rows):
+            try:
+                extra_value = json.loads(extra) if extra else {}
+            except json.JSONDecodeError:
+                extra_value = {}
+            entry = {
+                "timestamp": timestamp,
+                "level": row_level,
+                "source": row_source,
+                "message": message,
+                "extra": extra_value
+            }
+            if row_request_id:
+                entry["request_id"] = row_request_id
+            logs.append(entry)
+        next_id = rows[-1][0] if has_more and rows else None
+        return logs, next_id
+
+    def clear(self) -> None:
+        """清空所有日志"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM logs")
+
+    def stats(self) -> Dict[str, Any]:
+        """统计信息"""
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(*) FROM logs").fetchone()
+        return {
+            "path": str(self.path),
+            "rows": row[0] if row else 0,
+            "max_rows": self.max_rows,
+            "tokenizer": self.tokenizer
+        }
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志存储模块
+内存环形缓冲区 + 查询索引，持久化写入分段日志归档
+"""
+
+import json
+import time
+import base64
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.log_archive import LogArchive
+
+# 内存日志序号每次启动都从 0 开始，游标中带上进程的纪元（启动时间），旧进程的游标不会被误认为有效
+CURSOR_EPOCH = format(int(time.time() * 1000), "x")
+
+
+class StaleCursorError(ValueError):
+    """游标来自之前的进程（服务已重启），其中的序号在当前进程中没有意义"""
+
+
+def _encode(prefix: str, value: str) -> str:
+    return base64.urlsafe_b64encode(f"{prefix}:{value}".encode('utf-8')).decode('ascii').rstrip("=")
+
+
+def _decode(cursor: str) -> Tuple[str, str]:
+    """解析游标为 (类型, 值)，格式错误时抛出 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        prefix, value = raw.split(":", 1)
+    except Exception:
+        raise ValueError(f"无效的游标: {cursor}")
+    if prefix not in ("log", "ts", "db"):
+        raise ValueError(f"无效的游标: {cursor}")
+    return prefix, value
+
+
+def encode_cursor(seq: int) -> str:
+    """把内存日志序号（连同进程纪元）编码为不透明的分页游标"""
+    return _encode("log", f"{CURSOR_EPOCH}.{seq}")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    解析内存日志游标，格式错误或不是内存日志游标时抛出 ValueError
+    游标来自之前的进程时抛出 StaleCursorError
+    """
+    prefix, value = _decode(cursor)
+    if prefix != "log":
+        raise ValueError(f"无效的游标: {cursor}")
+    epoch, _, seq = value.rpartition(".")
+    if epoch != CURSOR_EPOCH:
+        raise StaleCursorError(f"游标已失效（服务已重启）: {cursor}")
+    try:
+        return int(seq)
+    except ValueError:
+        raise ValueError(f"无效的游标: {cursor}")
+
+
+def encode_time_cursor(timestamp: str, skip: int = 0, segment: Optional[str] = None) -> str:
+    """
+    把归档查询位置编码为不透明的分页游标
+    位置为 (时间戳, skip, 分段)：下一页从该时间戳（含）开始向旧查询，跳过该时间戳上已返回过的最新 skip 条，
+    并且只读取比该分段更早的分段
+    （日志时间戳可能重复，只用时间戳做严格上界会漏掉同一时间戳上没放进上一页的日志）
+    """
+    value = timestamp
+    if skip or segment:
+        value += f"|{skip}"
+    if segment:
+        value += f"|{segment}"
+    return _encode("ts", value)
+
+
+def decode_time_cursor(cursor: str) -> Optional[Tuple[str, int, Optional[str]]]:
+    """解析归档游标，返回 (时间戳, skip, 分段)；是内存日志游标时返回 None，格式错误时抛出 ValueError"""
+    prefix, value = _decode(cursor)
+    if prefix != "ts":
+        return None
+    timestamp, _, rest = value.partition("|")
+    skip, _, segment = rest.partition("|")
+    try:
+        return timestamp, int(skip) if skip else 0, segment or None
+    except ValueError:
+        raise ValueError(f"无效的游标: {cursor}")
+
+
+def encode_db_cursor(row_id: int) -> str:
+    """把 SQLite 日志行号编码为不透明的分页游标"""
+    return _encode("db", str(row_id))
+
+
+def decode_db_cursor(cursor: str) -> int:
+    """解析 SQLite 日志游标，格式错误或类型不符时抛出 ValueError"""
+    prefix, value = _decode(cursor)
+    if prefix != "db":
+        raise ValueError(f"无效的游标: {cursor}")
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"无效的游标: {cursor}")
+
+
+class JsonlLogStore:
+    """
+    JSONL 日志存储
+
+    - 每条日志以一行 JSON 追加到归档的当前分段末尾，写入代价 O(1)，不会重新序列化历史
+    - 最近的 capacity 条日志保存在内存中，查询和统计直接读取内存；更早的日志从归档分段中查询
+    - 分段的切换、压缩和清理由 LogArchive 负责
+
+    内存中的每条日志有一个单调递增的序号 seq（entries[i] 的序号为 base + i），
+    并维护按级别、来源、级别+来源分组的序号列表以及有序的时间戳列表，
+    查询时用 bisect 定位区间，复杂度 O(log n + k)。
+
+    统计信息随写入和裁剪增量维护：按级别/来源的计数即索引列表的长度，
+    另外按分钟累计各级别的写入条数（不随裁剪减少），用于计算错误率等。
+    """
+
+    TRIM_SLACK = 0.1  # 超出容量 10% 后才批量裁剪，使裁剪代价均摊为 O(1)
+    HISTOGRAM_MINUTES = 24 * 60  # 按分钟统计保留的时长
+
+    def __init__(
+        self,
+        archive: LogArchive,
+        capacity: int,
+        legacy_paths: Iterable[Path] = ()
+    ) -> None:
+        self.archive = archive
+        self.capacity = capacity
+        self._lock = threading.Lock()
+
+        # 内存日志和索引
+        self._entries: List[Dict[str, Any]] = []
+        self._timestamps: List[str] = []  # 与 _entries 平行，保证非递减
+        self._base = 0  # _entries[0] 的序号
+        self._by_level: Dict[str, List[int]] = {}
+        self._by_source: Dict[str, List[int]] = {}
+        self._by_pair: Dict[Tuple[str, str], List[int]] = {}
+        self._by_request: Dict[str, List[int]] = {}
+
+        # 按分钟统计: {"YYYY-MM-DDTHH:MM": {level: count}}
+        self._minutes: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+
+        self._load(legacy_paths)
+
+    @staticmethod
+    def _read_legacy(path: Path) -> List[Dict[str, Any]]:
+        """读取旧版本的日志文件（JSON 数组或单个 JSONL 文件）"""
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.suffix == ".json":
+                logs = json.load(f)
+                return [log for log in logs if isinstance(log, dict)] if isinstance(logs, list) else []
+            entries = []
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+            return entries
+
+    def _load(self, legacy_paths: Iterable[Path]) -> None:
+        """启动时从归档恢复最近的日志到内存（只在初始化时执行一次）"""
+        try:
+            entries = self.archive.iter_recent(self.capacity)
+        except Exception as e:
+            print(f"加载日志归档失败: {e}")
+            entries = []
+
+        # 兼容旧版本：归档为空时导入旧格式的日志文件
+        if not entries:
+            for path in legacy_paths:
+                path = Path(path)
+                if not path.exists():
+                    continue
+                try:
+                    legacy = self._read_legacy(path)
+                    self.archive.append([
+                        (str(entry.get("timestamp", "")), json.dumps(entry, ensure_ascii=False))
+                        for entry in legacy
+                    ])
+                    entries.extend(legacy)
+                    # 单文件 JSONL 是归档之前的格式，导入后删除；JSON 数组文件保留
+                    if path.suffix == ".jsonl":
+                        path.unlink()
+                except Exception as e:
+                    print(f"迁移旧日志失败 {path.name}: {e}")
+            entries = entries[-self.capacity:]
+
+        for entry in entries:
+            self._index(entry)
+        self._trim(force=True)
+
+    def _index(self, entry: Dict[str, Any]) -> int:
+        """把日志加入内存和索引，返回其序号（调用方需持有锁或处于初始化阶段）"""
+        seq = self._base + len(self._entries)
+        level = str(entry.get("level", "")).upper()
+        source = str(entry.get("source", "")).lower()
+        timestamp = str(entry.get("timestamp", ""))
+
+        # 多线程入队可能使时间戳轻微乱序，索引中的时间戳取非递减值以便二分查找
+        if self._timestamps and timestamp < self._timestamps[-1]:
+            timestamp = self._timestamps[-1]
+
+        self._entries.append(entry)
+        self._timestamps.append(timestamp)
+        self._by_level.setdefault(level, []).append(seq)
+        self._by_source.setdefault(source, []).append(seq)
+        self._by_pair.setdefault((level, source), []).append(seq)
+        request_id = entry.get("request_id")
+        if request_id:
+            self._by_request.setdefault(request_id, []).append(seq)
+        self._count_minute(timestamp[:16], level)
+        return seq
+
+    def _count_minute(self, minute: str, level: str) -> None:
+        """累计按分钟的计数（调用方需持有锁）"""
+        bucket = self._minutes.get(minute)
+        if bucket is None:
+            if self._minutes and minute < next(reversed(self._minutes)):
+                # 时间戳已被调整为非递减，这里只会在启动加载异常数据时出现
+                return
+            bucket = self._minutes[minute] = {}
+            while len(self._minutes) > self.HISTOGRAM_MINUTES:
+                self._minutes.popitem(last=False)
+        bucket[level] = bucket.get(level, 0) + 1
+
+    def _trim(self, force: bool = False) -> None:
+        """裁剪超出容量的旧日志（调用方需持有锁）"""
+        excess = len(self._entries) - self.capacity
+        if excess <= 0:
+            return
+        if not force and excess < max(1, int(self.capacity * self.TRIM_SLACK)):
+            return
+
+        del self._entries[:excess]
+        del self._timestamps[:excess]
+        self._base += excess
+
+        for index in (self._by_level, self._by_source, self._by_pair, self._by_request):
+            for key in list(index.keys()):
+                seqs = index[key]
+                cut = bisect_left(seqs, self._base)
+                if cut:
+                    del seqs[:cut]
+                if not seqs:
+                    del index[key]
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        """追加一条日志"""
+        self.append_many((entry,))
+
+    def append_many(
+        self,
+        entries: Iterable[Dict[str, Any]],
+        persist: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> None:
+        """
+        追加多条日志（一次写入归档）
+        persist 不为空时只把返回 True 的日志写入归档，其余只保存在内存中
+        """
+        with self._lock:
+            records = []
+            added = False
+            for entry in entries:
+                self._index(entry)
+                added = True
+                if persist is None or persist(entry):
+                    records.append((str(entry.get("timestamp", "")), json.dumps(entry, ensure_ascii=False)))
+            if not added:
+                return
+            self._trim()
+
+            if records:
+                try:
+                    self.archive.append(records)
+                except Exception as e:
+                    print(f"写入日志归档失败: {e}")
+
+    def _candidates(
+        self,
+        level: Optional[str],
+        source: Optional[str],
+        request_id: Optional[str] = None
+    ) -> Optional[List[int]]:
+        """根据过滤条件选择序号列表，None 表示不过滤（使用全部序号）"""
+        level_key = level.upper() if level else None
+        source_key = source.lower() if source else None
+        if request_id:
+            # 同一请求的日志很少，直接逐条检查其余条件
+            seqs = self._by_request.get(request_id, [])
+            if not level_key and not source_key:
+                return seqs
+            result = []
+            for seq in seqs:
+                entry = self._entries[seq - self._base]
+                if level_key and str(entry.get("level", "")).upper() != level_key:
+                    continue
+                if source_key and str(entry.get("source", "")).lower() != source_key:
+                    continue
+                result.append(seq)
+            return result
+        if level_key and source_key:
+            return self._by_pair.get((level_key, source_key), [])
+        if level_key:
+            return self._by_level.get(level_key, [])
+        if source_key:
+            return self._by_source.get(source_key, [])
+        return None
+
+    def _range(
+        self,
+        start_time: Optional[str],
+        end_time: Optional[str],
+        before: Optional[int],
+        after: Optional[int]
+    ) -> Tuple[int, int]:
+        """根据时间和游标条件计算序号区间 [lo, hi)（调用方需持有锁）"""
+        lo = self._base
+        hi = self._base + len(self._entries)
+        if start_time:
+            lo = max(lo, self._base + bisect_left(self._timestamps, start_time))
+        if end_time:
+            hi = min(hi, self._base + bisect_right(self._timestamps, end_time))
+        if before is not None:
+            hi = min(hi, before)
+        if after is not None:
+            lo = max(lo, after + 1)
+        return lo, hi
+
+    def query(
+        self,
+        limit: int = 100,
+        level: Optional[str] = None,
+        source: Optional[str] = None,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        request_id: Optional[str] = None
+    ) -> Tuple[List[Tuple[int, Dict[str, Any]]], bool]:
+        """
+        查询日志
+        - before: 只返回序号小于 before 的日志（向旧翻页），取满足条件的最新 limit 条
+        - after: 只返回序号大于 after 的日志（向新增量读取），取满足条件的最旧 limit 条
+        返回 ([(seq, entry), ...] 按时间从旧到新, 是否还有更多)
+        """
+        with self._lock:
+            lo, hi = self._range(start_time, end_time, before, after)
+            if lo >= hi or limit <= 0:
+                return [], False
+
+            seqs = self._candidates(level, source, request_id)
+            if seqs is None:
+                i, j = lo, hi
+            else:
+                i, j = bisect_left(seqs, lo), bisect_left(seqs, hi)
+
+            total = j - i
+            if after is not None:
+                start, stop = i, min(j, i + limit)
+            else:
+                start, stop = max(i, j - limit), j
+
+            chosen = range(start, stop) if seqs is None else seqs[start:stop]
+
+            result = [(seq, self._entries[seq - self._base]) for seq in chosen]
+            return result, total > len(result)
+
+    def boundary(
+        self,
+        level: Optional[str] = None,
+        source: Optional[str] = None,
+        request_id: Optional[str] = None
+    ) -> Tuple[Optional[str], int]:
+        """
+        内存与归档的分界：(内存中最旧的时间戳, 内存中该时间戳上满足条件的日志条数)
+        归档中同一时间戳上最新的这些日志也在内存中，从归档继续查询时需要跳过
+        """
+        with self._lock:
+            if not self._timestamps:
+                return None, 0
+            timestamp = self._timestamps[0]
+            lo, hi = self._range(timestamp, timestamp, None, None)
+            seqs = self._candidates(level, source, request_id)
+            if seqs is None:
+                return timestamp, hi - lo
+            return timestamp, bisect_left(seqs, hi) - bisect_left(seqs, lo)
+
+    def search(
+        self,
+        text: str,
+        limit: int = 100,
+        level: Optional[str] = None,
+        source: Optional[str] = None,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        before: Optional[int] = None,
+        request_id: Optional[str] = None
+    ) -> Tuple[List[Tuple[int, Dict[str, Any]]], bool]:
+        """
+        在内存日志中按消息子串搜索（不区分大小写，从新到旧扫描，未启用 SQLite 后端时使用）
+        返回 ([(seq, entry), ...] 按时间从旧到新, 是否还有更多)
+        """
+        needle = text.lower()
+        with self._lock:
+            lo, hi = self._range(start_time, end_time, before, None)
+            if lo >= hi or limit <= 0:
+                return [], False
+
+            seqs = self._candidates(level, source, request_id)
+            if seqs is None:
+                candidates = range(hi - 1, lo - 1, -1)
+            else:
+                i, j = bisect_left(seqs, lo), bisect_left(seqs, hi)
+                candidates = (seqs[k] for k in range(j - 1, i - 1, -1))
+
+            result: List[Tuple[int, Dict[str, Any]]] = []
+            for seq in candidates:
+                entry = self._entries[seq - self._base]
+                if needle in str(entry.get("message", "")).lower():
+                    if len(result) == limit:
+                        return list(reversed(result)), True
+                    result.append((seq, entry))
+            return list(reversed(result)), False
+
+    def stats(self) -> Dict[str, Any]:
+        """获取统计信息（与日志条数无关，只与级别/来源种类数有关）"""
+        with self._lock:
+            by_level: Dict[str, int] = {}
+            by_source: Dict[str, int] = {}
+            for level, seqs in self._by_level.items():
+                by_level[level or "UNKNOWN"] = len(seqs)
+            for source, seqs in self._by_source.items():
+                by_source[source or "unknown"] = len(seqs)
+            return {
+                "total": len(self._entries),
+                "by_level": by_level,
+                "by_source": by_source
+            }
+
+    def histogram(self, minutes: int = 60, level: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        获取最近 minutes 分钟每分钟的日志条数（按时间从旧到新，没有日志的分钟计为 0）
+        level 为空时统计所有级别
+        """
+        minutes = max(1, min(minutes, self.HISTOGRAM_MINUTES))
+        level_key = level.upper() if level else None
+        now = datetime.now()
+        keys = [
+            (now - timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M")
+            for i in range(minutes - 1, -1, -1)
+        ]
+        with self._lock:
+            result = []
+            for key in keys:
+                bucket = self._minutes.get(key)
+                if not bucket:
+                    count = 0
+                elif level_key:
+                    count = bucket.get(level_key, 0)
+                else:
+                    count = sum(bucket.values())
+                result.append({"minute": key, "count": count})
+            return result
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """获取内存中日志的快照（按时间从旧到新）"""
+        with self._lock:
+            return list(self._entries)
+
+    @property
+    def oldest_timestamp(self) -> Optional[str]:
+        """内存中最旧一条日志的时间戳（更早的日志只在归档中）"""
+        with self._lock:
+            return self._timestamps[0] if self._timestamps else None
+
+    @property
+    def last_seq(self) -> int:
+        """最新一条日志的序号（没有日志时为 base - 1）"""
+        with self._lock:
+            return self._base + len(self._entries) - 1
+
+    def clear(self) -> None:
+        """清空内存和归档中的日志（序号继续递增，旧游标不会指向新日志）"""
+        with self._lock:
+            self._base += len(self._entries)
+            self._entries.clear()
+            self._timestamps.clear()
+            self._by_level.clear()
+            self._by_source.clear()
+            self._by_pair.clear()
+            self._by_request.clear()
+            self._minutes.clear()
+            self.archive.clear()
+
+    def close(self) -> None:
+        """关闭归档的当前分段"""
+        with self._lock:
+            self.archive.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -3,21 +3,34 @@
 """
 日志管理模块
 提供统一的日志记录、保存和读取功能
+
+写入流程：调用方只负责构造日志条目并放入有界队列（O(1)），
+由后台写入线程统一格式化一次，再批量写入文本日志、JSON日志存储和控制台。
 """
 
 import os
 import sys
 import json
-import logging
-from datetime import datetime
+import time
+import atexit
+import queue
+import random
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Iterator, Iterable
 import threading
-import shutil
 
 # 导入统一配置
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import LOGS_DIR as CONFIG_LOGS_DIR
+from utils.log_store import (
+    JsonlLogStore, StaleCursorError, encode_cursor, decode_cursor, encode_time_cursor, decode_time_cursor,
+    encode_db_cursor, decode_db_cursor
+)
+from utils.log_archive import LogArchive
+from utils.log_sqlite import SqliteLogBackend
+from utils import log_reader
+from utils.request_context import request_id_var
 
 # 日志目录（使用统一配置）
 LOGS_DIR = Path(CONFIG_LOGS_DIR)
@@ -25,71 +38,284 @@ LOGS_DIR = Path(CONFIG_LOGS_DIR)
 # 确保日志目录存在
 LOGS_DIR.mkdir(exist_ok=True)
 
-# 日志锁，防止并发写入问题
+# 日志锁，防止写入线程与清空操作并发（JSON日志由 JsonlLogStore 自行加锁）
 log_lock = threading.Lock()
 
 # 日志配置
 MAX_LOG_SIZE = 10 * 1024 * 1024  # 10MB
 MAX_LOG_FILES = 5  # 保留最多5个日志文件
-MAX_JSON_LOGS = 10000  # JSON日志最多保留10000条
+MAX_JSON_LOGS = 10000  # 内存环形缓冲区最多保留10000条
+
+# 日志归档配置（按小时分段，关闭后 gzip 压缩）
+ARCHIVE_DIR = LOGS_DIR / "archive"
+ARCHIVE_SEGMENT_BYTES = int(os.environ.get("KPSR_LOG_SEGMENT_BYTES", str(16 * 1024 * 1024)))  # 单个分段上限
+ARCHIVE_MAX_BYTES = int(os.environ.get("KPSR_LOG_ARCHIVE_MAX_BYTES", str(200 * 1024 * 1024)))  # 归档总大小上限
+ARCHIVE_MAX_DAYS = float(os.environ.get("KPSR_LOG_ARCHIVE_MAX_DAYS", "14"))  # 归档保存天数
+ARCHIVE_QUERY_MAX_SEGMENTS = 48  # 单次查询最多读取的分段数，超出后通过游标继续
+
+# SQLite 日志后端（可选，启用后支持全文搜索）
+LOG_SQLITE_ENABLED = os.environ.get("KPSR_LOG_SQLITE", "0") == "1"
+LOG_SQLITE_MAX_ROWS = int(os.environ.get("KPSR_LOG_SQLITE_MAX_ROWS", "1000000"))  # 最多保留的日志行数
+
+# 后台写入配置（可通过环境变量调整）
+LOG_QUEUE_SIZE = int(os.environ.get("KPSR_LOG_QUEUE_SIZE", "10000"))  # 队列上限，超出后丢弃并计数
+LOG_BATCH_SIZE = int(os.environ.get("KPSR_LOG_BATCH_SIZE", "200"))  # 每批最多写入条数
+LOG_FLUSH_INTERVAL = float(os.environ.get("KPSR_LOG_FLUSH_INTERVAL", "0.5"))  # 最长攒批时间（秒）
+LOG_CONSOLE = os.environ.get("KPSR_LOG_CONSOLE", "1") != "0"  # 是否输出到控制台
+
+# 热点日志限流配置
+LOG_RATE_WINDOW = float(os.environ.get("KPSR_LOG_RATE_WINDOW", "1.0"))  # 限流窗口（秒）
+LOG_RATE_BURST = int(os.environ.get("KPSR_LOG_RATE_BURST", "0"))  # 每个调用位置每个窗口最多记录的不同 DEBUG/INFO 条数，0 表示不限制
+# 采样配置，格式 "来源:级别:采样率,..."，只对 DEBUG/INFO 生效
+LOG_SAMPLE_RATES = os.environ.get(
+    "KPSR_LOG_SAMPLE_RATES",
+    "clipboard_monitor:DEBUG:0.05,monitor_api:DEBUG:0.1"
+)
+SAMPLED_LEVELS = ("DEBUG", "INFO")
+
+# 日志级别
+LEVEL_VALUES = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+LOG_LEVEL = os.environ.get("KPSR_LOG_LEVEL", "DEBUG").upper()  # 默认最低级别
+
+# 飞行记录模式：低于 FLIGHT_RECORDER_LEVEL 的日志只保存在内存环形缓冲区，不写磁盘；
+# 记录到 ERROR 或手动触发时，把之前 FLIGHT_RECORDER_SECONDS 秒的日志导出到 dumps 目录
+FLIGHT_RECORDER_ENABLED = os.environ.get("KPSR_LOG_FLIGHT_RECORDER", "0") == "1"
+FLIGHT_RECORDER_LEVEL = os.environ.get("KPSR_LOG_FLIGHT_LEVEL", "WARNING").upper()  # 达到该级别的日志照常写入磁盘
+FLIGHT_RECORDER_SECONDS = float(os.environ.get("KPSR_LOG_FLIGHT_SECONDS", "60"))  # 导出错误前多少秒的日志
+DUMPS_DIR = LOGS_DIR / "dumps"
+MAX_DUMP_FILES = 20  # 最多保留的导出文件数
+
+
+def _parse_sample_rates(spec: str) -> Dict[Tuple[str, str], float]:
+    """解析采样配置字符串"""
+    rates: Dict[Tuple[str, str], float] = {}
+    for item in spec.split(","):
+        parts = item.strip().split(":")
+        if len(parts) != 3:
+            continue
+        source, level, rate = parts
+        try:
+            rates[(source.strip(), level.strip().upper())] = max(0.0, min(1.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+class _FlushMarker:
+    """队列中的刷新标记，写入线程处理到它时通知等待方"""
+    
+    def __init__(self) -> None:
+        self.done = threading.Event()
+
+
+class _SiteState:
+    """单个调用位置的限流状态"""
+    
+    __slots__ = ("window_start", "emitted", "repeats", "message", "level", "source", "request_id",
+                 "dropped", "dropped_level", "dropped_source")
+    
+    def __init__(self, now: float) -> None:
+        self.window_start = now
+        self.emitted = 0
+        self.repeats = 0  # 与上一条记录完全相同而被合并的次数
+        self.message = ""
+        self.level = ""
+        self.source = ""
+        self.request_id: Optional[str] = None
+        self.dropped = 0  # 超出 burst 上限被抑制的不同消息数
+        self.dropped_level = ""
+        self.dropped_source = ""
+
+
+class LogRateLimiter:
+    """
+    按调用位置（文件名+行号）限流
+    - 同一位置连续重复的相同消息（来源和请求也相同）在窗口内只记录第一条，其余计入重复次数；
+      消息改变或窗口结束时补记一条带重复次数的记录
+    - burst 大于 0 时，同一位置在窗口内最多记录 burst 条 DEBUG/INFO 消息（WARNING/ERROR 不受此限制），
+      窗口结束后补记一条被抑制条数的记录；默认不启用
+    """
+    
+    def __init__(self, window: float = LOG_RATE_WINDOW, burst: int = LOG_RATE_BURST) -> None:
+        self.window = window
+        self.burst = max(0, burst)
+        self._sites: Dict[Tuple[str, int], _SiteState] = {}
+        self._lock = threading.Lock()
+        self.suppressed_total = 0
+    
+    @staticmethod
+    def _summaries(site: Tuple[str, int], state: _SiteState) -> List[Tuple[str, str, str, Dict[str, Any]]]:
+        """生成待补记的合并记录 [(level, message, source, extra)]，并清空计数"""
+        call_site = f"{os.path.basename(site[0])}:{site[1]}"
+        summaries = []
+        if state.repeats:
+            summaries.append((
+                state.level,
+                f"{state.message} [窗口内重复 {state.repeats} 次]",
+                state.source,
+                {"repeat_count": state.repeats, "call_site": call_site}
+            ))
+            state.repeats = 0
+        if state.dropped:
+            summaries.append((
+                state.dropped_level,
+                f"该位置在窗口内另有 {state.dropped} 条日志被抑制",
+                state.dropped_source,
+                {"suppressed_count": state.dropped, "call_site": call_site}
+            ))
+            state.dropped = 0
+        return summaries
+    
+    def check(
+        self, site: Tuple[str, int], level: str, message: str, source: str, request_id: Optional[str] = None
+    ) -> Tuple[bool, List[Tuple[str, str, str, Dict[str, Any]]]]:
+        """
+        检查是否应记录该消息
+        返回 (是否记录, 需要先补记的合并记录)
+        """
+        if self.window <= 0:
+            return True, []
+        
+        now = time.monotonic()
+        summaries: List[Tuple[str, str, str, Dict[str, Any]]] = []
+        with self._lock:
+            state = self._sites.get(site)
+            if state is None:
+                state = self._sites[site] = _SiteState(now)
+            elif now - state.window_start >= self.window:
+                summaries = self._summaries(site, state)
+                state.window_start = now
+                state.emitted = 0
+                state.message = ""
+            else:
+                if message == state.message and source == state.source and request_id == state.request_id:
+                    state.repeats += 1
+                    self.suppressed_total += 1
+                    return False, []
+                if self.burst and level in SAMPLED_LEVELS and state.emitted >= self.burst:
+                    state.dropped += 1
+                    state.dropped_level, state.dropped_source = level, source
+                    self.suppressed_total += 1
+                    return False, []
+                # 消息改变：先补记上一条消息的重复次数
+                if state.repeats:
+                    summaries = self._summaries(site, state)
+            
+            state.emitted += 1
+            state.message, state.level, state.source = message, level, source
+            state.request_id = request_id
+            return True, summaries
+    
+    def sweep(self) -> List[Tuple[str, str, str, Dict[str, Any]]]:
+        """收集已过期窗口中被抑制消息的合并记录（由写入线程定期调用）"""
+        now = time.monotonic()
+        summaries = []
+        with self._lock:
+            for site, state in list(self._sites.items()):
+                if now - state.window_start < self.window:
+                    continue
+                summaries.extend(self._summaries(site, state))
+                # 过期的位置直接移除，避免状态表无限增长
+                del self._sites[site]
+        return summaries
+
 
 class AppLogger:
     """应用日志管理器"""
     
-    def __init__(self, name: str = "app") -> None:
+    def __init__(
+        self,
+        name: str = "app",
+        queue_size: int = LOG_QUEUE_SIZE,
+        batch_size: int = LOG_BATCH_SIZE,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+        console: bool = LOG_CONSOLE,
+        rate_limiter: Optional[LogRateLimiter] = None,
+        use_sqlite: bool = LOG_SQLITE_ENABLED
+    ) -> None:
         self.name = name
         self.log_file = LOGS_DIR / f"{name}.log"
-        self.json_log_file = LOGS_DIR / f"{name}.json"
-        
-        # 配置Python logging
-        self.logger = logging.getLogger(name)
-        self.logger.setLevel(logging.DEBUG)
+        self.json_log_file = LOGS_DIR / f"{name}.jsonl"  # 旧版本的单文件 JSONL，启动时导入归档
+        self.legacy_json_log_file = LOGS_DIR / f"{name}.json"
         
-        # 清除已有的handler
-        self.logger.handlers.clear()
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval)
+        self.console = console
         
-        # 文件handler
-        file_handler = logging.FileHandler(self.log_file, encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG)
-        file_formatter = logging.Formatter(
-            '%(asctime)s | %(levelname)-7s | %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
+        # 初始化JSON日志存储（内存环形缓冲区 + 分段归档）
+        self.archive = LogArchive(
+            ARCHIVE_DIR,
+            prefix=name,
+            max_segment_bytes=ARCHIVE_SEGMENT_BYTES,
+            max_total_bytes=ARCHIVE_MAX_BYTES,
+            max_age_days=ARCHIVE_MAX_DAYS
         )
-        file_handler.setFormatter(file_formatter)
-        self.logger.addHandler(file_handler)
-        
-        # 控制台handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.DEBUG)
-        console_formatter = logging.Formatter(
-            '%(asctime)s | %(levelname)-7s | %(message)s',
-            datefmt='%H:%M:%S'
+        self.store = JsonlLogStore(
+            self.archive,
+            capacity=MAX_JSON_LOGS,
+            legacy_paths=(self.json_log_file, self.legacy_json_log_file)
         )
-        console_handler.setFormatter(console_formatter)
-        self.logger.addHandler(console_handler)
         
-        # 初始化JSON日志文件
-        self._init_json_log()
+        # SQLite 后端（可选），打开失败时只使用内存搜索
+        self.sqlite: Optional[SqliteLogBackend] = None
+        if use_sqlite:
+            try:
+                self.sqlite = SqliteLogBackend(LOGS_DIR / f"{name}.db", max_rows=LOG_SQLITE_MAX_ROWS)
+            except Exception as e:
+                print(f"打开SQLite日志库失败: {e}")
+        
+        # 文本日志文件（由写入线程独占写入，大小在内存中累计，不必每次 stat）
+        self._text_file = None
+        self._text_size = 0
+        self._open_text_file()
+        
+        # 写入队列和统计
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self._dropped = 0
+        self._written = 0
+        self._stats_lock = threading.Lock()
+        
+        # 热点日志限流和采样
+        self.rate_limiter = rate_limiter or LogRateLimiter()
+        self._sample_rates: Dict[Tuple[str, str], float] = _parse_sample_rates(LOG_SAMPLE_RATES)
+        self._sampled_out = 0
+        
+        # 按来源的最低日志级别（运行时可调整）
+        self._default_level = LEVEL_VALUES.get(LOG_LEVEL, LEVEL_VALUES["DEBUG"])
+        self._source_levels: Dict[str, int] = {}
+        
+        # 飞行记录模式
+        self._flight_recorder = FLIGHT_RECORDER_ENABLED
+        self._flight_level = LEVEL_VALUES.get(FLIGHT_RECORDER_LEVEL, LEVEL_VALUES["WARNING"])
+        self._flight_seconds = FLIGHT_RECORDER_SECONDS
+        self._dump_lock = threading.Lock()
+        self._last_dumped_seq = -1  # 自动导出只导出上次导出之后的日志，避免连续错误重复导出
+        self._dumps = 0
+        self._last_dump: Optional[str] = None
+        
+        # 启动后台写入线程
+        self._writer = threading.Thread(target=self._writer_loop, name=f"{name}-log-writer", daemon=True)
+        self._writer.start()
     
-    def _init_json_log(self) -> None:
-        """初始化JSON日志文件"""
+    def _open_text_file(self) -> None:
+        """以追加模式打开文本日志文件"""
         try:
-            if not self.json_log_file.exists():
-                with open(self.json_log_file, 'w', encoding='utf-8') as f:
-                    json.dump([], f)
+            self._text_file = open(self.log_file, 'a', encoding='utf-8')
+            self._text_size = self._text_file.tell()
         except Exception as e:
-            print(f"初始化JSON日志文件失败: {e}")
+            self._text_file = None
+            self._text_size = 0
+            print(f"打开日志文件失败: {e}")
     
     def _rotate_log_file(self) -> None:
-        """日志文件轮转"""
+        """日志文件轮转（仅在写入线程中调用）"""
         try:
-            if not self.log_file.exists():
+            if self._text_size < MAX_LOG_SIZE:
                 return
             
-            # 检查文件大小
-            file_size = self.log_file.stat().st_size
-            if file_size < MAX_LOG_SIZE:
-                return
+            if self._text_file is not None:
+                self._text_file.close()
+                self._text_file = None
             
             # 轮转日志文件
             for i in range(MAX_LOG_FILES - 1, 0, -1):
@@ -102,152 +328,721 @@ class AppLogger:
                         old_file.rename(new_file)
             
             # 重命名当前日志文件
-            self.log_file.rename(LOGS_DIR / f"{self.name}.log.1")
-            
-            # 创建新的日志文件
-            self.log_file.touch()
+            if self.log_file.exists():
+                self.log_file.rename(LOGS_DIR / f"{self.name}.log.1")
         except Exception as e:
             print(f"日志文件轮转失败: {e}")
-    
-    def _append_json_log(self, entry: Dict[str, Any]) -> None:
-        """追加JSON日志条目"""
-        with log_lock:
-            try:
-                # 读取现有日志
-                with open(self.json_log_file, 'r', encoding='utf-8') as f:
-                    logs = json.load(f)
-                
-                # 追加新条目
-                logs.append(entry)
-                
-                # 只保留最近的日志
-                if len(logs) > MAX_JSON_LOGS:
-                    logs = logs[-MAX_JSON_LOGS:]
-                
-                # 写回文件
-                with open(self.json_log_file, 'w', encoding='utf-8') as f:
-                    json.dump(logs, f, ensure_ascii=False, indent=2)
-            except json.JSONDecodeError as e:
-                print(f"JSON日志文件损坏，重新初始化: {e}")
-                self._init_json_log()
-            except Exception as e:
-                print(f"写入JSON日志失败: {e}")
+        finally:
+            # 创建新的日志文件
+            if self._text_file is None:
+                self._open_text_file()
     
     def _create_entry(
-        self, 
-        level: str, 
-        message: str, 
-        source: str = "backend", 
+        self,
+        level: str,
+        message: str,
+        source: str = "backend",
         extra: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        """创建日志条目"""
-        return {
+        """创建日志条目（在请求上下文中时附加请求 ID）"""
+        entry = {
             "timestamp": datetime.now().isoformat(),
             "level": level,
             "source": source,
             "message": message,
             "extra": extra or {}
         }
+        request_id = request_id_var.get()
+        if request_id is not None:
+            entry["request_id"] = request_id
+        return entry
+    
+    def _enqueue(self, item: Any) -> bool:
+        """放入写入队列（不阻塞，队列满时丢弃并计数）；item 可以是一批日志的列表，只占一个队列位置"""
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self._dropped += len(item) if isinstance(item, list) else 1
+            return False
+    
+    @staticmethod
+    def _call_site() -> Tuple[str, int]:
+        """找到日志模块之外的第一个调用帧"""
+        frame = sys._getframe(2)
+        while frame is not None and frame.f_code.co_filename == __file__:
+            frame = frame.f_back
+        if frame is None:
+            return ("", 0)
+        return (frame.f_code.co_filename, frame.f_lineno)
+    
+    def set_sample_rate(self, source: str, rate: float, level: str = "DEBUG") -> None:
+        """
+        设置指定来源、级别的采样率（0~1，1 表示全部记录），只支持 DEBUG/INFO
+        """
+        level = level.upper()
+        if level not in SAMPLED_LEVELS:
+            raise ValueError(f"只能对 {'/'.join(SAMPLED_LEVELS)} 采样: {level}")
+        rate = max(0.0, min(1.0, float(rate)))
+        if rate >= 1.0:
+            self._sample_rates.pop((source, level), None)
+        else:
+            self._sample_rates[(source, level)] = rate
+    
+    def is_enabled_for(self, level: str, source: str = "backend") -> bool:
+        """判断指定来源的某级别日志是否会被记录（一次字典查找）"""
+        return LEVEL_VALUES.get(level, 0) >= self._source_levels.get(source, self._default_level)
+    
+    def set_level(self, level: Optional[str], source: Optional[str] = None) -> None:
+        """
+        设置最低日志级别
+        - source 为空时设置默认级别
+        - level 为空时移除该来源的单独设置（恢复默认级别）
+        """
+        if level is None or level == "":
+            if source is None:
+                raise ValueError("默认级别不能为空")
+            self._source_levels.pop(source, None)
+            return
+        level = level.upper()
+        if level == "WARN":
+            level = "WARNING"
+        if level not in LEVEL_VALUES:
+            raise ValueError(f"未知日志级别: {level}")
+        if source is None:
+            self._default_level = LEVEL_VALUES[level]
+        else:
+            self._source_levels[source] = LEVEL_VALUES[level]
+    
+    def get_levels(self) -> Dict[str, Any]:
+        """获取当前日志级别配置"""
+        names = {value: name for name, value in LEVEL_VALUES.items()}
+        return {
+            "default": names[self._default_level],
+            "sources": {source: names[value] for source, value in self._source_levels.items()},
+            "available": list(LEVEL_VALUES.keys())
+        }
+    
+    def get_sample_rates(self) -> Dict[str, float]:
+        """获取当前采样配置 {"来源:级别": 采样率}"""
+        return {f"{source}:{level}": rate for (source, level), rate in self._sample_rates.items()}
+    
+    def _log(
+        self,
+        level: str,
+        message: str,
+        source: str,
+        extra: Optional[Dict[str, Any]],
+        throttle: bool = True
+    ) -> None:
+        """记录日志（调用方线程只做级别、采样、限流判断和 O(1) 的入队操作）"""
+        if LEVEL_VALUES.get(level, 0) < self._source_levels.get(source, self._default_level):
+            return
+        
+        if self._sample_rates:
+            rate = self._sample_rates.get((source, level))
+            if rate is not None and random.random() >= rate:
+                self._sampled_out += 1
+                return
+        
+        if throttle:
+            emit, summaries = self.rate_limiter.check(
+                self._call_site(), level, message, source, request_id_var.get()
+            )
+            for summary in summaries:
+                self._enqueue(self._create_entry(*summary))
+            if not emit:
+                return
+        
+        self._enqueue(self._create_entry(level, message, source, extra))
+    
+    def _next_batch(self) -> List[Any]:
+        """从队列中取出一批日志：等到第一条后，最多再攒 flush_interval 秒或 batch_size 条"""
+        batch = [self._queue.get(timeout=max(0.1, self.rate_limiter.window))]
+        deadline = time.monotonic() + self.flush_interval
+        
+        while len(batch) < self.batch_size:
+            last = batch[-1]
+            # 遇到错误日志或刷新标记时立即写出
+            if isinstance(last, _FlushMarker) or (isinstance(last, dict) and last.get("level") == "ERROR"):
+                break
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _should_persist(self, entry: Dict[str, Any]) -> bool:
+        """飞行记录模式下只有达到 flight_level 的日志写入磁盘"""
+        return LEVEL_VALUES.get(entry["level"], 0) >= self._flight_level
+    
+    def _write_batch(self, entries: List[Dict[str, Any]]) -> None:
+        """格式化一次，分发到文本日志、JSON日志存储和控制台"""
+        flight_recorder = self._flight_recorder
+        persisted = []
+        lines = []
+        console_lines = []
+        for entry in entries:
+            persist = not flight_recorder or self._should_persist(entry)
+            if not persist and not self.console:
+                continue
+            timestamp = entry["timestamp"]
+            body = f"{entry['level']:<7} | [{entry['source']}] {entry['message']}"
+            if persist:
+                # ISO 时间戳 -> "YYYY-MM-DD HH:MM:SS"
+                lines.append(f"{timestamp[:10]} {timestamp[11:19]} | {body}\n")
+                persisted.append(entry)
+            if self.console:
+                console_lines.append(f"{timestamp[11:19]} | {body}\n")
+        
+        with log_lock:
+            if self._text_file is not None and lines:
+                try:
+                    data = "".join(lines)
+                    self._text_file.write(data)
+                    self._text_file.flush()
+                    self._text_size += len(data.encode('utf-8'))
+                except Exception as e:
+                    print(f"写入文本日志失败: {e}")
+                self._rotate_log_file()
+            
+            try:
+                self.store.append_many(entries, persist=self._should_persist if flight_recorder else None)
+            except Exception as e:
+                print(f"写入JSON日志失败: {e}")
+            
+            if self.sqlite is not None and persisted:
+                try:
+                    self.sqlite.write_batch(persisted)
+                except Exception as e:
+                    print(f"写入SQLite日志失败: {e}")
+        
+        if console_lines:
+            try:
+                sys.stderr.write("".join(console_lines))
+                sys.stderr.flush()
+            except Exception:
+                pass
+        
+        with self._stats_lock:
+            self._written += len(entries)
+        
+        # 飞行记录模式下记录到错误时，导出错误之前的日志
+        if flight_recorder and any(entry["level"] == "ERROR" for entry in entries):
+            self._dump(self._flight_seconds, "error", incremental=True)
+    
+    def _dump(self, seconds: float, reason: str, incremental: bool = False) -> Dict[str, Any]:
+        """
+        把内存中最近 seconds 秒的日志导出为 dumps 目录下的 JSONL 文件
+        incremental 为 True 时只导出上次导出之后的日志
+        返回 {"path": 文件路径或 None, "count": 导出条数}
+        """
+        with self._dump_lock:
+            start_time = (datetime.now() - timedelta(seconds=seconds)).isoformat()
+            after = self._last_dumped_seq if incremental and self._last_dumped_seq >= 0 else None
+            entries, _ = self.store.query(
+                limit=max(1, len(self.store)),
+                start_time=start_time,
+                after=after
+            )
+            if not entries:
+                return {"path": None, "count": 0}
+            
+            path = DUMPS_DIR / f"{self.name}-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{reason}.jsonl"
+            try:
+                DUMPS_DIR.mkdir(parents=True, exist_ok=True)
+                with open(path, 'w', encoding='utf-8') as f:
+                    for _, entry in entries:
+                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            except Exception as e:
+                print(f"导出日志失败: {e}")
+                return {"path": None, "count": 0}
+            
+            self._last_dumped_seq = max(self._last_dumped_seq, entries[-1][0])
+            self._dumps += 1
+            self._last_dump = str(path)
+            
+            # 只保留最新的 MAX_DUMP_FILES 个导出文件（文件名按时间排序）
+            dumps = sorted(DUMPS_DIR.glob(f"{self.name}-*.jsonl"))
+            for old in dumps[:-MAX_DUMP_FILES]:
+                try:
+                    old.unlink()
+                except OSError:
+                    pass
+            return {"path": str(path), "count": len(entries)}
+    
+    def _writer_loop(self) -> None:
+        """后台写入线程"""
+        while True:
+            try:
+                try:
+                    batch = self._next_batch()
+                except queue.Empty:
+                    batch = []
+                
+                # 补记限流窗口结束后被合并的消息
+                entries = [self._create_entry(*summary) for summary in self.rate_limiter.sweep()]
+                for item in batch:
+                    if isinstance(item, list):
+                        entries.extend(item)
+                    elif not isinstance(item, _FlushMarker):
+                        entries.append(item)
+                if entries:
+                    self._write_batch(entries)
+                for item in batch:
+                    if isinstance(item, _FlushMarker):
+                        item.done.set()
+            except Exception as e:
+                print(f"日志写入线程出错: {e}")
+    
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等待此前入队的日志全部写出"""
+        if not self._writer.is_alive():
+            return False
+        marker = _FlushMarker()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+    
+    def close(self) -> None:
+        """写出剩余日志并关闭文件（进程退出时调用）"""
+        self.flush()
+        with log_lock:
+            if self._text_file is not None:
+                self._text_file.close()
+                self._text_file = None
+        self.store.close()
+        if self.sqlite is not None:
+            self.sqlite.close()
+    
+    def get_writer_stats(self) -> Dict[str, Any]:
+        """获取后台写入线程的统计信息"""
+        with self._stats_lock:
+            return {
+                "queued": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "written": self._written,
+                "dropped": self._dropped,
+                "suppressed": self.rate_limiter.suppressed_total,
+                "sampled_out": self._sampled_out,
+                "batch_size": self.batch_size,
+                "flush_interval": self.flush_interval
+            }
     
     def debug(self, message: str, source: str = "backend", extra: Optional[Dict[str, Any]] = None) -> None:
         """调试日志"""
         try:
-            self._rotate_log_file()
-            self.logger.debug(f"[{source}] {message}")
-            self._append_json_log(self._create_entry("DEBUG", message, source, extra))
+            self._log("DEBUG", message, source, extra)
         except Exception as e:
             print(f"记录调试日志失败: {e}")
     
     def info(self, message: str, source: str = "backend", extra: Optional[Dict[str, Any]] = None) -> None:
         """信息日志"""
         try:
-            self._rotate_log_file()
-            self.logger.info(f"[{source}] {message}")
-            self._append_json_log(self._create_entry("INFO", message, source, extra))
+            self._log("INFO", message, source, extra)
         except Exception as e:
             print(f"记录信息日志失败: {e}")
     
     def warning(self, message: str, source: str = "backend", extra: Optional[Dict[str, Any]] = None) -> None:
         """警告日志"""
         try:
-            self._rotate_log_file()
-            self.logger.warning(f"[{source}] {message}")
-            self._append_json_log(self._create_entry("WARNING", message, source, extra))
+            self._log("WARNING", message, source, extra)
         except Exception as e:
             print(f"记录警告日志失败: {e}")
     
     def error(self, message: str, source: str = "backend", extra: Optional[Dict[str, Any]] = None) -> None:
         """错误日志"""
         try:
-            self._rotate_log_file()
-            self.logger.error(f"[{source}] {message}")
-            self._append_json_log(self._create_entry("ERROR", message, source, extra))
+            self._log("ERROR", message, source, extra)
         except Exception as e:
             print(f"记录错误日志失败: {e}")
     
+    def _logf(
+        self,
+        level: str,
+        fmt: str,
+        args: Tuple[Any, ...],
+        source: str,
+        extra: Optional[Dict[str, Any]]
+    ) -> None:
+        """延迟格式化：级别未启用时不做任何字符串格式化"""
+        if LEVEL_VALUES[level] < self._source_levels.get(source, self._default_level):
+            return
+        try:
+            message = fmt % args if args else fmt
+        except Exception as e:
+            message = f"{fmt} {args!r} (格式化失败: {e})"
+        self._log(level, message, source, extra)
+    
+    def debugf(self, fmt: str, *args: Any, source: str = "backend", extra: Optional[Dict[str, Any]] = None) -> None:
+        """调试日志（% 格式化，参数延迟格式化）"""
+        try:
+            self._logf("DEBUG", fmt, args, source, extra)
+        except Exception as e:
+            print(f"记录调试日志失败: {e}")
+    
+    def infof(self, fmt: str, *args: Any, source: str = "backend", extra: Optional[Dict[str, Any]] = None) -> None:
+        """信息日志（% 格式化，参数延迟格式化）"""
+        try:
+            self._logf("INFO", fmt, args, source, extra)
+        except Exception as e:
+            print(f"记录信息日志失败: {e}")
+    
+    def warningf(self, fmt: str, *args: Any, source: str = "backend", extra: Optional[Dict[str, Any]] = None) -> None:
+        """警告日志（% 格式化，参数延迟格式化）"""
+        try:
+            self._logf("WARNING", fmt, args, source, extra)
+        except Exception as e:
+            print(f"记录警告日志失败: {e}")
+    
+    def errorf(self, fmt: str, *args: Any, source: str = "backend", extra: Optional[Dict[str, Any]] = None) -> None:
+        """错误日志（% 格式化，参数延迟格式化）"""
+        try:
+            self._logf("ERROR", fmt, args, source, extra)
+        except Exception as e:
+            print(f"记录错误日志失败: {e}")
+    
+    @staticmethod
+    def _normalize_level(level: str) -> str:
+        """规范化外部传入的日志级别，无法识别时按 INFO 处理"""
+        level = str(level).upper()
+        if level == "WARN":
+            return "WARNING"
+        if level not in LEVEL_VALUES:
+            return "INFO"
+        return level
+    
     def log_frontend(self, level: str, message: str, extra: Optional[Dict[str, Any]] = None) -> None:
-        """记录前端日志"""
+        """记录前端日志（前端日志都经由同一调用位置，不参与按调用位置限流）"""
         try:
-            level = level.upper()
-            source = "frontend"
-            
-            if level == "DEBUG":
-                self.debug(message, source, extra)
-            elif level == "INFO":
-                self.info(message, source, extra)
-            elif level == "WARNING" or level == "WARN":
-                self.warning(message, source, extra)
-            elif level == "ERROR":
-                self.error(message, source, extra)
-            else:
-                self.info(message, source, extra)
+            self._log(self._normalize_level(level), message, "frontend", extra, throttle=False)
         except Exception as e:
             print(f"记录前端日志失败: {e}")
     
+    def log_batch(
+        self,
+        records: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]],
+        source: str = "frontend"
+    ) -> int:
+        """
+        批量记录日志 [(级别, 消息, 附加信息), ...]
+        整批只占一个队列位置，由写入线程一次写入各存储；只做级别过滤，不参与采样和限流
+        返回进入写入队列的条数（队列满时整批丢弃，返回 0）
+        """
+        threshold = self._source_levels.get(source, self._default_level)
+        entries = []
+        for level, message, extra in records:
+            level = self._normalize_level(level)
+            if LEVEL_VALUES[level] < threshold:
+                continue
+            entries.append(self._create_entry(level, message, source, extra))
+        if not entries or not self._enqueue(entries):
+            return 0
+        return len(entries)
+    
     def get_logs(self, 
                  limit: int = 100, 
                  level: Optional[str] = None, 
                  source: Optional[str] = None,
                  start_time: Optional[str] = None,
-                 end_time: Optional[str] = None) -> List[dict]:
-        """获取日志"""
+                 end_time: Optional[str] = None,
+                 request_id: Optional[str] = None) -> List[dict]:
+        """获取最近的日志（只读取内存，更早的日志用 query_logs 按游标翻页）"""
         try:
-            with open(self.json_log_file, 'r', encoding='utf-8') as f:
-                logs = json.load(f)
-            
-            # 过滤
-            if level:
-                logs = [log for log in logs if log.get("level", "").upper() == level.upper()]
-            
-            if source:
-                logs = [log for log in logs if log.get("source", "").lower() == source.lower()]
-            
-            if start_time:
-                logs = [log for log in logs if log.get("timestamp", "") >= start_time]
-            
-            if end_time:
-                logs = [log for log in logs if log.get("timestamp", "") <= end_time]
-            
-            # 返回最新的limit条
-            return logs[-limit:]
-        except json.JSONDecodeError as e:
-            print(f"JSON日志文件损坏: {e}")
-            return []
+            return self.query_logs(
+                limit=limit,
+                level=level,
+                source=source,
+                start_time=start_time,
+                end_time=end_time,
+                request_id=request_id
+            )["logs"]
         except Exception as e:
             print(f"读取日志失败: {e}")
             return []
     
+    def query_logs(self,
+                   limit: int = 100,
+                   level: Optional[str] = None,
+                   source: Optional[str] = None,
+                   start_time: Optional[str] = None,
+                   end_time: Optional[str] = None,
+                   cursor: Optional[str] = None,
+                   request_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        分页查询日志（从新到旧翻页）
+        第一页（没有游标）只查内存中的日志，不读取归档，内存中不足 limit 条时返回指向归档的游标；
+        调用方带着游标继续翻页时，内存中的日志翻完后才从新到旧查询归档分段，凑够即停止
+        （读取归档需要解压和解析分段，调用方应在线程池中调用）
+        返回本页日志（按时间从旧到新）和下一页游标，没有更多时游标为 None
+        游标格式错误时抛出 ValueError
+        """
+        archive_position = decode_time_cursor(cursor) if cursor else None
+        logs: List[Dict[str, Any]] = []
+        
+        if archive_position is None:
+            before = decode_cursor(cursor) if cursor else None
+            entries, has_more = self.store.query(
+                limit=limit,
+                level=level,
+                source=source,
+                start_time=start_time,
+                end_time=end_time,
+                before=before,
+                request_id=request_id
+            )
+            logs = [entry for _, entry in entries]
+            if has_more:
+                return {"logs": logs, "next_cursor": encode_cursor(entries[0][0])}
+            
+            # 内存中已没有更多匹配的日志，更早的日志只在归档中（跳过同一时间戳上已在内存中的日志）
+            oldest, in_memory = self.store.boundary(level=level, source=source, request_id=request_id)
+            if not oldest or (start_time and oldest < start_time):
+                return {"logs": logs, "next_cursor": None}
+            archive_position = (oldest, in_memory, None)
+            if cursor is None:
+                # 第一页不读取归档，调用方需要更早的日志时再用游标翻页
+                return {"logs": logs, "next_cursor": encode_time_cursor(*archive_position)}
+        
+        remaining = limit - len(logs)
+        if remaining <= 0:
+            return {"logs": logs, "next_cursor": encode_time_cursor(*archive_position)}
+        
+        older, next_position = self.archive.query(
+            remaining,
+            level=level,
+            source=source,
+            start_time=start_time,
+            end_time=end_time,
+            before_time=archive_position[0],
+            before_skip=archive_position[1],
+            before_segment=archive_position[2],
+            max_segments=ARCHIVE_QUERY_MAX_SEGMENTS,
+            request_id=request_id
+        )
+        return {
+            "logs": older + logs,
+            "next_cursor": encode_time_cursor(*next_position) if next_position else None
+        }
+    
+    def search_logs(self,
+                    q: str,
+                    limit: int = 100,
+                    level: Optional[str] = None,
+                    source: Optional[str] = None,
+                    start_time: Optional[str] = None,
+                    end_time: Optional[str] = None,
+                    cursor: Optional[str] = None,
+                    request_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        按消息内容搜索日志（从新到旧翻页）
+        启用 SQLite 后端时使用全文索引，覆盖全部已保存的日志；否则只在内存日志中按子串查找
+        返回本页日志（按时间从旧到新）和下一页游标，没有更多时游标为 None
+        游标格式错误时抛出 ValueError
+        """
+        if self.sqlite is not None:
+            before_id = decode_db_cursor(cursor) if cursor else None
+            logs, next_id = self.sqlite.search(
+                q,
+                limit=limit,
+                level=level,
+                source=source,
+                start_time=start_time,
+                end_time=end_time,
+                before_id=before_id,
+                request_id=request_id
+            )
+            return {
+                "logs": logs,
+                "next_cursor": encode_db_cursor(next_id) if next_id is not None else None
+            }
+        
+        before = decode_cursor(cursor) if cursor else None
+        entries, has_more = self.store.search(
+            q,
+            limit=limit,
+            level=level,
+            source=source,
+            start_time=start_time,
+            end_time=end_time,
+            before=before,
+            request_id=request_id
+        )
+        return {
+            "logs": [entry for _, entry in entries],
+            "next_cursor": encode_cursor(entries[0][0]) if has_more else None
+        }
+    
+    def read_text_logs(self,
+                       limit: int = 100,
+                       level: Optional[str] = None,
+                       source: Optional[str] = None,
+                       start_time: Optional[str] = None,
+                       end_time: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        从文本日志及其轮转文件中读取最近 limit 条匹配的日志（按时间从旧到新）
+        用于内存和归档都没有的更早日志（如启用归档前写入的日志）
+        """
+        return log_reader.tail(
+            self.log_file,
+            limit=limit,
+            level=level,
+            source=source,
+            start_time=start_time,
+            end_time=end_time
+        )
+    
+    def dump_logs(self, seconds: Optional[float] = None, reason: str = "manual") -> Dict[str, Any]:
+        """导出内存中最近 seconds 秒的日志（默认使用飞行记录窗口），不论是否开启飞行记录模式"""
+        self.flush()
+        return self._dump(self._flight_seconds if seconds is None else seconds, reason)
+    
+    def set_flight_recorder(
+        self,
+        enabled: Optional[bool] = None,
+        seconds: Optional[float] = None,
+        level: Optional[str] = None
+    ) -> None:
+        """运行时调整飞行记录模式（参数为空时保持不变）"""
+        if level is not None:
+            level = level.upper()
+            if level == "WARN":
+                level = "WARNING"
+            if level not in LEVEL_VALUES:
+                raise ValueError(f"未知日志级别: {level}")
+            self._flight_level = LEVEL_VALUES[level]
+        if seconds is not None:
+            if seconds <= 0:
+                raise ValueError("导出时长必须大于 0")
+            self._flight_seconds = float(seconds)
+        if enabled is not None:
+            self._flight_recorder = bool(enabled)
+    
+    def get_flight_recorder(self) -> Dict[str, Any]:
+        """获取飞行记录模式状态"""
+        names = {value: name for name, value in LEVEL_VALUES.items()}
+        return {
+            "enabled": self._flight_recorder,
+            "level": names[self._flight_level],
+            "seconds": self._flight_seconds,
+            "dumps": self._dumps,
+            "last_dump": self._last_dump,
+            "dump_dir": str(DUMPS_DIR)
+        }
+    
+    def latest_cursor(self) -> str:
+        """获取指向最新一条日志的游标（用于从当前位置开始增量读取）"""
+        return encode_cursor(self.store.last_seq)
+    
+    def resolve_tail_cursor(self, cursor: Optional[str]) -> Tuple[str, bool]:
+        """
+        检查增量读取的起始游标，返回 (可用的游标, 是否已重置为当前位置)
+        没有游标、游标来自之前的进程或超出当前最新序号时从当前最新位置开始，
+        而不是一直等到新进程的序号追上旧游标；格式错误时抛出 ValueError
+        """
+        if not cursor:
+            return self.latest_cursor(), False
+        try:
+            seq = decode_cursor(cursor)
+        except StaleCursorError:
+            return self.latest_cursor(), True
+        if seq > self.store.last_seq:
+            return self.latest_cursor(), True
+        return cursor, False
+    
+    def read_logs_after(self,
+                        cursor: Optional[str],
+                        limit: int = 500,
+                        level: Optional[str] = None,
+                        source: Optional[str] = None,
+                        start_time: Optional[str] = None,
+                        end_time: Optional[str] = None,
+                        request_id: Optional[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        增量读取游标之后的日志（按时间从旧到新）
+        返回 [(该条日志的游标, 日志), ...]，游标格式错误时抛出 ValueError，
+        游标来自之前的进程时抛出 StaleCursorError（起始游标应先经过 resolve_tail_cursor）
+        """
+        after = decode_cursor(cursor) if cursor else -1
+        if after >= self.store.last_seq:
+            # 没有新日志时不必加锁查询
+            return []
+        entries, _ = self.store.query(
+            limit=limit,
+            level=level,
+            source=source,
+            start_time=start_time,
+            end_time=end_time,
+            after=after,
+            request_id=request_id
+        )
+        return [(encode_cursor(seq), entry) for seq, entry in entries]
+    
+    def iter_logs(self,
+                  level: Optional[str] = None,
+                  source: Optional[str] = None,
+                  start_time: Optional[str] = None,
+                  end_time: Optional[str] = None,
+                  page_size: int = 1000,
+                  request_id: Optional[str] = None,
+                  include_archive: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        按时间从旧到新逐页遍历日志（每次只持有一页）
+        include_archive 为 True 时先逐个分段遍历归档中早于内存日志的部分（会解压分段，应在线程池中迭代）
+        """
+        if include_archive:
+            oldest, in_memory = self.store.boundary(level=level, source=source, request_id=request_id)
+            yield from self.archive.iter_entries(
+                level=level,
+                source=source,
+                start_time=start_time,
+                end_time=end_time,
+                before_time=oldest,
+                before_skip=in_memory,
+                request_id=request_id
+            )
+        
+        cursor = None
+        while True:
+            page = self.read_logs_after(
+                cursor,
+                limit=page_size,
+                level=level,
+                source=source,
+                start_time=start_time,
+                end_time=end_time,
+                request_id=request_id
+            )
+            if not page:
+                return
+            for _, entry in page:
+                yield entry
+            cursor = page[-1][0]
+    
     def clear_logs(self) -> bool:
         """清空日志"""
+        # 先写出队列中已有的日志，避免清空后又被写回
+        self.flush()
         with log_lock:
             try:
                 # 清空文本日志
+                if self._text_file is not None:
+                    self._text_file.close()
                 with open(self.log_file, 'w', encoding='utf-8') as f:
                     f.write("")
+                self._open_text_file()
                 
                 # 清空JSON日志
-                with open(self.json_log_file, 'w', encoding='utf-8') as f:
-                    json.dump([], f)
+                self.store.clear()
+                if self.sqlite is not None:
+                    self.sqlite.clear()
                 
                 return True
             except Exception as e:
@@ -255,36 +1050,32 @@ class AppLogger:
                 return False
     
     def get_log_stats(self) -> Dict[str, Any]:
-        """获取日志统计"""
+        """获取日志统计（计数由存储增量维护，不遍历日志）"""
         try:
-            with open(self.json_log_file, 'r', encoding='utf-8') as f:
-                logs = json.load(f)
-            
-            stats = {
-                "total": len(logs),
-                "by_level": {},
-                "by_source": {},
+            stats = self.store.stats()
+            stats.update({
                 "log_file": str(self.log_file),
-                "json_log_file": str(self.json_log_file)
-            }
-            
-            for log in logs:
-                level = log.get("level", "UNKNOWN")
-                source = log.get("source", "unknown")
-                
-                stats["by_level"][level] = stats["by_level"].get(level, 0) + 1
-                stats["by_source"][source] = stats["by_source"].get(source, 0) + 1
-            
+                "archive": self.archive.stats(),
+                "sqlite": self.sqlite.stats() if self.sqlite is not None else None,
+                "flight_recorder": self.get_flight_recorder(),
+                "errors_per_minute": self.store.histogram(minutes=60, level="ERROR"),
+                "writer": self.get_writer_stats()
+            })
             return stats
-        except json.JSONDecodeError as e:
-            return {"error": f"JSON日志文件损坏: {e}"}
         except Exception as e:
             return {"error": str(e)}
+    
+    def get_log_histogram(self, minutes: int = 60, level: Optional[str] = None) -> List[Dict[str, Any]]:
+        """获取最近 minutes 分钟每分钟的日志条数"""
+        return self.store.histogram(minutes=minutes, level=level)
 
 
 # 创建全局日志实例
 app_logger = AppLogger("app")
 
+# 进程退出时写出剩余日志
+atexit.register(app_logger.close)
+
 # 便捷函数
 def debug(message: str, source: str = "backend", extra: Optional[Dict[str, Any]] = None) -> None:
     """记录调试日志"""
@@ -306,16 +1097,76 @@ def error(message: str, source: str = "backend", extra: Optional[Dict[str, Any]]
     app_logger.error(message, source, extra)
 
 
+def debugf(fmt: str, *args: Any, source: str = "backend", extra: Optional[Dict[str, Any]] = None) -> None:
+    """记录调试日志（延迟格式化）"""
+    app_logger.debugf(fmt, *args, source=source, extra=extra)
+
+
+def infof(fmt: str, *args: Any, source: str = "backend", extra: Optional[Dict[str, Any]] = None) -> None:
+    """记录信息日志（延迟格式化）"""
+    app_logger.infof(fmt, *args, source=source, extra=extra)
+
+
+def warningf(fmt: str, *args: Any, source: str = "backend", extra: Optional[Dict[str, Any]] = None) -> None:
+    """记录警告日志（延迟格式化）"""
+    app_logger.warningf(fmt, *args, source=source, extra=extra)
+
+
+def errorf(fmt: str, *args: Any, source: str = "backend", extra: Optional[Dict[str, Any]] = None) -> None:
+    """记录错误日志（延迟格式化）"""
+    app_logger.errorf(fmt, *args, source=source, extra=extra)
+
+
+def is_enabled_for(level: str, source: str = "backend") -> bool:
+    """判断指定来源的某级别日志是否会被记录"""
+    return app_logger.is_enabled_for(level, source)
+
+
 def log_frontend(level: str, message: str, extra: Optional[Dict[str, Any]] = None) -> None:
     """记录前端日志"""
     app_logger.log_frontend(level, message, extra)
 
 
+def log_batch(records: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]], source: str = "frontend") -> int:
+    """批量记录日志"""
+    return app_logger.log_batch(records, source)
+
+
 def get_logs(**kwargs) -> List[Dict[str, Any]]:
     """获取日志"""
     return app_logger.get_logs(**kwargs)
 
 
+def query_logs(**kwargs) -> Dict[str, Any]:
+    """分页查询日志"""
+    return app_logger.query_logs(**kwargs)
+
+
+def search_logs(q: str, **kwargs) -> Dict[str, Any]:
+    """按消息内容搜索日志"""
+    return app_logger.search_logs(q, **kwargs)
+
+
+def read_text_logs(**kwargs) -> List[Dict[str, Any]]:
+    """从文本日志文件读取最近的日志"""
+    return app_logger.read_text_logs(**kwargs)
+
+
+def dump_logs(seconds: Optional[float] = None, reason: str = "manual") -> Dict[str, Any]:
+    """导出最近的日志"""
+    return app_logger.dump_logs(seconds, reason)
+
+
+def read_logs_after(cursor: Optional[str], **kwargs) -> List[Tuple[str, Dict[str, Any]]]:
+    """增量读取游标之后的日志"""
+    return app_logger.read_logs_after(cursor, **kwargs)
+
+
+def iter_logs(**kwargs) -> Iterator[Dict[str, Any]]:
+    """逐页遍历日志"""
+    return app_logger.iter_logs(**kwargs)
+
+
 def clear_logs() -> bool:
     """清空日志"""
     return app_logger.clear_logs()
@@ -324,3 +1175,18 @@ def clear_logs() -> bool:
 def get_log_stats() -> Dict[str, Any]:
     """获取日志统计"""
     return app_logger.get_log_stats()
+
+
+def get_log_histogram(minutes: int = 60, level: Optional[str] = None) -> List[Dict[str, Any]]:
+    """获取按分钟统计的日志条数"""
+    return app_logger.get_log_histogram(minutes, level)
+
+
+def set_sample_rate(source: str, rate: float, level: str = "DEBUG") -> None:
+    """设置指定来源、级别的采样率"""
+    app_logger.set_sample_rate(source, rate, level)
+
+
+def flush_logs(timeout: float = 5.0) -> bool:
+    """等待队列中的日志全部写出"""
+    return app_logger.flush(timeout)
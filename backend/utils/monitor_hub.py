@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监听事件广播模块
+剪贴板轮询线程通过 loop.call_soon_threadsafe 把事件交给事件循环后立即返回，从不等待；
+事件循环中再把事件分发给订阅了该按钮的所有 SSE 连接（同一按钮可以有多个连接）
+
+- 每个事件分配单调递增的 ID（作为 SSE 的 id: 字段）
+- 每个连接的缓冲区有上限，未读的连续剪贴板变化事件合并为一个
+- 保留最近的事件作为重放窗口，客户端带 Last-Event-ID 重连时补发错过的事件
+- 每个按钮可以设置过滤条件，按轮询线程预先计算好的分类结果判断，不重新读取剪贴板
+- 文本变化事件在缓冲区和重放窗口中带着分类结果，取出事件时才按连接实际收到的事件生成推送内容
+- 按订阅者引用计数管理按钮的生命周期：最后一个连接断开后经过宽限期仍无人订阅时通知空闲，
+  有新订阅者时通知恢复
+- 一个多路复用连接（stream）可以同时订阅多个按钮，所有连接共用一个心跳定时任务
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.clipboard_change import ChangeFilter, ClipboardChange
+from utils.clipboard_snapshot import KIND_TEXT
+
+SUBSCRIBER_BUFFER_SIZE = 64  # 每个连接最多缓冲的未发送事件数
+REPLAY_WINDOW_SIZE = 256  # 重放窗口保留的事件数
+REPLAY_WINDOW_SECONDS = 120.0  # 重放窗口保留的时长（秒）
+COALESCE_TYPES = {"clipboard_change"}  # 未读时可以合并的事件类型
+GRACE_PERIOD_SECONDS = float(os.environ.get("KPSR_MONITOR_GRACE_SECONDS", "30"))  # 最后一个连接断开后的宽限期（秒）
+HEARTBEAT_INTERVAL = 30.0  # 心跳间隔（秒）
+DETACHED_STREAM_SECONDS = 600.0  # 多路复用连接断开后保留其订阅按钮的时长（秒）
+HEARTBEAT_EVENT = {"type": "heartbeat"}
+
+
+class Subscription:
+    """一个 SSE 连接的订阅（多路复用连接可以同时订阅多个按钮），事件缓冲区有上限"""
+
+    def __init__(
+        self,
+        button_ids: Iterable[str] = (),
+        stream_id: Optional[str] = None,
+        max_buffer: int = SUBSCRIBER_BUFFER_SIZE
+    ) -> None:
+        self.button_ids: Set[str] = set(button_ids)
+        self.stream_id = stream_id  # 多路复用连接的 ID，单按钮连接为 None
+        self.max_buffer = max(1, max_buffer)
+        self._buffer: Deque[Tuple[int, dict, Optional[ClipboardChange]]] = deque()
+        self._ready = asyncio.Event()
+        self._heartbeat_due = False
+        self.closed = False
+        self.coalesced = 0  # 合并掉的事件数
+        self.dropped = 0  # 缓冲区满时丢弃的事件数
+
+    def push(self, event_id: int, event: dict, change: Optional[ClipboardChange] = None) -> None:
+        """放入事件及其对应的文本变化（在事件循环中调用）"""
+        if self._buffer and event.get("type") in COALESCE_TYPES:
+            _, last_event, _ = self._buffer[-1]
+            if (last_event.get("type") == event.get("type") and last_event.get("kind") == event.get("kind")
+                    and last_event.get("button_id") == event.get("button_id")):
+                # 客户端还没取走同一按钮的上一个同类事件（类型和变化类型都相同），只保留最新的
+                count = last_event.get("coalesced", 1) + 1
+                self._buffer[-1] = (event_id, dict(event, coalesced=count), change)
+                self.coalesced += 1
+                return
+        if len(self._buffer) >= self.max_buffer:
+            self._buffer.popleft()
+            self.dropped += 1
+        self._buffer.append((event_id, event, change))
+        self._ready.set()
+
+    def heartbeat(self) -> None:
+        """请求发送心跳（缓冲区有事件时不需要心跳）"""
+        self._heartbeat_due = True
+        self._ready.set()
+
+    def close(self) -> None:
+        """关闭订阅，等待中的 get() 返回 None"""
+        self.closed = True
+        self._ready.set()
+
+    async def get(
+        self, timeout: Optional[float] = None
+    ) -> Optional[Tuple[Optional[int], dict, Optional[ClipboardChange]]]:
+        """
+        等待下一个事件，返回 (事件 ID, 事件, 文本变化)；心跳的事件 ID 为 None；订阅关闭后返回 None
+        超时抛出 asyncio.TimeoutError
+        """
+        while True:
+            if self.closed:
+                return None
+            if self._buffer:
+                self._heartbeat_due = False
+                return self._buffer.popleft()
+            if self._heartbeat_due:
+                self._heartbeat_due = False
+                return None, HEARTBEAT_EVENT, None
+            self._ready.clear()
+            await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+
+
+class MonitorEventHub:
+    """按按钮分组的事件广播"""
+
+    def __init__(self) -> None:
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Dict[str, Set[Subscription]] = {}  # 按钮 -> 订阅了它的连接
+        self._subscriptions: Set[Subscription] = set()  # 所有连接
+        self._streams: Dict[str, Subscription] = {}  # 多路复用连接 ID -> 当前连接
+        # 已断开的多路复用连接：ID -> (订阅的按钮, 断开时间)，重连时恢复订阅
+        self._detached_streams: Dict[str, Tuple[Set[str], float]] = {}
+        self.heartbeat_interval = HEARTBEAT_INTERVAL
+        self._ticker: Optional[asyncio.Task] = None
+        # 事件 ID 以毫秒时间戳为起点，服务重启后仍大于客户端记住的 ID
+        self._last_id = int(time.time() * 1000)
+        self._replay: Deque[Tuple[int, float, str, dict, Optional[ClipboardChange]]] = deque(maxlen=REPLAY_WINDOW_SIZE)
+        self._filters: Dict[str, ChangeFilter] = {}  # 按钮 -> 过滤条件
+        self._filtered = 0  # 被过滤掉的事件数
+        self._dropped = 0  # 事件循环不可用时丢弃的事件数
+        self._lock = threading.Lock()
+        self.grace_period = GRACE_PERIOD_SECONDS
+        self._grace_timers: Dict[str, asyncio.TimerHandle] = {}  # 按钮 -> 宽限期到期定时器
+        self._on_active: Optional[Callable[[str], None]] = None
+        self._on_idle: Optional[Callable[[str], None]] = None
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """记录分发事件的事件循环"""
+        self._loop = loop
+
+    def set_lifecycle(
+        self,
+        on_active: Optional[Callable[[str], None]],
+        on_idle: Optional[Callable[[str], None]]
+    ) -> None:
+        """
+        设置生命周期回调（在事件循环中调用）
+        - on_active(button_id): 按钮的订阅者从 0 变为 1 时调用
+        - on_idle(button_id): 按钮没有订阅者且超过宽限期时调用
+        """
+        self._on_active = on_active
+        self._on_idle = on_idle
+
+    def _arm_grace(self, button_id: str) -> None:
+        """开始（或重新开始）按钮的宽限期计时"""
+        self._cancel_grace(button_id)
+        loop = asyncio.get_running_loop()
+        self._grace_timers[button_id] = loop.call_later(self.grace_period, self._grace_expired, button_id)
+
+    def _cancel_grace(self, button_id: str) -> None:
+        """取消按钮的宽限期计时"""
+        timer = self._grace_timers.pop(button_id, None)
+        if timer is not None:
+            timer.cancel()
+
+    def _grace_expired(self, button_id: str) -> None:
+        """宽限期到期：仍然没有订阅者时通知空闲"""
+        self._grace_timers.pop(button_id, None)
+        if self.subscriber_count(button_id) == 0 and self._on_idle is not None:
+            self._on_idle(button_id)
+
+    def expect(self, button_id: str) -> None:
+        """
+        按钮开始监听，等待客户端连接（在事件循环中调用）
+        宽限期内没有订阅者连接时按空闲处理
+        """
+        if self.subscriber_count(button_id) == 0:
+            self._arm_grace(button_id)
+
+    def release(self, button_id: str) -> None:
+        """按钮明确停止监听，不再需要宽限期计时（在事件循环中调用）"""
+        self._cancel_grace(button_id)
+
+    def set_filter(self, button_id: str, change_filter: Optional[ChangeFilter]) -> None:
+        """设置按钮的过滤条件，为空时清除（在事件循环中调用）"""
+        if change_filter is None or change_filter.is_empty:
+            self._filters.pop(button_id, None)
+        else:
+            self._filters[button_id] = change_filter
+
+    def get_filter(self, button_id: str) -> Optional[ChangeFilter]:
+        """按钮的过滤条件"""
+        return self._filters.get(button_id)
+
+    def publish(self, button_id: str, event: dict, change: Optional[ClipboardChange] = None) -> bool:
+        """
+        发布事件（可在任意线程调用，不阻塞）
+        change 为事件对应的分类结果，用于按钮的过滤条件
+        返回事件是否已交给事件循环
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            with self._lock:
+                self._dropped += 1
+            return False
+        try:
+            loop.call_soon_threadsafe(self._dispatch, button_id, event, change)
+        except RuntimeError:
+            # 事件循环已关闭
+            with self._lock:
+                self._dropped += 1
+            return False
+        return True
+
+    def _dispatch(self, button_id: str, event: dict, change: Optional[ClipboardChange] = None) -> None:
+        """
+        在事件循环中检查过滤条件，分配事件 ID、记录到重放窗口并放入每个订阅者的缓冲区
+        只有文本变化随事件保留（用于发送时生成推送内容），图片和截图不在缓冲区中占用内存
+        """
+        change_filter = self._filters.get(button_id)
+        if change_filter is not None and change is not None and not change_filter.matches(change):
+            self._filtered += 1
+            return
+        text_change = change if change is not None and change.kind == KIND_TEXT else None
+        self._last_id += 1
+        now = time.monotonic()
+        self._replay.append((self._last_id, now, button_id, event, text_change))
+        while self._replay and now - self._replay[0][1] > REPLAY_WINDOW_SECONDS:
+            self._replay.popleft()
+        for subscription in list(self._subscribers.get(button_id, ())):
+            subscription.push(self._last_id, event, text_change)
+
+    def _replay_into(self, subscription: Subscription, button_ids: Iterable[str], last_event_id: Optional[int]) -> None:
+        """
+        补发重放窗口中 last_event_id 之后、属于这些按钮的事件
+        错过的事件已超出重放窗口时先放入一个 resync 事件，提示客户端重新同步
+        """
+        if last_event_id is None or last_event_id >= self._last_id:
+            return
+        button_ids = set(button_ids)
+        oldest_id = self._replay[0][0] if self._replay else self._last_id + 1
+        if last_event_id + 1 < oldest_id:
+            resync = {"type": "resync"}
+            if subscription.stream_id is None and len(button_ids) == 1:
+                resync["button_id"] = next(iter(button_ids))
+            subscription.push(oldest_id - 1, resync)
+        for event_id, _, event_button, event, change in self._replay:
+            if event_id > last_event_id and event_button in button_ids:
+                subscription.push(event_id, event, change)
+
+    def _attach(self, subscription: Subscription, button_id: str) -> None:
+        """连接订阅按钮：订阅者从 0 变为 1 时通知恢复"""
+        subscription.button_ids.add(button_id)
+        subscribers = self._subscribers.setdefault(button_id, set())
+        first = not subscribers
+        subscribers.add(subscription)
+        self._cancel_grace(button_id)
+        if first and self._on_active is not None:
+            self._on_active(button_id)
+
+    def _detach(self, subscription: Subscription, button_id: str) -> None:
+        """连接取消订阅按钮：最后一个订阅者离开后开始宽限期计时"""
+        subscription.button_ids.discard(button_id)
+        subscribers = self._subscribers.get(button_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[button_id]
+            self._arm_grace(button_id)
+
+    def _register(self, subscription: Subscription) -> None:
+        """记录连接，并确保心跳定时任务在运行"""
+        self._subscriptions.add(subscription)
+        if self._ticker is None or self._ticker.done():
+            self._ticker = asyncio.get_running_loop().create_task(self._heartbeat_loop())
+
+    async def _heartbeat_loop(self) -> None:
+        """所有连接共用的心跳定时任务，没有连接时退出"""
+        while self._subscriptions:
+            await asyncio.sleep(self.heartbeat_interval)
+            for subscription in list(self._subscriptions):
+                subscription.heartbeat()
+
+    def subscribe(self, button_id: str, last_event_id: Optional[int] = None) -> Subscription:
+        """
+        订阅单个按钮的事件（在事件循环中调用）
+        带 last_event_id 时先补发重放窗口中该 ID 之后的事件
+        """
+        subscription = Subscription()
+        self._replay_into(subscription, (button_id,), last_event_id)
+        self._register(subscription)
+        self._attach(subscription, button_id)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """连接关闭时取消它的所有订阅（在事件循环中调用）"""
+        self._subscriptions.discard(subscription)
+        if subscription.stream_id is not None and self._streams.get(subscription.stream_id) is subscription:
+            # 保留多路复用连接订阅的按钮，重连时恢复
+            del self._streams[subscription.stream_id]
+            self._detached_streams[subscription.stream_id] = (set(subscription.button_ids), time.monotonic())
+        for button_id in list(subscription.button_ids):
+            self._detach(subscription, button_id)
+
+    def _prune_detached_streams(self) -> None:
+        """清理断开太久的多路复用连接记录"""
+        now = time.monotonic()
+        for stream_id, (_, detached_at) in list(self._detached_streams.items()):
+            if now - detached_at > DETACHED_STREAM_SECONDS:
+                del self._detached_streams[stream_id]
+
+    def open_stream(self, stream_id: str, last_event_id: Optional[int] = None) -> Subscription:
+        """
+        打开多路复用连接（在事件循环中调用）
+        同一 ID 的旧连接被关闭；之前通过 stream_add 添加的按钮（包括连接断开期间添加的）自动恢复订阅，
+        带 last_event_id 时补发这些按钮错过的事件
+        """
+        self._prune_detached_streams()
+        old = self._streams.pop(stream_id, None)
+        if old is not None:
+            button_ids = set(old.button_ids)
+        else:
+            button_ids = self._detached_streams.pop(stream_id, (set(), 0.0))[0]
+
+        subscription = Subscription(stream_id=stream_id)
+        self._replay_into(subscription, button_ids, last_event_id)
+        self._streams[stream_id] = subscription
+        self._register(subscription)
+        # 先订阅新连接再关闭旧连接，按钮的订阅数不会降为 0
+        for button_id in button_ids:
+            self._attach(subscription, button_id)
+        if old is not None:
+            old.close()
+            self.unsubscribe(old)
+        return subscription
+
+    def stream_add(self, stream_id: str, button_id: str) -> bool:
+        """
+        多路复用连接订阅按钮（在事件循环中调用）
+        连接尚未建立或已断开时先记录下来，连接建立后自动订阅；返回连接当前是否在线
+        """
+        subscription = self._streams.get(stream_id)
+        if subscription is None:
+            buttons, _ = self._detached_streams.get(stream_id, (set(), 0.0))
+            buttons.add(button_id)
+            self._detached_streams[stream_id] = (buttons, time.monotonic())
+            return False
+        if button_id not in subscription.button_ids:
+            self._attach(subscription, button_id)
+        return True
+
+    def stream_remove(self, stream_id: str, button_id: str) -> None:
+        """多路复用连接取消订阅按钮（在事件循环中调用）"""
+        subscription = self._streams.get(stream_id)
+        if subscription is not None:
+            self._detach(subscription, button_id)
+        elif stream_id in self._detached_streams:
+            self._detached_streams[stream_id][0].discard(button_id)
+
+    def stream_buttons(self, stream_id: str) -> List[str]:
+        """多路复用连接订阅的按钮"""
+        subscription = self._streams.get(stream_id)
+        if subscription is not None:
+            return sorted(subscription.button_ids)
+        return sorted(self._detached_streams.get(stream_id, (set(), 0.0))[0])
+
+    def subscriber_count(self, button_id: Optional[str] = None) -> int:
+        """订阅者数量（不指定按钮时为全部）"""
+        if button_id is not None:
+            return len(self._subscribers.get(button_id, ()))
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def subscribed_buttons(self) -> List[str]:
+        """有订阅者的按钮"""
+        return list(self._subscribers.keys())
+
+    def subscriber_counts(self) -> Dict[str, int]:
+        """每个按钮的订阅者数量"""
+        return {button_id: len(subscribers) for button_id, subscribers in self._subscribers.items()}
+
+    def grace_pending(self) -> List[str]:
+        """正在宽限期中的按钮"""
+        return list(self._grace_timers.keys())
+
+    def stats(self) -> Dict[str, int]:
+        """广播统计"""
+        return {
+            "buttons": len(self._subscribers),
+            "subscribers": self.subscriber_count(),
+            "connections": len(self._subscriptions),
+            "streams": len(self._streams),
+            "detached_streams": len(self._detached_streams),
+            "filters": len(self._filters),
+            "filtered": self._filtered,
+            "dropped": self._dropped,
+            "last_event_id": self._last_id,
+            "replay_window": len(self._replay),
+            "grace_period": self.grace_period,
+            "grace_pending": len(self._grace_timers)
+        }
+
+
+# 全局单例
+monitor_hub = MonitorEventHub()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应轮询调度模块
+有活动时快速轮询，空闲时按指数退避逐渐放慢，再次活动时立即恢复
+"""
+
+import time
+
+
+class AdaptivePollScheduler:
+    """
+    自适应轮询间隔
+
+    - 活动（检测到变化、开始监听）后的 hot_period 秒内以 min_interval 轮询
+    - 之后每次轮询间隔乘以 backoff，最长不超过 max_interval
+    - 再次活动时立即恢复 min_interval
+    """
+
+    def __init__(
+        self,
+        min_interval: float,
+        max_interval: float,
+        backoff: float = 1.5,
+        hot_period: float = 2.0
+    ) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.backoff = max(1.0, backoff)
+        self.hot_period = hot_period
+        self._interval = min_interval
+        self._last_activity = time.monotonic()
+
+    @property
+    def interval(self) -> float:
+        """当前轮询间隔（秒）"""
+        return self._interval
+
+    def activity(self) -> None:
+        """记录一次活动，恢复快速轮询"""
+        self._last_activity = time.monotonic()
+        self._interval = self.min_interval
+
+    def next_interval(self) -> float:
+        """计算到下次轮询的等待时间"""
+        if time.monotonic() - self._last_activity < self.hot_period:
+            self._interval = self.min_interval
+        else:
+            self._interval = min(self.max_interval, self._interval * self.backoff)
+        return self._interval
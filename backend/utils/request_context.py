@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求上下文模块
+保存当前请求的关联 ID（X-Request-ID），日志模块自动把它附加到每条日志上
+"""
+
+import re
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# 客户端传入的 ID 只接受字母、数字和 ._-，最长 64 个字符，否则重新生成
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def new_request_id() -> str:
+    """生成新的请求 ID"""
+    return uuid.uuid4().hex[:16]
+
+
+def normalize_request_id(value: Optional[str]) -> str:
+    """沿用合法的客户端请求 ID，否则生成新的"""
+    if value and _VALID_REQUEST_ID.match(value):
+        return value
+    return new_request_id()
+
+
+def get_request_id() -> Optional[str]:
+    """当前上下文的请求 ID（不在请求中时为 None）"""
+    return request_id_var.get()
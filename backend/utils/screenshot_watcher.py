@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截图文件监视模块
+先比较目录自身的修改时间，只有目录内容变化（新建、删除、重命名文件）时才用 os.scandir 重新扫描，
+并维护已知截图文件的增量索引，已知文件不重复 stat
+"""
+
+import os
+import re
+import fnmatch
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class ScreenshotWatcher:
+    """
+    监视单个目录中匹配文件名模式的截图文件
+
+    - 每次检查只 stat 一次目录；目录修改时间不变时直接返回缓存结果
+    - 目录变化时扫描文件名，只对新出现的匹配文件 stat，已消失的文件从索引中移除
+    - 截图工具通常先写临时文件再重命名，重命名会更新目录修改时间
+    """
+
+    def __init__(self, directory: str, patterns: Iterable[str]) -> None:
+        self.directory = os.path.expanduser(directory)
+        self.patterns: Tuple[str, ...] = tuple(patterns)
+        self._regex = re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in self.patterns) or "(?!)")
+        self._dir_mtime_ns: Optional[int] = None
+        self._index: Dict[str, float] = {}  # 文件名 -> 修改时间
+        self._latest = 0.0
+        self._latest_name: Optional[str] = None
+        self._baseline = 0.0  # 上次确认过的最新截图时间
+        self.ready = False  # 是否已记录基准（reset 之后才检查新截图）
+        self.scans = 0  # 实际扫描目录的次数
+
+    def _refresh(self) -> None:
+        """目录修改时间变化时增量更新索引"""
+        try:
+            dir_mtime_ns = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            # 目录不存在或无权限
+            self._dir_mtime_ns = None
+            self._index.clear()
+            self._latest = 0.0
+            self._latest_name = None
+            return
+        if dir_mtime_ns == self._dir_mtime_ns:
+            return
+
+        self.scans += 1
+        seen = set()
+        removed = False
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if not self._regex.match(name):
+                        continue
+                    seen.add(name)
+                    if name in self._index:
+                        continue
+                    try:
+                        mtime = entry.stat().st_mtime
+                    except OSError:
+                        continue
+                    self._index[name] = mtime
+                    if mtime > self._latest:
+                        self._latest = mtime
+                        self._latest_name = name
+        except OSError:
+            return
+
+        for name in list(self._index):
+            if name not in seen:
+                del self._index[name]
+                removed = True
+        if removed:
+            self._latest_name = max(self._index, key=self._index.get, default=None)
+            self._latest = self._index[self._latest_name] if self._latest_name else 0.0
+        # 扫描成功后才记录目录修改时间，失败时下次重试
+        self._dir_mtime_ns = dir_mtime_ns
+
+    def latest_mtime(self) -> float:
+        """目录中最新截图文件的修改时间（没有时为 0）"""
+        self._refresh()
+        return self._latest
+
+    def reset(self) -> None:
+        """以当前最新截图作为基准"""
+        self._baseline = self.latest_mtime()
+        self.ready = True
+
+    def check_new(self) -> bool:
+        """检查自上次确认后是否出现了更新的截图"""
+        latest = self.latest_mtime()
+        if latest > self._baseline:
+            self._baseline = latest
+            return True
+        return False
+
+    @property
+    def latest_path(self) -> Optional[str]:
+        """最新截图文件的路径（使用最近一次检查的结果）"""
+        if self._latest_name is None:
+            return None
+        return os.path.join(self.directory, self._latest_name)
+
+    @property
+    def baseline(self) -> float:
+        """上次确认过的最新截图时间"""
+        return self._baseline
@@ -13,7 +13,7 @@ a = Analysis(
     hiddenimports=[
         'pynput.keyboard._darwin',
         'pynput.mouse._darwin',
-        'pyperclip',
+        'AppKit',
     ],
     hookspath=[],
     hooksconfig={},
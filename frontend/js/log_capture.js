@@ -12,12 +12,16 @@
         enabled: true,
         // 后端日志API地址
         apiUrl: '/api/logs/frontend',
-        // 批量发送API地址
-        batchApiUrl: '/api/logs/frontend/batch',
+        // 批量发送API地址（NDJSON，可 gzip 压缩）
+        batchApiUrl: '/api/logs/frontend/ingest',
         // 批量发送的日志数量阈值
-        batchSize: 10,
+        batchSize: 50,
         // 批量发送的时间间隔（毫秒）
         batchInterval: 5000,
+        // 缓冲区最多保留的日志条数（发送失败或被限流时丢弃最旧的）
+        maxBuffer: 1000,
+        // 请求体超过该字节数时使用 gzip 压缩（浏览器支持 CompressionStream 时）
+        compressThreshold: 4096,
         // 是否同时输出到原始console
         preserveOriginal: true,
         // 要捕获的日志级别
@@ -36,6 +40,10 @@
     // 日志缓冲区
     let logBuffer = [];
     let batchTimer = null;
+    // 是否有批量请求正在发送
+    let sending = false;
+    // 被后端限流时，在该时间之前不再发送（毫秒时间戳）
+    let pausedUntil = 0;
     
     // 级别映射
     const levelMap = {
@@ -89,43 +97,91 @@
         }
     }
     
+    /**
+     * 将日志序列化为 NDJSON（每行一条）
+     */
+    function toNdjson(logs) {
+        return logs.map(log => JSON.stringify(log)).join('\n') + '\n';
+    }
+    
+    /**
+     * 构造请求体，较大时使用 gzip 压缩
+     */
+    async function buildBody(logs) {
+        const text = toNdjson(logs);
+        const headers = { 'Content-Type': 'application/x-ndjson' };
+        if (text.length < LOG_CONFIG.compressThreshold || typeof CompressionStream === 'undefined') {
+            return { body: text, headers: headers };
+        }
+        const stream = new Blob([text]).stream().pipeThrough(new CompressionStream('gzip'));
+        const body = await new Response(stream).arrayBuffer();
+        headers['Content-Encoding'] = 'gzip';
+        return { body: body, headers: headers };
+    }
+    
+    /**
+     * 把未发送成功的日志放回缓冲区（最多保留 maxBuffer 条）
+     */
+    function requeue(logs) {
+        logBuffer = logs.concat(logBuffer).slice(-LOG_CONFIG.maxBuffer);
+    }
+    
     /**
      * 批量发送日志到后端
      */
     async function sendBatchLogs() {
-        if (!LOG_CONFIG.enabled || logBuffer.length === 0) return;
+        if (!LOG_CONFIG.enabled || logBuffer.length === 0 || sending) return;
+        if (Date.now() < pausedUntil) return;
         
-        const logsToSend = [...logBuffer];
+        const logsToSend = logBuffer;
         logBuffer = [];
+        sending = true;
         
         try {
+            const request = await buildBody(logsToSend);
             const response = await fetch(LOG_CONFIG.batchApiUrl, {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ logs: logsToSend })
+                headers: request.headers,
+                body: request.body
             });
             
-            if (!response.ok) {
+            if (response.status === 429) {
+                // 被限流，按 Retry-After 暂停发送
+                const retryAfter = parseInt(response.headers.get('Retry-After'), 10) || 5;
+                pausedUntil = Date.now() + retryAfter * 1000;
+                requeue(logsToSend);
+            } else if (!response.ok) {
                 originalConsole.error('[LogCapture] 批量发送日志失败:', response.status);
                 // 发送失败，放回缓冲区
-                logBuffer = logsToSend.concat(logBuffer);
+                requeue(logsToSend);
             }
         } catch (error) {
             originalConsole.error('[LogCapture] 批量发送日志出错:', error.message);
-            // 发送失败，放回缓冲区（最多保留1000条）
-            logBuffer = logsToSend.concat(logBuffer).slice(-1000);
+            // 发送失败，放回缓冲区
+            requeue(logsToSend);
+        } finally {
+            sending = false;
         }
     }
     
     /**
-     * 添加日志到缓冲区
+     * 添加日志到缓冲区（与上一条级别和内容都相同时只增加重复次数）
      */
     function bufferLog(level, message, extra = null) {
+        const last = logBuffer[logBuffer.length - 1];
+        if (last && last.level === level && last.message === message) {
+            last.repeat_count = (last.repeat_count || 1) + 1;
+            return;
+        }
+        
         logBuffer.push({
             level: level,
             message: message,
             extra: extra
         });
+        if (logBuffer.length > LOG_CONFIG.maxBuffer) {
+            logBuffer.shift();
+        }
         
         // 如果达到批量阈值，立即发送
         if (logBuffer.length >= LOG_CONFIG.batchSize) {
@@ -174,7 +230,8 @@
         window.addEventListener('beforeunload', () => {
             if (logBuffer.length > 0) {
                 // 使用同步方式发送（可能不总是成功）
-                navigator.sendBeacon(LOG_CONFIG.batchApiUrl, JSON.stringify({ logs: logBuffer }));
+                const blob = new Blob([toNdjson(logBuffer)], { type: 'application/x-ndjson' });
+                navigator.sendBeacon(LOG_CONFIG.batchApiUrl, blob);
             }
         });
         
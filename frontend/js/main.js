@@ -42,6 +42,8 @@ document.addEventListener('DOMContentLoaded', async function() {
         DOM.sendBtn.classList.toggle('active', hasValue);
     });
 
+    const PC_CLIPBOARD_PREVIEW_CHARS = 500;  // 电脑剪贴板消息最多显示的字符数（复制时复制完整内容）
+
     // 渲染消息
     const renderMessage = (text) => {
         Logger.log('renderMessage被调用，文本:', text);
@@ -67,6 +69,45 @@ document.addEventListener('DOMContentLoaded', async function() {
         return row;
     };
 
+    // 渲染电脑剪贴板推送的文本，点击复制到手机剪贴板（推送内容被截断时先获取完整内容）
+    const renderPcClipboard = ({ text, truncated }) => {
+        if (!text) {
+            return;
+        }
+        
+        DOM.welcome.style.display = 'none';
+        
+        const row = document.createElement('div');
+        row.className = 'message-row pc';
+        
+        const bubble = document.createElement('div');
+        bubble.className = 'bubble';
+        const preview = text.length > PC_CLIPBOARD_PREVIEW_CHARS ? text.slice(0, PC_CLIPBOARD_PREVIEW_CHARS) : text;
+        bubble.textContent = preview.length < text.length || truncated ? `${preview}…` : preview;
+        
+        bubble.addEventListener('click', async function() {
+            let content = text;
+            if (truncated) {
+                try {
+                    const response = await fetch('/api/clipboard/get');
+                    if (response.ok) {
+                        content = (await response.json()).content || text;
+                    }
+                } catch (error) {
+                    Logger.error('获取完整剪贴板内容失败:', error);
+                }
+            }
+            copyToClipboard(content, this);
+        });
+        
+        row.appendChild(bubble);
+        DOM.list.appendChild(row);
+        
+        DOM.scroll.scrollTo({ top: DOM.scroll.scrollHeight, behavior: 'smooth' });
+    };
+    
+    window.addEventListener('pc-clipboard', (event) => renderPcClipboard(event.detail));
+
     // 复制到剪贴板
     function copyToClipboard(text, element) {
         if (navigator.clipboard && window.isSecureContext) {
@@ -1265,8 +1306,144 @@ let editingMouseButtonId = null;
 const autoCloseTimers = {};  // 存储每个按钮的定时器ID
 
 // 剪贴板监听管理
-const clipboardEventSources = {};  // 存储每个按钮的 EventSource
+// 所有监听按钮共用一个多路复用 SSE 连接（/api/monitor/stream），避免每个按钮占用一个 HTTP 连接
 const clipboardButtonRefs = {};    // 存储每个按钮的引用（用于回调）
+const clipboardStreamId = `phone-${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+let clipboardStream = null;        // 多路复用 EventSource
+const pcClipboard = { hash: null, text: '', truncated: false };  // 电脑剪贴板的最新文本（由服务端推送）
+let clipboardPushChain = Promise.resolve();  // 按顺序应用推送内容
+
+// 通知后端开始/停止监听按钮，并订阅/取消订阅到多路复用连接（同时请求推送剪贴板内容）
+function postMonitorControl(buttonId, action) {
+    return fetch('/api/monitor/control', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ button_id: buttonId, action: action, stream_id: clipboardStreamId, push_content: true })
+    });
+}
+
+// 更新电脑剪贴板内容并通知页面（window 上的 pc-clipboard 事件，页面显示为可点击复制的消息）
+function setPcClipboard(hash, text, truncated) {
+    pcClipboard.hash = hash;
+    pcClipboard.text = text;
+    pcClipboard.truncated = truncated;
+    window.dispatchEvent(new CustomEvent('pc-clipboard', { detail: { ...pcClipboard } }));
+}
+
+// 推送内容解码：zlib+base64 使用浏览器的 DecompressionStream 解压
+async function decodeClipboardPush(content) {
+    if (content.encoding !== 'zlib+base64') {
+        return content.data;
+    }
+    const bytes = Uint8Array.from(atob(content.data), c => c.charCodeAt(0));
+    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'));
+    return await new Response(stream).text();
+}
+
+// 推送内容不完整或无法应用差异时，请求完整的剪贴板内容
+async function fetchPcClipboard() {
+    const response = await fetch('/api/clipboard/get');
+    if (!response.ok) {
+        throw new Error(`获取剪贴板失败: ${response.status}`);
+    }
+    const data = await response.json();
+    setPcClipboard(data.hash, data.content || '', false);
+}
+
+// 应用服务端推送的剪贴板内容（完整内容或相对上一次内容的差异）
+async function applyClipboardPush(content) {
+    try {
+        if (content.hash === pcClipboard.hash) {
+            // 同一次变化发给多个按钮，只应用一次
+            return;
+        }
+        if (content.op === 'splice' && pcClipboard.hash !== content.base) {
+            // 错过了上一次推送，差异无法应用
+            await fetchPcClipboard();
+            return;
+        }
+        const data = await decodeClipboardPush(content);
+        let text = data;
+        if (content.op === 'splice') {
+            text = pcClipboard.text.slice(0, content.start) + data + pcClipboard.text.slice(content.start + content.delete);
+        }
+        if (text.length !== content.length) {
+            await fetchPcClipboard();
+            return;
+        }
+        // 截断的内容不能作为下一次差异的基准
+        setPcClipboard(content.truncated ? null : content.hash, text, content.truncated);
+    } catch (e) {
+        console.error(`[剪贴板推送] 应用推送内容失败:`, e);
+    }
+}
+
+// 建立多路复用 SSE 连接（已建立时直接返回）
+function ensureClipboardStream() {
+    if (clipboardStream) {
+        return;
+    }
+    
+    const eventSource = new EventSource(`/api/monitor/stream?stream_id=${encodeURIComponent(clipboardStreamId)}`);
+    clipboardStream = eventSource;
+    
+    eventSource.onmessage = function(event) {
+        try {
+            const data = JSON.parse(event.data);
+            
+            if (data.type === 'connected') {
+                console.log(`[剪贴板监听] SSE 连接已建立，已订阅按钮:`, data.buttons);
+                // 服务端没有记录的按钮（如服务重启后）重新订阅
+                const subscribed = new Set(data.buttons || []);
+                for (const buttonId in clipboardButtonRefs) {
+                    if (!subscribed.has(buttonId)) {
+                        postMonitorControl(buttonId, 'start').catch(error => {
+                            console.error(`[剪贴板监听] 重新订阅失败: ${buttonId}`, error);
+                        });
+                    }
+                }
+                return;
+            }
+            
+            if (data.type === 'heartbeat') {
+                return;
+            }
+            
+            console.log(`[剪贴板监听] 收到事件:`, data);
+            
+            if (data.type === 'clipboard_change') {
+                if (data.content) {
+                    clipboardPushChain = clipboardPushChain.then(() => applyClipboardPush(data.content));
+                }
+                
+                const buttonId = data.button_id;
+                // 使用保存的 button 引用，已停止监听的按钮忽略
+                const savedButton = clipboardButtonRefs[buttonId];
+                if (!savedButton) {
+                    return;
+                }
+                console.log(`✅ [剪贴板监听] 检测到剪贴板变化，自动关闭按钮: ${buttonId}`);
+                autoCloseButton(buttonId, savedButton);
+            }
+        } catch (e) {
+            console.error(`[剪贴板监听] 解析事件失败:`, e);
+        }
+    };
+    
+    eventSource.onerror = function(error) {
+        // 浏览器自动重连，服务端根据 Last-Event-ID 补发断线期间的事件
+        console.error(`[剪贴板监听] SSE 连接错误，等待自动重连:`, error);
+    };
+}
+
+// 没有监听的按钮时关闭多路复用连接
+function closeClipboardStreamIfIdle() {
+    if (clipboardStream && Object.keys(clipboardButtonRefs).length === 0) {
+        clipboardStream.close();
+        clipboardStream = null;
+        console.log(`[剪贴板监听] SSE 连接已关闭`);
+    }
+}
 
 // 启动剪贴板监听
 async function startClipboardMonitor(buttonId, button) {
@@ -1275,12 +1452,10 @@ async function startClipboardMonitor(buttonId, button) {
     console.log(`[剪贴板监听] 启动监听: ${buttonId}`);
     
     try {
-        // 先通知后端开始监听
-        const response = await fetch('/api/monitor/control', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ button_id: buttonId, action: 'start' })
-        });
+        // 确保多路复用连接已建立，再通知后端开始监听并订阅该按钮
+        ensureClipboardStream();
+        
+        const response = await postMonitorControl(buttonId, 'start');
         
         if (!response.ok) {
             console.error(`[剪贴板监听] 启动失败: ${response.status}`);
@@ -1289,38 +1464,6 @@ async function startClipboardMonitor(buttonId, button) {
         
         console.log(`[剪贴板监听] 后端监听已启动`);
         
-        // 建立 SSE 连接
-        if (clipboardEventSources[buttonId]) {
-            clipboardEventSources[buttonId].close();
-        }
-        
-        const eventSource = new EventSource(`/api/monitor/events/${buttonId}`);
-        clipboardEventSources[buttonId] = eventSource;
-        
-        eventSource.onmessage = function(event) {
-            try {
-                const data = JSON.parse(event.data);
-                console.log(`[剪贴板监听] 收到事件:`, data);
-                
-                if (data.type === 'clipboard_change') {
-                    console.log(`✅ [剪贴板监听] 检测到剪贴板变化，自动关闭按钮: ${buttonId}`);
-                    
-                    // 使用保存的 button 引用
-                    const savedButton = clipboardButtonRefs[buttonId];
-                    autoCloseButton(buttonId, savedButton);
-                }
-            } catch (e) {
-                console.error(`[剪贴板监听] 解析事件失败:`, e);
-            }
-        };
-        
-        eventSource.onerror = function(error) {
-            console.error(`[剪贴板监听] SSE 连接错误:`, error);
-            // 连接出错时不自动重连，等待下次按钮点击
-        };
-        
-        console.log(`[剪贴板监听] SSE 连接已建立`);
-        
     } catch (error) {
         console.error(`[剪贴板监听] 启动出错:`, error);
     }
@@ -1330,13 +1473,6 @@ async function startClipboardMonitor(buttonId, button) {
 async function stopClipboardMonitor(buttonId) {
     console.log(`[剪贴板监听] 停止监听: ${buttonId}`);
     
-    // 关闭 SSE 连接
-    if (clipboardEventSources[buttonId]) {
-        clipboardEventSources[buttonId].close();
-        delete clipboardEventSources[buttonId];
-        console.log(`[剪贴板监听] SSE 连接已关闭`);
-    }
-    
     // 清理 button 引用
     if (clipboardButtonRefs[buttonId]) {
         delete clipboardButtonRefs[buttonId];
@@ -1344,15 +1480,13 @@ async function stopClipboardMonitor(buttonId) {
     
     // 通知后端停止监听
     try {
-        await fetch('/api/monitor/control', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ button_id: buttonId, action: 'stop' })
-        });
+        await postMonitorControl(buttonId, 'stop');
         console.log(`[剪贴板监听] 后端监听已停止`);
     } catch (error) {
         console.error(`[剪贴板监听] 停止出错:`, error);
     }
+    
+    closeClipboardStreamIfIdle();
 }
 
 // 自动关闭按钮（由剪贴板变化触发）
@@ -2053,13 +2187,11 @@ function cleanupAllResources() {
         }
     }
     
-    // 清理所有 EventSource 连接
-    for (const buttonId in clipboardEventSources) {
-        if (clipboardEventSources[buttonId]) {
-            clipboardEventSources[buttonId].close();
-            delete clipboardEventSources[buttonId];
-            console.log(`[清理] 已关闭按钮 ${buttonId} 的 EventSource`);
-        }
+    // 关闭多路复用 EventSource 连接
+    if (clipboardStream) {
+        clipboardStream.close();
+        clipboardStream = null;
+        console.log(`[清理] 已关闭剪贴板监听的 EventSource`);
     }
     
     // 清理按钮引用